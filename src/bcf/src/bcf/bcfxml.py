@@ -24,25 +24,30 @@ from xml.dom import minidom
 
 
 def load(filepath):
-    filepath = extract_project(filepath)
-    if os.path.isfile(os.path.join(filepath, "bcf.version")):
-        version_path = os.path.join(filepath, "bcf.version")
-        version_id = get_version(version_path)
+    if not filepath:
+        return
+    # Topics and viewpoints are read straight from the archive until something needs the project on disk
+    zip_file = zipfile.ZipFile(filepath)
+    if "bcf.version" in zip_file.namelist():
+        with zip_file.open("bcf.version") as version_file:
+            version_id = get_version(version_file)
         # TODO: we actually coded it for 2.1, let's check the difference between 2.0 and 2.1
         if version_id == "2.1" or version_id == "2.0":
             from bcf.v2.bcfxml import BcfXml
 
             bcfxml = BcfXml()
-            bcfxml.filepath = filepath
+            bcfxml.open_project(zip_file)
             return bcfxml
         elif version_id == "3.0":
             from bcf.v3.bcfxml import BcfXml
 
             bcfxml = BcfXml()
-            bcfxml.filepath = filepath
+            bcfxml.open_project(zip_file)
             return bcfxml
         else:
+            zip_file.close()
             raise Exception(f"Version {version_id} not supported.")
+    zip_file.close()
 
 
 def get_version(version_path):
@@ -17,12 +17,14 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with BCF.  If not, see <http://www.gnu.org/licenses/>.
 
+import io
 import os
 import uuid
 import shutil
 import zipfile
 import logging
 import tempfile
+import multiprocessing
 import bcf.v3.data
 from datetime import datetime
 from xml.dom import minidom
@@ -31,6 +33,35 @@ from contextlib import contextmanager
 from shutil import copyfile
 
 cwd = os.path.dirname(os.path.realpath(__file__))
+schemas = {}
+
+
+def get_schema(xsd):
+    schema = schemas.get(xsd)
+    if schema is None:
+        schema = schemas[xsd] = XMLSchema(os.path.join(cwd, "xsd", xsd))
+    return schema
+
+
+def read_xml(source, filename, xsd):
+    # The source is either an extracted project directory or an open BCF archive
+    if isinstance(source, zipfile.ZipFile):
+        return get_schema(xsd).to_dict(io.BytesIO(source.read(filename.replace(os.sep, "/"))), validation="lax")
+    return get_schema(xsd).to_dict(os.path.join(source, filename), validation="lax")
+
+
+def read_markups(args):
+    source, guids = args
+    results = []
+    archive = None if os.path.isdir(source) else zipfile.ZipFile(source)
+    try:
+        for guid in guids:
+            data, errors = read_xml(archive or source, os.path.join(guid, "markup.bcf"), "markup.xsd")
+            results.append((guid, data, [str(e) for e in errors]))
+    finally:
+        if archive:
+            archive.close()
+    return results
 
 
 @contextmanager
@@ -45,25 +76,53 @@ def cd(newdir):
 
 class BcfXml:
     def __init__(self):
+        self.zip_file = None
+        self.zip_names = set()
         self.filepath = None
+        self.markups = {}
         self.logger = logging.getLogger("bcfxml")
         self.author = "john@doe.com"
         self.project = bcf.v3.data.Project()
         self.version = "3.0"
         self.topics = {}
 
+    @property
+    def filepath(self):
+        if self._filepath is None and self.zip_file is not None:
+            self.extract_project()
+        return self._filepath
+
+    @filepath.setter
+    def filepath(self, filepath):
+        self._filepath = filepath
+
+    def open_project(self, zip_file):
+        self.close_project()
+        self.zip_file = zip_file
+        self.zip_names = set(zip_file.namelist())
+        self.markups = {}
+        self.topics = {}
+
+    def extract_project(self):
+        # Anything which writes to the project needs it on disk, otherwise it is read straight from the archive
+        self._filepath = tempfile.mkdtemp()
+        self.zip_file.extractall(self._filepath)
+        self.zip_file.close()
+        self.zip_file = None
+        self.zip_names = set()
+
     def new_project(self):
         self.project.project_id = str(uuid.uuid4())
         self.project.name = "New Project"
         self.topics = {}
-        if self.filepath:
-            self.close_project()
+        self.markups = {}
+        self.close_project()
         self.filepath = tempfile.mkdtemp()
         self.edit_project()
         self.edit_version()
 
     def get_project(self, filepath=None):
-        if os.path.isfile(os.path.join(self.filepath, "project.bcfp")):
+        if self._has_file("project.bcfp"):
             data = self._read_xml("project.bcfp", "project.xsd")
             self.project.project_id = data["Project"]["@ProjectId"]
             self.project.name = data["Project"].get("Name")
@@ -97,25 +156,56 @@ class BcfXml:
         with open(os.path.join(self.filepath, "bcf.version"), "wb") as f:
             f.write(self.document.toprettyxml(encoding="utf-8"))
 
-    def get_topics(self):
+    def get_topics(self, jobs=1, chunk_size=100):
         self.topics = {}
-        topics = []
-        subdirs = []
-        for (dirpath, dirnames, filenames) in os.walk(self.filepath):
-            subdirs = dirnames
-            break
+        guids = self.get_topic_guids()
+        if jobs != 1 and len(guids) > chunk_size:
+            self.read_markups(guids, jobs=jobs, chunk_size=chunk_size)
+        for guid in guids:
+            self.topics[guid] = self.get_topic(guid)
+        return self.topics
+
+    def get_topic_guids(self):
+        if self._filepath is None and self.zip_file is not None:
+            subdirs = dict.fromkeys(n.split("/")[0] for n in self.zip_file.namelist() if "/" in n.strip("/"))
+        else:
+            subdirs = []
+            for (dirpath, dirnames, filenames) in os.walk(self.filepath):
+                subdirs = dirnames
+                break
+        guids = []
         for subdir in subdirs:
             try:
                 uuid.UUID(subdir)
             except ValueError:
                 continue
-            if not os.path.exists(os.path.join(self.filepath, subdir, "markup.bcf")):
-                continue
-            self.topics[subdir] = self.get_topic(subdir)
-        return self.topics
+            if self._has_file(os.path.join(subdir, "markup.bcf")):
+                guids.append(subdir)
+        return guids
+
+    def read_markups(self, guids, jobs=None, chunk_size=100):
+        guids = [g for g in guids if g not in self.markups]
+        if self._filepath is None and self.zip_file is not None:
+            source = self.zip_file.filename
+        else:
+            source = self.filepath
+        chunks = [(source, guids[i : i + chunk_size]) for i in range(0, len(guids), chunk_size)]
+        with multiprocessing.Pool(jobs) as pool:
+            for results in pool.imap(read_markups, chunks):
+                for guid, data, errors in results:
+                    for error in errors:
+                        self.logger.error(error)
+                    self.markups[guid] = data
+        return self.markups
+
+    def get_markup(self, guid):
+        data = self.markups.get(guid)
+        if data is None:
+            data = self.markups[guid] = self._read_xml(os.path.join(guid, "markup.bcf"), "markup.xsd")
+        return data
 
     def get_header(self, guid):
-        data = self._read_xml(os.path.join(guid, "markup.bcf"), "markup.xsd")
+        data = self.get_markup(guid)
         if "Header" not in data:
             return
         header = bcf.v3.data.Header()
@@ -140,7 +230,7 @@ class BcfXml:
     def get_topic(self, guid):
         if guid in self.topics:
             return self.topics[guid]
-        data = self._read_xml(os.path.join(guid, "markup.bcf"), "markup.xsd")
+        data = self.get_markup(guid)
         topic = bcf.v3.data.Topic()
         self.topics[guid] = topic
 
@@ -304,6 +394,7 @@ class BcfXml:
         if topic.viewpoints:
             viewpoint_el = self._create_element(topic_el, "Viewpoints")
             self.write_viewpoints(topic.viewpoints, viewpoint_el, topic)
+        self.markups.pop(topic.guid, None)
         with open(os.path.join(self.filepath, topic.guid, "markup.bcf"), "wb") as f:
             f.write(self.document.toprettyxml(encoding="utf-8"))
 
@@ -382,6 +473,7 @@ class BcfXml:
     def delete_topic(self, guid):
         if guid in self.topics:
             del self.topics[guid]
+        self.markups.pop(guid, None)
         shutil.rmtree(os.path.join(self.filepath, guid))
 
     def write_viewpoints(self, viewpoints, root, topic):
@@ -647,7 +739,7 @@ class BcfXml:
         comments = {}
         if "Comments" not in data["Topics"]:
             return comments
-        data = self._read_xml(os.path.join(guid, "markup.bcf"), "markup.xsd")
+        data = self.get_markup(guid)
         for item in data["Topic"]["Comments"].get("Comment", []):
             comment = bcf.v3.data.Comment()
             mandatory_keys = {
@@ -677,7 +769,7 @@ class BcfXml:
         viewpoints = {}
         if "Viewpoints" not in data["Topic"]:
             return viewpoints
-        data = self._read_xml(os.path.join(guid, "markup.bcf"), "markup.xsd")
+        data = self.get_markup(guid)
         for item in data["Topic"]["Viewpoints"]:
             viewpoint = self.get_viewpoint(item, guid)
             viewpoints[viewpoint.guid] = viewpoint
@@ -819,12 +911,24 @@ class BcfXml:
         return component
 
     def close_project(self):
-        shutil.rmtree(self.filepath)
+        if self.zip_file is not None:
+            self.zip_file.close()
+            self.zip_file = None
+            self.zip_names = set()
+        if self._filepath:
+            shutil.rmtree(self._filepath)
+            self._filepath = None
+
+    def _has_file(self, filename):
+        if self._filepath is None and self.zip_file is not None:
+            return filename.replace(os.sep, "/") in self.zip_names
+        return os.path.isfile(os.path.join(self.filepath, filename))
 
     def _read_xml(self, filename, xsd):
-        schema = XMLSchema(os.path.join(cwd, "xsd", xsd))
-        filepath = os.path.join(self.filepath, filename)
-        (data, errors) = schema.to_dict(filepath, validation="lax")
+        if self._filepath is None and self.zip_file is not None:
+            (data, errors) = read_xml(self.zip_file, filename, xsd)
+        else:
+            (data, errors) = read_xml(self.filepath, filename, xsd)
         for error in errors:
             self.logger.error(error)
         return data
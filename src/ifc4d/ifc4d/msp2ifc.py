@@ -18,9 +18,9 @@
 # along with Ifc4D.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
-from datetime import timedelta
 import ifcopenshell
 import ifcopenshell.api
+import ifcopenshell.guid
 import ifcopenshell.util.date
 import xml.etree.ElementTree as ET
 
@@ -43,14 +43,30 @@ class MSP2Ifc:
         self.create_ifc()
 
     def parse_xml(self):
-        tree = ET.parse(self.xml)
-        project = tree.getroot()
-        self.ns = {"pr": project.tag[1:].partition("}")[0]}
-        self.project["Name"] = project.find("pr:Name", self.ns).text
+        # The XML is streamed so that only one task or calendar element is held in memory at a time
         self.outline_level = 0
         self.outline_parents = {}
-        self.parse_task_xml(project)
-        self.parse_calendar_xml(project)
+        path = []
+        for event, element in ET.iterparse(self.xml, events=("start", "end")):
+            if event == "start":
+                if self.ns is None:
+                    self.ns = {"pr": element.tag[1:].partition("}")[0]}
+                path.append(element)
+                continue
+            path.pop()
+            if len(path) == 1:
+                if self.get_tag(element) == "Name":
+                    self.project["Name"] = element.text
+                path[0].remove(element)
+            elif len(path) == 2:
+                if self.get_tag(path[1]) == "Tasks" and self.get_tag(element) == "Task":
+                    self.parse_task_xml(element)
+                elif self.get_tag(path[1]) == "Calendars" and self.get_tag(element) == "Calendar":
+                    self.parse_calendar_xml(element)
+                path[1].remove(element)
+
+    def get_tag(self, element):
+        return element.tag.rpartition("}")[2]
 
     def parse_relationship_xml(self, task):
         relationships = {}
@@ -64,68 +80,65 @@ class MSP2Ifc:
                 id += 1
         return relationships
 
-    def parse_task_xml(self, project):
-        for task in project.find("pr:Tasks", self.ns):
-            task_id = task.find("pr:UID", self.ns).text
-            task_index_level = task.find("pr:OutlineLevel", self.ns).text
-            wbs_id = task.find("pr:WBS", self.ns).text
-            relationships = self.parse_relationship_xml(task)
-            outline_level = int(task.find("pr:OutlineLevel", self.ns).text)
-
-            if outline_level != 0:
-                parent_task = self.tasks[self.outline_parents[outline_level - 1]]
-                parent_task["subtasks"].append(task_id)
-            self.outline_level = outline_level
-            self.outline_parents[outline_level] = task_id
-
-            self.tasks[task_id] = {
-                "Name": task.find("pr:Name", self.ns).text,
-                "OutlineNumber": task.find("pr:OutlineNumber", self.ns).text,
-                "OutlineLevel": outline_level,
-                "Start": datetime.datetime.fromisoformat(task.find("pr:Start", self.ns).text),
-                "Finish": datetime.datetime.fromisoformat(task.find("pr:Finish", self.ns).text),
-                "Duration": ifcopenshell.util.date.ifc2datetime(task.find("pr:Duration", self.ns).text),
-                "Priority": task.find("pr:Priority", self.ns).text,
-                "CalendarUID": task.find("pr:CalendarUID", self.ns).text,
-                "PredecessorTasks": relationships if relationships else None,
-                "subtasks": [],
-                "ifc": None,
-            }
-
-    def parse_calendar_xml(self, project):
-        for calendar in project.find("pr:Calendars", self.ns).findall("pr:Calendar", self.ns):
-            calendar_id = calendar.find("pr:UID", self.ns).text
-            week_days = []
-            for week_day in calendar.find("pr:WeekDays", self.ns).findall("pr:WeekDay", self.ns):
-                working_times = []
-                if week_day.find("pr:WorkingTimes", self.ns):
-                    for working_time in week_day.find("pr:WorkingTimes", self.ns).findall("pr:WorkingTime", self.ns):
-                        if working_time.find("pr:FromTime", self.ns) is None:
-                            continue
-                        working_times.append(
-                            {
-                                "Start": datetime.time.fromisoformat(working_time.find("pr:FromTime", self.ns).text),
-                                "Finish": datetime.time.fromisoformat(working_time.find("pr:ToTime", self.ns).text),
-                            }
-                        )
-                    week_days.append(
+    def parse_task_xml(self, task):
+        task_id = task.find("pr:UID", self.ns).text
+        relationships = self.parse_relationship_xml(task)
+        outline_level = int(task.find("pr:OutlineLevel", self.ns).text)
+
+        if outline_level != 0:
+            parent_task = self.tasks[self.outline_parents[outline_level - 1]]
+            parent_task["subtasks"].append(task_id)
+        self.outline_level = outline_level
+        self.outline_parents[outline_level] = task_id
+
+        self.tasks[task_id] = {
+            "Name": task.find("pr:Name", self.ns).text,
+            "OutlineNumber": task.find("pr:OutlineNumber", self.ns).text,
+            "OutlineLevel": outline_level,
+            "Start": datetime.datetime.fromisoformat(task.find("pr:Start", self.ns).text),
+            "Finish": datetime.datetime.fromisoformat(task.find("pr:Finish", self.ns).text),
+            "Duration": ifcopenshell.util.date.ifc2datetime(task.find("pr:Duration", self.ns).text),
+            "Priority": task.find("pr:Priority", self.ns).text,
+            "CalendarUID": task.find("pr:CalendarUID", self.ns).text,
+            "PredecessorTasks": relationships if relationships else None,
+            "subtasks": [],
+            "ifc": None,
+        }
+
+    def parse_calendar_xml(self, calendar):
+        calendar_id = calendar.find("pr:UID", self.ns).text
+        week_days = []
+        for week_day in calendar.find("pr:WeekDays", self.ns).findall("pr:WeekDay", self.ns):
+            working_times = []
+            if week_day.find("pr:WorkingTimes", self.ns):
+                for working_time in week_day.find("pr:WorkingTimes", self.ns).findall("pr:WorkingTime", self.ns):
+                    if working_time.find("pr:FromTime", self.ns) is None:
+                        continue
+                    working_times.append(
                         {
-                            "DayType": week_day.find("pr:DayType", self.ns).text,
-                            "WorkingTimes": working_times,
-                            "ifc": None,
+                            "Start": datetime.time.fromisoformat(working_time.find("pr:FromTime", self.ns).text),
+                            "Finish": datetime.time.fromisoformat(working_time.find("pr:ToTime", self.ns).text),
                         }
                     )
-            exceptions = {}
-            self.calendars[calendar_id] = {
-                "Name": calendar.find("pr:Name", self.ns).text,
-                "StandardWorkWeek": week_days,
-            }
+                week_days.append(
+                    {
+                        "DayType": week_day.find("pr:DayType", self.ns).text,
+                        "WorkingTimes": working_times,
+                        "ifc": None,
+                    }
+                )
+        self.calendars[calendar_id] = {
+            "Name": calendar.find("pr:Name", self.ns).text,
+            "StandardWorkWeek": week_days,
+        }
 
     def create_ifc(self):
         if not self.file:
             self.create_boilerplate_ifc()
         if not self.work_plan:
             self.work_plan = ifcopenshell.api.run("sequence.add_work_plan", self.file)
+        # Tasks and their relationships are created in bulk and share a single owner history
+        self.owner_history = ifcopenshell.api.run("owner.create_owner_history", self.file)
         work_schedule = self.create_work_schedule()
         self.create_tasks(work_schedule)
         self.create_calendars()
@@ -136,10 +149,12 @@ class MSP2Ifc:
         self.work_plan = self.file.create_entity("IfcWorkPlan")
 
     def create_tasks(self, work_schedule):
-        for task_id in self.tasks:
-            task = self.tasks[task_id]
+        root_tasks = []
+        for task in self.tasks.values():
             if task["OutlineLevel"] == 0:
-                self.create_task(task, work_schedule=work_schedule)
+                root_tasks.append(self.create_task(task))
+        if root_tasks:
+            self.create_rel("IfcRelAssignsToControl", RelatedObjects=root_tasks, RelatingControl=work_schedule)
 
     def create_work_schedule(self):
         return ifcopenshell.api.run(
@@ -149,83 +164,85 @@ class MSP2Ifc:
     def create_calendars(self):
         for calendar in self.calendars.values():
             calendar["ifc"] = ifcopenshell.api.run("sequence.add_work_calendar", self.file, name=calendar["Name"])
-            self.process_working_week(calendar["StandardWorkWeek"], calendar["ifc"])
-
-    def create_task(self, task, work_schedule=None, parent_task=None):
-        task["ifc"] = ifcopenshell.api.run(
-            "sequence.add_task",
-            self.file,
-            work_schedule=work_schedule if work_schedule else None,
-            parent_task=parent_task["ifc"] if parent_task else None,
+            working_times = self.process_working_week(calendar["StandardWorkWeek"])
+            if working_times:
+                calendar["ifc"].WorkingTimes = working_times
+
+    def create_task(self, task):
+        task["ifc"] = self.file.create_entity(
+            "IfcTask",
+            GlobalId=ifcopenshell.guid.new(),
+            OwnerHistory=self.owner_history,
+            Name=task["Name"],
+            Identification=task["OutlineNumber"],
+            IsMilestone=task["Start"] == task["Finish"],
+            PredefinedType="NOTDEFINED",
+            TaskTime=self.create_task_time(
+                task["Start"], task["Finish"], task["Duration"], "WORKTIME" if task["Duration"] else None
+            ),
         )
-        ifcopenshell.api.run(
-            "sequence.edit_task",
-            self.file,
-            task=task["ifc"],
-            attributes={
-                "Name": task["Name"],
-                "Identification": task["OutlineNumber"],
-                "IsMilestone": task["Start"] == task["Finish"],
-            },
+        subtasks = [self.create_task(self.tasks[subtask_id]) for subtask_id in task["subtasks"]]
+        if subtasks:
+            self.create_rel("IfcRelNests", RelatedObjects=subtasks, RelatingObject=task["ifc"])
+        return task["ifc"]
+
+    def create_task_time(self, start, finish, duration, duration_type):
+        # Equivalent to sequence.edit_task_time for a task which has no calendar and no sequences yet
+        if duration:
+            finish = start.date() + datetime.timedelta(days=duration.days)
+        else:
+            duration = datetime.timedelta(days=max((finish.date() - start.date()).days, 0))
+        return self.file.create_entity(
+            "IfcTaskTime",
+            DurationType=duration_type,
+            ScheduleStart=ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime"),
+            ScheduleFinish=ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime"),
+            ScheduleDuration=ifcopenshell.util.date.datetime2ifc(duration, "IfcDuration"),
         )
-        task_time = ifcopenshell.api.run("sequence.add_task_time", self.file, task=task["ifc"])
-        ifcopenshell.api.run(
-            "sequence.edit_task_time",
-            self.file,
-            task_time=task_time,
-            attributes={
-                "ScheduleStart": task["Start"],
-                "ScheduleFinish": task["Finish"],
-                "DurationType": "WORKTIME" if task["Duration"] else None,
-                "ScheduleDuration": task["Duration"] if task["Duration"] else None,
-            },
+
+    def create_rel(self, ifc_class, **attributes):
+        return self.file.create_entity(
+            ifc_class, GlobalId=ifcopenshell.guid.new(), OwnerHistory=self.owner_history, **attributes
         )
-        for subtask_id in task["subtasks"]:
-            self.create_task(self.tasks[subtask_id], parent_task=task)
 
-    def process_working_week(self, week, calendar):
+    def process_working_week(self, week):
+        results = []
         for day in week:
             if day["ifc"]:
                 continue
 
-            day["ifc"] = ifcopenshell.api.run(
-                "sequence.add_work_time", self.file, work_calendar=calendar, time_type="WorkingTimes"
-            )
-
-            weekday_component = [int(day["DayType"])]
+            days = [day]
             for day2 in week:
                 if day["DayType"] == day2["DayType"]:
                     continue
                 if day["WorkingTimes"] == day2["WorkingTimes"]:
-                    weekday_component.append(int(day2["DayType"]))
                     # Don't process the next day, as we can group it
-                    day2["ifc"] = day["ifc"]
-
-            work_time_name = "Weekdays: {}".format(", ".join([str(c) for c in sorted(weekday_component)]))
-            ifcopenshell.api.run(
-                "sequence.edit_work_time",
-                self.file,
-                work_time=day["ifc"],
-                attributes={"Name": work_time_name},
-            )
+                    days.append(day2)
+            weekday_component = sorted([int(d["DayType"]) for d in days])
 
-            recurrence = ifcopenshell.api.run(
-                "sequence.assign_recurrence_pattern", self.file, parent=day["ifc"], recurrence_type="WEEKLY"
+            work_time_name = "Weekdays: {}".format(", ".join([str(c) for c in weekday_component]))
+            recurrence = self.create_recurrence_pattern(
+                "WEEKLY", day["WorkingTimes"], WeekdayComponent=weekday_component
             )
-            ifcopenshell.api.run(
-                "sequence.edit_recurrence_pattern",
-                self.file,
-                recurrence_pattern=recurrence,
-                attributes={"WeekdayComponent": weekday_component},
+            work_time = self.file.create_entity("IfcWorkTime", Name=work_time_name, RecurrencePattern=recurrence)
+            for d in days:
+                d["ifc"] = work_time
+            results.append(work_time)
+        return results
+
+    def create_recurrence_pattern(self, recurrence_type, work_times, **components):
+        # Patterns are not shared between work times, as editing a pattern through the API would change them all
+        time_periods = [
+            self.file.create_entity(
+                "IfcTimePeriod",
+                StartTime=ifcopenshell.util.date.datetime2ifc(w["Start"], "IfcTime"),
+                EndTime=ifcopenshell.util.date.datetime2ifc(w["Finish"], "IfcTime"),
             )
-            for work_time in day["WorkingTimes"]:
-                ifcopenshell.api.run(
-                    "sequence.add_time_period",
-                    self.file,
-                    recurrence_pattern=recurrence,
-                    start_time=work_time["Start"],
-                    end_time=work_time["Finish"],
-                )
+            for w in work_times
+        ]
+        return self.file.create_entity(
+            "IfcRecurrencePattern", RecurrenceType=recurrence_type, TimePeriods=time_periods or None, **components
+        )
 
     def create_rel_sequences(self):
         self.sequence_type_map = {
@@ -235,20 +252,19 @@ class MSP2Ifc:
             "4": "FINISH_FINISH",
             "0": "NOTDEFINED",
         }
+        rel_sequences = {}
         for task in self.tasks.values():
             if not task["PredecessorTasks"]:
                 continue
             for predecessor in task["PredecessorTasks"].values():
-                rel_sequence = ifcopenshell.api.run(
-                    "sequence.assign_sequence",
-                    self.file,
-                    related_process=task["ifc"],
-                    relating_process=self.tasks[predecessor["PredecessorTask"]]["ifc"],
-                )
-                if predecessor["Type"]:
-                    ifcopenshell.api.run(
-                        "sequence.edit_sequence",
-                        self.file,
-                        rel_sequence=rel_sequence,
-                        attributes={"SequenceType": self.sequence_type_map[predecessor["Type"]]},
+                relating_process = self.tasks[predecessor["PredecessorTask"]]["ifc"]
+                rel_sequence = rel_sequences.get((relating_process, task["ifc"]))
+                if not rel_sequence:
+                    rel_sequence = rel_sequences[(relating_process, task["ifc"])] = self.create_rel(
+                        "IfcRelSequence",
+                        RelatingProcess=relating_process,
+                        RelatedProcess=task["ifc"],
+                        SequenceType="FINISH_START",
                     )
+                if predecessor["Type"]:
+                    rel_sequence.SequenceType = self.sequence_type_map[predecessor["Type"]]
@@ -17,11 +17,12 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with Ifc4D.  If not, see <http://www.gnu.org/licenses/>.
 
-import math
 import datetime
 import ifcopenshell
 import ifcopenshell.api
+import ifcopenshell.guid
 import ifcopenshell.util.date
+import ifcopenshell.util.sequence
 import xml.etree.ElementTree as ET
 
 
@@ -51,127 +52,134 @@ class P62Ifc:
         self.create_ifc()
 
     def parse_xml(self):
-        tree = ET.parse(self.xml)
-        root = tree.getroot()
-        self.ns = {"pr": root.tag[1:].partition("}")[0]}
-        project = root.find("pr:Project", self.ns)
-        self.project["Name"] = project.find("pr:Name", self.ns).text
-        self.parse_calendar_xml(root)
-        self.parse_calendar_xml(project)
-        self.parse_wbs_xml(project)
-        self.parse_activity_xml(project)
-        self.parse_relationship_xml(project)
-
-    def parse_calendar_xml(self, project):
-        for calendar in project.findall("pr:Calendar", self.ns):
-            calendar_id = calendar.find("pr:ObjectId", self.ns).text
-            standard_work_week = []
-            for standard_work_hour in calendar.find("pr:StandardWorkWeek", self.ns).findall(
-                "pr:StandardWorkHours", self.ns
-            ):
-                work_times = []
-                for work_time in standard_work_hour.findall("pr:WorkTime", self.ns):
-                    if work_time.find("pr:Start", self.ns) is None:
-                        continue
-                    work_times.append(
-                        {
-                            "Start": datetime.time.fromisoformat(work_time.find("pr:Start", self.ns).text),
-                            "Finish": datetime.time.fromisoformat(work_time.find("pr:Finish", self.ns).text),
-                        }
-                    )
-                standard_work_week.append(
-                    {
-                        "DayOfWeek": standard_work_hour.find("pr:DayOfWeek", self.ns).text,
-                        "WorkTimes": work_times,
-                        "ifc": None,
-                    }
-                )
-            exceptions = {}
-            holiday_or_exceptions = calendar.find("pr:HolidayOrExceptions", self.ns)
-            holiday_or_exception = []
-            if holiday_or_exceptions is not None:
-                holiday_or_exception = holiday_or_exceptions.findall("pr:HolidayOrException", self.ns)
-            for exception in holiday_or_exception:
-                d = datetime.datetime.fromisoformat(exception.find("pr:Date", self.ns).text).date()
-                month = exceptions.setdefault(d.year, {}).setdefault(d.month, {})
-                month.setdefault("FullDay", [])
-                month.setdefault("WorkTime", [])
-                work_times = []
-                for work_time in exception.findall("pr:WorkTime", self.ns):
-                    if work_time.find("pr:Start", self.ns) is None:
-                        continue
-                    work_times.append(
-                        {
-                            "Start": datetime.time.fromisoformat(work_time.find("pr:Start", self.ns).text),
-                            "Finish": datetime.time.fromisoformat(work_time.find("pr:Finish", self.ns).text),
-                        }
-                    )
-                if work_times:
-                    exceptions[d.year][d.month]["WorkTime"].append({"Day": d.day, "WorkTimes": work_times, "ifc": None})
-                else:
-                    exceptions[d.year][d.month]["FullDay"].append(d.day)
-            self.calendars[calendar_id] = {
-                "Name": calendar.find("pr:Name", self.ns).text,
-                "Type": calendar.find("pr:Type", self.ns).text,
-                "HoursPerDay": calendar.find("pr:HoursPerDay", self.ns).text,
-                "StandardWorkWeek": standard_work_week,
-                "HolidayOrExceptions": exceptions,
-            }
-
-    def parse_wbs_xml(self, project):
-        for wbs in project.findall("pr:WBS", self.ns):
-            self.wbs[wbs.find("pr:ObjectId", self.ns).text] = {
-                "Name": wbs.find("pr:Name", self.ns).text,
-                "Code": wbs.find("pr:Code", self.ns).text,
-                "ParentObjectId": wbs.find("pr:ParentObjectId", self.ns).text,
-                "ifc": None,
-                "rel": None,
-                "activities": [],
-            }
-
-    def parse_activity_xml(self, project):
-        for activity in project.findall("pr:Activity", self.ns):
-            activity_type = activity.find("pr:Type", self.ns).text
-            if activity_type == "Level of Effort":
+        # The XML is streamed so that only one calendar, WBS, activity or relationship element is held in memory at a
+        # time. Global calendars are direct children of the root, everything else is read from the first project.
+        self.ns = None
+        path = []
+        projects = 0
+        for event, element in ET.iterparse(self.xml, events=("start", "end")):
+            if event == "start":
+                if self.ns is None:
+                    self.ns = {"pr": element.tag[1:].partition("}")[0]}
+                if len(path) == 1 and self.get_tag(element) == "Project":
+                    projects += 1
+                path.append(element)
                 continue
-            activity_id = activity.find("pr:ObjectId", self.ns).text
-            wbs_id = activity.find("pr:WBSObjectId", self.ns).text
-            if wbs_id:
-                self.wbs[wbs_id]["activities"].append(activity_id)
+            path.pop()
+            if len(path) == 1:
+                if self.get_tag(element) == "Calendar":
+                    self.parse_calendar_xml(element)
+                path[0].remove(element)
+            elif len(path) == 2 and self.get_tag(path[1]) == "Project":
+                if projects == 1:
+                    self.parse_project_xml(element)
+                path[1].remove(element)
+
+    def get_tag(self, element):
+        return element.tag.rpartition("}")[2]
+
+    def parse_project_xml(self, element):
+        tag = self.get_tag(element)
+        if tag == "Name":
+            self.project["Name"] = element.text
+        elif tag == "Calendar":
+            self.parse_calendar_xml(element)
+        elif tag == "WBS":
+            self.parse_wbs_xml(element)
+        elif tag == "Activity":
+            self.parse_activity_xml(element)
+        elif tag == "Relationship":
+            self.parse_relationship_xml(element)
+
+    def parse_calendar_xml(self, calendar):
+        calendar_id = calendar.find("pr:ObjectId", self.ns).text
+        standard_work_week = []
+        standard_work_week_xml = calendar.find("pr:StandardWorkWeek", self.ns)
+        for standard_work_hour in standard_work_week_xml.findall("pr:StandardWorkHours", self.ns):
+            standard_work_week.append(
+                {
+                    "DayOfWeek": standard_work_hour.find("pr:DayOfWeek", self.ns).text,
+                    "WorkTimes": self.parse_work_time_xml(standard_work_hour),
+                    "ifc": None,
+                }
+            )
+        exceptions = {}
+        holiday_or_exceptions = calendar.find("pr:HolidayOrExceptions", self.ns)
+        holiday_or_exception = []
+        if holiday_or_exceptions is not None:
+            holiday_or_exception = holiday_or_exceptions.findall("pr:HolidayOrException", self.ns)
+        for exception in holiday_or_exception:
+            d = datetime.datetime.fromisoformat(exception.find("pr:Date", self.ns).text).date()
+            month = exceptions.setdefault(d.year, {}).setdefault(d.month, {})
+            month.setdefault("FullDay", [])
+            month.setdefault("WorkTime", [])
+            work_times = self.parse_work_time_xml(exception)
+            if work_times:
+                exceptions[d.year][d.month]["WorkTime"].append({"Day": d.day, "WorkTimes": work_times, "ifc": None})
             else:
-                self.root_activites.append(activity_id)
-            self.activities[activity_id] = {
-                "Name": activity.find("pr:Name", self.ns).text,
-                "Identification": activity.find("pr:Id", self.ns).text,
-                "StartDate": datetime.datetime.fromisoformat(activity.find("pr:StartDate", self.ns).text),
-                "FinishDate": datetime.datetime.fromisoformat(activity.find("pr:FinishDate", self.ns).text),
-                "PlannedDuration": activity.find("pr:PlannedDuration", self.ns).text,
-                "Status": activity.find("pr:Status", self.ns).text,
-                "CalendarObjectId": activity.find("pr:CalendarObjectId", self.ns).text,
-                "ifc": None,
-            }
-
-    def parse_relationship_xml(self, project):
-        for relationship in project.findall("pr:Relationship", self.ns):
-            predecessor = relationship.find("pr:PredecessorActivityObjectId", self.ns).text
-            successor = relationship.find("pr:SuccessorActivityObjectId", self.ns).text
-            if predecessor not in self.activities or successor not in self.activities:
+                exceptions[d.year][d.month]["FullDay"].append(d.day)
+        self.calendars[calendar_id] = {
+            "Name": calendar.find("pr:Name", self.ns).text,
+            "Type": calendar.find("pr:Type", self.ns).text,
+            "HoursPerDay": calendar.find("pr:HoursPerDay", self.ns).text,
+            "StandardWorkWeek": standard_work_week,
+            "HolidayOrExceptions": exceptions,
+        }
+
+    def parse_work_time_xml(self, element):
+        work_times = []
+        for work_time in element.findall("pr:WorkTime", self.ns):
+            if work_time.find("pr:Start", self.ns) is None:
                 continue
-            self.relationships[relationship.find("pr:ObjectId", self.ns).text] = {
-                "PredecessorActivity": predecessor,
-                "SuccessorActivity": successor,
-                "Type": relationship.find("pr:Type", self.ns).text,
-                "Lag": relationship.find("pr:Lag", self.ns).text,
-            }
+            work_times.append(
+                {
+                    "Start": datetime.time.fromisoformat(work_time.find("pr:Start", self.ns).text),
+                    "Finish": datetime.time.fromisoformat(work_time.find("pr:Finish", self.ns).text),
+                }
+            )
+        return work_times
+
+    def parse_wbs_xml(self, wbs):
+        self.wbs[wbs.find("pr:ObjectId", self.ns).text] = {
+            "Name": wbs.find("pr:Name", self.ns).text,
+            "Code": wbs.find("pr:Code", self.ns).text,
+            "ParentObjectId": wbs.find("pr:ParentObjectId", self.ns).text,
+            "ifc": None,
+            "activities": [],
+        }
 
-    def get_wbs(self, wbs):
-        return {"Name": wbs.find("pr:Name", self.ns).text, "subtasks": []}
+    def parse_activity_xml(self, activity):
+        activity_type = activity.find("pr:Type", self.ns).text
+        if activity_type == "Level of Effort":
+            return
+        self.activities[activity.find("pr:ObjectId", self.ns).text] = {
+            "Name": activity.find("pr:Name", self.ns).text,
+            "Identification": activity.find("pr:Id", self.ns).text,
+            "StartDate": datetime.datetime.fromisoformat(activity.find("pr:StartDate", self.ns).text),
+            "FinishDate": datetime.datetime.fromisoformat(activity.find("pr:FinishDate", self.ns).text),
+            "PlannedDuration": activity.find("pr:PlannedDuration", self.ns).text,
+            "Status": activity.find("pr:Status", self.ns).text,
+            "CalendarObjectId": activity.find("pr:CalendarObjectId", self.ns).text,
+            "WBSObjectId": activity.find("pr:WBSObjectId", self.ns).text,
+            "ifc": None,
+        }
+
+    def parse_relationship_xml(self, relationship):
+        # Activities may only be streamed in after their relationships, so unknown activities are skipped later
+        self.relationships[relationship.find("pr:ObjectId", self.ns).text] = {
+            "PredecessorActivity": relationship.find("pr:PredecessorActivityObjectId", self.ns).text,
+            "SuccessorActivity": relationship.find("pr:SuccessorActivityObjectId", self.ns).text,
+            "Type": relationship.find("pr:Type", self.ns).text,
+            "Lag": relationship.find("pr:Lag", self.ns).text,
+        }
 
     def create_ifc(self):
         if not self.file:
-            self.file = self.create_boilerplate_ifc()
+            self.create_boilerplate_ifc()
         if not self.work_plan:
             self.work_plan = ifcopenshell.api.run("sequence.add_work_plan", self.file)
+        # Tasks and their relationships are created in bulk and share a single owner history
+        self.owner_history = ifcopenshell.api.run("owner.create_owner_history", self.file)
         work_schedule = self.create_work_schedule()
         self.create_calendars()
         self.create_tasks(work_schedule)
@@ -187,207 +195,207 @@ class P62Ifc:
             calendar["ifc"] = ifcopenshell.api.run(
                 "sequence.add_work_calendar", self.file, name=calendar["Name"], predefined_type=calendar["Type"]
             )
-            self.process_working_week(calendar["StandardWorkWeek"], calendar["ifc"])
-            self.process_exceptions(calendar["HolidayOrExceptions"], calendar["ifc"])
+            working_times = self.process_working_week(calendar["StandardWorkWeek"])
+            if working_times:
+                calendar["ifc"].WorkingTimes = working_times
+            exception_times = self.process_exceptions(calendar["HolidayOrExceptions"])
+            if exception_times:
+                calendar["ifc"].ExceptionTimes = exception_times
+        ifcopenshell.util.sequence.clear_calendar_indices(self.file)
 
-    def process_working_week(self, week, calendar):
+    def process_working_week(self, week):
+        results = []
         for day in week:
             if day["ifc"] or not day["WorkTimes"]:
                 continue
 
-            day["ifc"] = ifcopenshell.api.run(
-                "sequence.add_work_time", self.file, work_calendar=calendar, time_type="WorkingTimes"
-            )
-
-            weekday_component = [self.day_map[day["DayOfWeek"]]]
+            days = [day]
             for day2 in week:
                 if day["DayOfWeek"] == day2["DayOfWeek"]:
                     continue
                 if day["WorkTimes"] == day2["WorkTimes"]:
-                    weekday_component.append(self.day_map[day2["DayOfWeek"]])
                     # Don't process the next day, as we can group it
-                    day2["ifc"] = day["ifc"]
-
-            work_time_name = "Weekdays: {}".format(", ".join([str(c) for c in sorted(weekday_component)]))
-            ifcopenshell.api.run(
-                "sequence.edit_work_time",
-                self.file,
-                work_time=day["ifc"],
-                attributes={"Name": work_time_name},
-            )
+                    days.append(day2)
+            weekday_component = sorted([self.day_map[d["DayOfWeek"]] for d in days])
 
-            recurrence = ifcopenshell.api.run(
-                "sequence.assign_recurrence_pattern", self.file, parent=day["ifc"], recurrence_type="WEEKLY"
-            )
-            ifcopenshell.api.run(
-                "sequence.edit_recurrence_pattern",
-                self.file,
-                recurrence_pattern=recurrence,
-                attributes={"WeekdayComponent": weekday_component},
-            )
-            for work_time in day["WorkTimes"]:
-                ifcopenshell.api.run(
-                    "sequence.add_time_period",
-                    self.file,
-                    recurrence_pattern=recurrence,
-                    start_time=work_time["Start"],
-                    end_time=work_time["Finish"],
-                )
+            work_time_name = "Weekdays: {}".format(", ".join([str(c) for c in weekday_component]))
+            recurrence = self.create_recurrence_pattern("WEEKLY", day["WorkTimes"], WeekdayComponent=weekday_component)
+            work_time = self.create_work_time(work_time_name, recurrence)
+            for d in days:
+                d["ifc"] = work_time
+            results.append(work_time)
+        return results
 
-    def process_exceptions(self, exceptions, calendar):
+    def process_exceptions(self, exceptions):
+        results = []
         for year, year_data in exceptions.items():
             for month, month_data in year_data.items():
                 if month_data["FullDay"]:
-                    self.process_full_day_exceptions(year, month, month_data, calendar)
+                    results.append(self.process_full_day_exceptions(year, month, month_data))
                 if month_data["WorkTime"]:
-                    self.process_work_time_exceptions(year, month, month_data, calendar)
+                    results.extend(self.process_work_time_exceptions(year, month, month_data))
+        return results
 
-    def process_full_day_exceptions(self, year, month, month_data, calendar):
-        work_time = ifcopenshell.api.run(
-            "sequence.add_work_time", self.file, work_calendar=calendar, time_type="ExceptionTimes"
-        )
-        ifcopenshell.api.run(
-            "sequence.edit_work_time",
-            self.file,
-            work_time=work_time,
-            attributes={
-                "Name": f"{year}-{month}",
-                "Start": datetime.date(year, 1, 1),
-                "Finish": datetime.date(year, 12, 31),
-            },
-        )
-        recurrence = ifcopenshell.api.run(
-            "sequence.assign_recurrence_pattern",
-            self.file,
-            parent=work_time,
-            recurrence_type="YEARLY_BY_DAY_OF_MONTH",
+    def process_full_day_exceptions(self, year, month, month_data):
+        recurrence = self.create_recurrence_pattern(
+            "YEARLY_BY_DAY_OF_MONTH", [], DayComponent=sorted(month_data["FullDay"]), MonthComponent=[month]
         )
-        ifcopenshell.api.run(
-            "sequence.edit_recurrence_pattern",
-            self.file,
-            recurrence_pattern=recurrence,
-            attributes={"DayComponent": month_data["FullDay"], "MonthComponent": [month]},
+        return self.create_work_time(
+            f"{year}-{month}", recurrence, start=datetime.date(year, 1, 1), finish=datetime.date(year, 12, 31)
         )
 
-    def process_work_time_exceptions(self, year, month, month_data, calendar):
+    def process_work_time_exceptions(self, year, month, month_data):
+        results = []
         for day in month_data["WorkTime"]:
             if day["ifc"]:
                 continue
 
-            day["ifc"] = ifcopenshell.api.run(
-                "sequence.add_work_time", self.file, work_calendar=calendar, time_type="ExceptionTimes"
-            )
-
-            day_component = [day["Day"]]
+            days = [day]
             for day2 in month_data["WorkTime"]:
                 if day["Day"] == day2["Day"]:
                     continue
                 if day["WorkTimes"] == day2["WorkTimes"]:
-                    day_component.append(day2["Day"])
                     # Don't process the next day, as we can group it
-                    day2["ifc"] = day["ifc"]
-
-            ifcopenshell.api.run(
-                "sequence.edit_work_time",
-                self.file,
-                work_time=day["ifc"],
-                attributes={
-                    "Name": "{}-{}-{}".format(year, month, ", ".join([str(d) for d in day_component])),
-                    "Start": datetime.date(year, 1, 1),
-                    "Finish": datetime.date(year, 12, 31),
-                },
+                    days.append(day2)
+            day_component = [d["Day"] for d in days]
+
+            recurrence = self.create_recurrence_pattern(
+                "YEARLY_BY_DAY_OF_MONTH", day["WorkTimes"], DayComponent=sorted(day_component), MonthComponent=[month]
             )
-            recurrence = ifcopenshell.api.run(
-                "sequence.assign_recurrence_pattern",
-                self.file,
-                parent=day["ifc"],
-                recurrence_type="YEARLY_BY_DAY_OF_MONTH",
+            work_time = self.create_work_time(
+                "{}-{}-{}".format(year, month, ", ".join([str(d) for d in day_component])),
+                recurrence,
+                start=datetime.date(year, 1, 1),
+                finish=datetime.date(year, 12, 31),
             )
-            ifcopenshell.api.run(
-                "sequence.edit_recurrence_pattern",
-                self.file,
-                recurrence_pattern=recurrence,
-                attributes={"DayComponent": day_component, "MonthComponent": [month]},
+            for d in days:
+                d["ifc"] = work_time
+            results.append(work_time)
+        return results
+
+    def create_recurrence_pattern(self, recurrence_type, work_times, **components):
+        # Patterns are not shared between work times, as editing a pattern through the API would change them all
+        time_periods = [
+            self.file.create_entity(
+                "IfcTimePeriod",
+                StartTime=ifcopenshell.util.date.datetime2ifc(w["Start"], "IfcTime"),
+                EndTime=ifcopenshell.util.date.datetime2ifc(w["Finish"], "IfcTime"),
             )
-            for work_time in day["WorkTimes"]:
-                ifcopenshell.api.run(
-                    "sequence.add_time_period",
-                    self.file,
-                    recurrence_pattern=recurrence,
-                    start_time=work_time["Start"],
-                    end_time=work_time["Finish"],
-                )
+            for w in work_times
+        ]
+        return self.file.create_entity(
+            "IfcRecurrencePattern", RecurrenceType=recurrence_type, TimePeriods=time_periods or None, **components
+        )
+
+    def create_work_time(self, name, recurrence, start=None, finish=None):
+        return self.file.create_entity(
+            "IfcWorkTime",
+            Name=name,
+            RecurrencePattern=recurrence,
+            Start=ifcopenshell.util.date.datetime2ifc(start, "IfcDate") if start else None,
+            Finish=ifcopenshell.util.date.datetime2ifc(finish, "IfcDate") if finish else None,
+        )
 
     def create_tasks(self, work_schedule):
+        self.root_activites = []
+        for activity in self.activities.values():
+            if activity["WBSObjectId"]:
+                self.wbs[activity["WBSObjectId"]]["activities"].append(activity)
+            else:
+                self.root_activites.append(activity)
+
+        root_tasks = []
+        nested_tasks = {}
         for wbs in self.wbs.values():
-            self.create_task_from_wbs(wbs, work_schedule)
-        for activity_id in self.root_activites:
-            self.create_task_from_activity(self.activities[activity_id], None, work_schedule)
-
-    def create_task_from_wbs(self, wbs, work_schedule):
-        wbs["ifc"] = ifcopenshell.api.run(
-            "sequence.add_task",
-            self.file,
-            work_schedule=None if wbs["ParentObjectId"] else work_schedule,
-            parent_task=self.wbs[wbs["ParentObjectId"]]["ifc"] if wbs["ParentObjectId"] else None,
-        )
+            self.create_task_from_wbs(wbs)
+        for activity in self.root_activites:
+            self.create_task_from_activity(activity)
+        for wbs in self.wbs.values():
+            nested_tasks[wbs["ifc"]] = [activity["ifc"] for activity in wbs["activities"]]
+        for wbs in self.wbs.values():
+            if wbs["ParentObjectId"] in self.wbs:
+                nested_tasks[self.wbs[wbs["ParentObjectId"]]["ifc"]].append(wbs["ifc"])
+            else:
+                root_tasks.append(wbs["ifc"])
+        root_tasks.extend(activity["ifc"] for activity in self.root_activites)
+
+        if root_tasks:
+            self.create_rel("IfcRelAssignsToControl", RelatedObjects=root_tasks, RelatingControl=work_schedule)
+        for parent_task, tasks in nested_tasks.items():
+            if tasks:
+                self.create_rel("IfcRelNests", RelatedObjects=tasks, RelatingObject=parent_task)
+
+        calendar_tasks = {}
+        for activity in self.activities.values():
+            calendar_tasks.setdefault(activity["CalendarObjectId"], []).append(activity["ifc"])
+        for calendar_id, tasks in calendar_tasks.items():
+            self.create_rel(
+                "IfcRelAssignsToControl", RelatedObjects=tasks, RelatingControl=self.calendars[calendar_id]["ifc"]
+            )
+
+    def create_task_from_wbs(self, wbs):
+        if wbs["ifc"]:
+            return wbs["ifc"]
         identification = wbs["Code"]
-        if wbs["ParentObjectId"]:
-            identification = self.wbs[wbs["ParentObjectId"]]["ifc"].Identification + "." + wbs["Code"]
-        ifcopenshell.api.run(
-            "sequence.edit_task",
-            self.file,
-            task=wbs["ifc"],
-            attributes={"Name": wbs["Name"], "Identification": identification},
-        )
-        for activity_id in wbs["activities"]:
-            self.create_task_from_activity(self.activities[activity_id], wbs, None)
-
-    def create_task_from_activity(self, activity, wbs, work_schedule):
-        activity["ifc"] = ifcopenshell.api.run(
-            "sequence.add_task",
-            self.file,
-            work_schedule=None if wbs else work_schedule,
-            parent_task=wbs["ifc"] if wbs else None,
-        )
-        ifcopenshell.api.run(
-            "sequence.edit_task",
-            self.file,
-            task=activity["ifc"],
-            attributes={
-                "Name": activity["Name"],
-                "Identification": activity["Identification"],
-                "Status": activity["Status"],
-                "IsMilestone": activity["StartDate"] == activity["FinishDate"],
-                "PredefinedType": "CONSTRUCTION"
-            },
-        )
-        task_time = ifcopenshell.api.run("sequence.add_task_time", self.file, task=activity["ifc"])
+        if wbs["ParentObjectId"] in self.wbs:
+            parent_task = self.create_task_from_wbs(self.wbs[wbs["ParentObjectId"]])
+            identification = parent_task.Identification + "." + wbs["Code"]
+        wbs["ifc"] = self.create_task(Name=wbs["Name"], Identification=identification)
+        for activity in wbs["activities"]:
+            self.create_task_from_activity(activity)
+        return wbs["ifc"]
+
+    def create_task_from_activity(self, activity):
         calendar = self.calendars[activity["CalendarObjectId"]]
-        # Seems intermittently crashy - can we investigate for larger files?
-        ifcopenshell.api.run(
-            "control.assign_control",
-            self.file,
-            **{
-                "relating_control": calendar["ifc"],
-                "related_object": activity["ifc"],
-            },
+        duration = None
+        if activity["PlannedDuration"]:
+            duration = datetime.timedelta(days=float(activity["PlannedDuration"]) / float(calendar["HoursPerDay"]))
+        activity["ifc"] = self.create_task(
+            Name=activity["Name"],
+            Identification=activity["Identification"],
+            Status=activity["Status"],
+            IsMilestone=activity["StartDate"] == activity["FinishDate"],
+            PredefinedType="CONSTRUCTION",
+            TaskTime=self.create_task_time(
+                activity["StartDate"],
+                activity["FinishDate"],
+                duration or None,
+                "WORKTIME" if activity["PlannedDuration"] else None,
+                calendar["ifc"],
+            ),
         )
-        ifcopenshell.api.run(
-            "sequence.edit_task_time",
-            self.file,
-            task_time=task_time,
-            attributes={
-                "ScheduleStart": activity["StartDate"],
-                "ScheduleFinish": activity["FinishDate"],
-                "DurationType": "WORKTIME" if activity["PlannedDuration"] else None,
-                "ScheduleDuration": datetime.timedelta(
-                    days=float(activity["PlannedDuration"]) / float(calendar["HoursPerDay"])
+
+    def create_task(self, **attributes):
+        attributes.setdefault("IsMilestone", False)
+        attributes.setdefault("PredefinedType", "NOTDEFINED")
+        return self.file.create_entity(
+            "IfcTask", GlobalId=ifcopenshell.guid.new(), OwnerHistory=self.owner_history, **attributes
+        )
+
+    def create_task_time(self, start, finish, duration, duration_type, calendar):
+        # Equivalent to sequence.edit_task_time, without cascading a schedule which has no sequences yet
+        start = ifcopenshell.util.sequence.get_soonest_working_day(start, duration_type, calendar)
+        if duration:
+            finish = ifcopenshell.util.sequence.get_finish_date(start, duration, duration_type, calendar)
+        else:
+            finish = ifcopenshell.util.sequence.get_soonest_working_day(finish, duration_type, calendar)
+            if duration_type == "ELAPSEDTIME" or not calendar:
+                duration = datetime.timedelta(days=max((finish.date() - start.date()).days, 0))
+            else:
+                duration = datetime.timedelta(
+                    days=ifcopenshell.util.sequence.count_working_days(start, finish, calendar)
                 )
-                or None
-                if activity["PlannedDuration"]
-                else None,
-            },
+        return self.file.create_entity(
+            "IfcTaskTime",
+            DurationType=duration_type,
+            ScheduleStart=ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime"),
+            ScheduleFinish=ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime"),
+            ScheduleDuration=ifcopenshell.util.date.datetime2ifc(duration, "IfcDuration"),
+        )
+
+    def create_rel(self, ifc_class, **attributes):
+        return self.file.create_entity(
+            ifc_class, GlobalId=ifcopenshell.guid.new(), OwnerHistory=self.owner_history, **attributes
         )
 
     def create_rel_sequences(self):
@@ -397,28 +405,26 @@ class P62Ifc:
             "Finish to Start": "FINISH_START",
             "Finish to Finish": "FINISH_FINISH",
         }
+        rel_sequences = {}
         for relationship in self.relationships.values():
-            rel_sequence = ifcopenshell.api.run(
-                "sequence.assign_sequence",
-                self.file,
-                relating_process=self.activities[relationship["PredecessorActivity"]]["ifc"],
-                related_process=self.activities[relationship["SuccessorActivity"]]["ifc"],
-            )
-            ifcopenshell.api.run(
-                "sequence.edit_sequence",
-                self.file,
-                rel_sequence=rel_sequence,
-                attributes={"SequenceType": self.sequence_type_map[relationship["Type"]]},
-            )
+            predecessor = self.activities.get(relationship["PredecessorActivity"])
+            successor = self.activities.get(relationship["SuccessorActivity"])
+            if not predecessor or not successor:
+                continue
+            rel_sequence = rel_sequences.get((predecessor["ifc"], successor["ifc"]))
+            if not rel_sequence:
+                rel_sequence = rel_sequences[(predecessor["ifc"], successor["ifc"])] = self.create_rel(
+                    "IfcRelSequence", RelatingProcess=predecessor["ifc"], RelatedProcess=successor["ifc"]
+                )
+            rel_sequence.SequenceType = self.sequence_type_map[relationship["Type"]]
             lag = float(relationship["Lag"])
             if lag:
-                calendar = self.calendars[self.activities[relationship["PredecessorActivity"]]["CalendarObjectId"]]
-                ifcopenshell.api.run(
-                    "sequence.assign_lag_time",
-                    self.file,
-                    rel_sequence=rel_sequence,
-                    lag_value=datetime.timedelta(days=lag / float(calendar["HoursPerDay"])),
-                    duration_type="WORKTIME",
+                calendar = self.calendars[predecessor["CalendarObjectId"]]
+                lag_value = datetime.timedelta(days=lag / float(calendar["HoursPerDay"]))
+                rel_sequence.TimeLag = self.file.create_entity(
+                    "IfcLagTime",
+                    DurationType="WORKTIME",
+                    LagValue=self.file.createIfcDuration(ifcopenshell.util.date.datetime2ifc(lag_value, "IfcDuration")),
                 )
 
     def create_boilerplate_ifc(self):
@@ -19,6 +19,7 @@
 import csv
 import ifcopenshell
 import ifcopenshell.api
+import ifcopenshell.guid
 import ifcopenshell.util.unit
 
 
@@ -90,59 +91,87 @@ class Csv2Ifc:
             self.cost_schedule = ifcopenshell.api.run("cost.add_cost_schedule", self.file, name="CSV Import")
             if self.is_schedule_of_rates:
                 self.cost_schedule.PredefinedType = "SCHEDULEOFRATES"
+        # The whole tree shares one owner history and one relationship per parent, instead of
+        # going through the cost API once per row
+        self.owner_history = ifcopenshell.api.run("owner.create_owner_history", self.file)
         self.create_cost_items(self.cost_items)
 
     def create_cost_items(self, cost_items, parent=None):
+        if not cost_items:
+            return
         for cost_item in cost_items:
-            self.create_cost_item(cost_item, parent)
-
-    def create_cost_item(self, cost_item, parent):
+            self.create_cost_item(cost_item)
+        related_objects = [cost_item["ifc"] for cost_item in cost_items]
         if parent is None:
-            cost_item["ifc"] = ifcopenshell.api.run("cost.add_cost_item", self.file, cost_schedule=self.cost_schedule)
+            self.file.create_entity(
+                "IfcRelAssignsToControl",
+                GlobalId=ifcopenshell.guid.new(),
+                OwnerHistory=self.owner_history,
+                RelatedObjects=related_objects,
+                RelatingControl=self.cost_schedule,
+            )
         else:
-            cost_item["ifc"] = ifcopenshell.api.run("cost.add_cost_item", self.file, cost_item=parent)
-
-        cost_item["ifc"].Name = cost_item["Name"]
+            self.file.create_entity(
+                "IfcRelNests",
+                GlobalId=ifcopenshell.guid.new(),
+                OwnerHistory=self.owner_history,
+                RelatedObjects=related_objects,
+                RelatingObject=parent,
+            )
+        for cost_item in cost_items:
+            self.create_cost_items(cost_item["children"], cost_item["ifc"])
+
+    def create_cost_item(self, cost_item):
+        cost_item["ifc"] = self.file.create_entity(
+            "IfcCostItem",
+            GlobalId=ifcopenshell.guid.new(),
+            OwnerHistory=self.owner_history,
+            Name=cost_item["Name"],
+        )
         cost_item["ifc"].Identification = cost_item["Identification"]
 
+        cost_values = []
         if not cost_item["CostValues"]:
             if not self.is_schedule_of_rates:
-                cost_value = ifcopenshell.api.run("cost.add_cost_value", self.file, parent=cost_item["ifc"])
-                cost_value.Category = "*"
+                cost_values.append(self.file.create_entity("IfcCostValue", Category="*"))
         elif self.has_categories:
             for category, value in cost_item["CostValues"].items():
-                cost_value = ifcopenshell.api.run("cost.add_cost_value", self.file, parent=cost_item["ifc"])
+                cost_value = self.file.create_entity("IfcCostValue", Category=category)
                 cost_value.AppliedValue = self.file.createIfcMonetaryMeasure(value)
-                cost_value.Category = category
+                cost_values.append(cost_value)
         else:
-            cost_value = ifcopenshell.api.run("cost.add_cost_value", self.file, parent=cost_item["ifc"])
+            cost_value = self.file.create_entity("IfcCostValue")
             cost_value.AppliedValue = self.file.createIfcMonetaryMeasure(cost_item["CostValues"])
             if self.is_schedule_of_rates:
-                measure_class = ifcopenshell.util.unit.get_symbol_measure_class(cost_item["Unit"])
-                value_component = self.file.create_entity(measure_class, cost_item["Quantity"])
-                unit_component = None
-
-                if measure_class == "IfcNumericMeasure":
-                    unit_component = self.create_unit(cost_item["Unit"])
-                else:
-                    unit_type = ifcopenshell.util.unit.get_measure_unit_type(measure_class)
-                    unit_assignment = ifcopenshell.util.unit.get_unit_assignment(self.file)
-                    if unit_assignment:
-                        units = [u for u in unit_assignment.Units if getattr(u, "UnitType", None) == unit_type]
-                        if units:
-                            unit_component = units[0]
-                    if not unit_component:
-                        unit_component = self.create_unit(cost_item["Unit"])
-
-                cost_value.UnitBasis = self.file.createIfcMeasureWithUnit(value_component, unit_component)
+                cost_value.UnitBasis = self.create_unit_basis(cost_item)
+            cost_values.append(cost_value)
+        if cost_values:
+            cost_item["ifc"].CostValues = cost_values
 
         if not self.is_schedule_of_rates and cost_item["Quantity"]:
             quantity_class = ifcopenshell.util.unit.get_symbol_quantity_class(cost_item["Unit"])
-            quantity = ifcopenshell.api.run(
-                "cost.add_cost_item_quantity", self.file, cost_item=cost_item["ifc"], ifc_class=quantity_class
-            )
+            quantity = self.file.create_entity(quantity_class, Name="Unnamed")
             quantity[3] = cost_item["Quantity"]
-        self.create_cost_items(cost_item["children"], cost_item["ifc"])
+            cost_item["ifc"].CostQuantities = [quantity]
+
+    def create_unit_basis(self, cost_item):
+        measure_class = ifcopenshell.util.unit.get_symbol_measure_class(cost_item["Unit"])
+        value_component = self.file.create_entity(measure_class, cost_item["Quantity"])
+        unit_component = None
+
+        if measure_class == "IfcNumericMeasure":
+            unit_component = self.create_unit(cost_item["Unit"])
+        else:
+            unit_type = ifcopenshell.util.unit.get_measure_unit_type(measure_class)
+            unit_assignment = ifcopenshell.util.unit.get_unit_assignment(self.file)
+            if unit_assignment:
+                units = [u for u in unit_assignment.Units if getattr(u, "UnitType", None) == unit_type]
+                if units:
+                    unit_component = units[0]
+            if not unit_component:
+                unit_component = self.create_unit(cost_item["Unit"])
+
+        return self.file.createIfcMeasureWithUnit(value_component, unit_component)
 
     def create_unit(self, symbol):
         unit = self.units.get(symbol, None)
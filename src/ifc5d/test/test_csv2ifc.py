@@ -0,0 +1,106 @@
+import os
+import pytest
+import ifcopenshell.api
+import ifcopenshell.util.unit
+from ifc5d.csv2ifc import Csv2Ifc
+
+DIRNAME = os.path.join(os.path.dirname(__file__), "..")
+
+
+class ApiCsv2Ifc(Csv2Ifc):
+    # Builds the cost schedule through the cost API, one call per row, as the importer used to
+    def create_ifc(self):
+        if not self.file:
+            self.create_boilerplate_ifc()
+        if not self.cost_schedule:
+            self.cost_schedule = ifcopenshell.api.run("cost.add_cost_schedule", self.file, name="CSV Import")
+            if self.is_schedule_of_rates:
+                self.cost_schedule.PredefinedType = "SCHEDULEOFRATES"
+        self.create_api_cost_items(self.cost_items)
+
+    def create_api_cost_items(self, cost_items, parent=None):
+        for cost_item in cost_items:
+            if parent is None:
+                cost_item["ifc"] = ifcopenshell.api.run(
+                    "cost.add_cost_item", self.file, cost_schedule=self.cost_schedule
+                )
+            else:
+                cost_item["ifc"] = ifcopenshell.api.run("cost.add_cost_item", self.file, cost_item=parent)
+            cost_item["ifc"].Name = cost_item["Name"]
+            cost_item["ifc"].Identification = cost_item["Identification"]
+            if not cost_item["CostValues"]:
+                if not self.is_schedule_of_rates:
+                    cost_value = ifcopenshell.api.run("cost.add_cost_value", self.file, parent=cost_item["ifc"])
+                    cost_value.Category = "*"
+            elif self.has_categories:
+                for category, value in cost_item["CostValues"].items():
+                    cost_value = ifcopenshell.api.run("cost.add_cost_value", self.file, parent=cost_item["ifc"])
+                    cost_value.AppliedValue = self.file.createIfcMonetaryMeasure(value)
+                    cost_value.Category = category
+            else:
+                cost_value = ifcopenshell.api.run("cost.add_cost_value", self.file, parent=cost_item["ifc"])
+                cost_value.AppliedValue = self.file.createIfcMonetaryMeasure(cost_item["CostValues"])
+                if self.is_schedule_of_rates:
+                    cost_value.UnitBasis = self.create_unit_basis(cost_item)
+            if not self.is_schedule_of_rates and cost_item["Quantity"]:
+                quantity_class = ifcopenshell.util.unit.get_symbol_quantity_class(cost_item["Unit"])
+                quantity = ifcopenshell.api.run(
+                    "cost.add_cost_item_quantity", self.file, cost_item=cost_item["ifc"], ifc_class=quantity_class
+                )
+                quantity[3] = cost_item["Quantity"]
+            self.create_api_cost_items(cost_item["children"], cost_item["ifc"])
+
+
+def describe_value(value):
+    if value is None:
+        return None
+    if isinstance(value, ifcopenshell.entity_instance):
+        if value.id():
+            return (value.is_a(),) + tuple(describe_value(v) for v in value)
+        return (value.is_a(), value.wrappedValue)
+    if isinstance(value, tuple):
+        return tuple(describe_value(v) for v in value)
+    return value
+
+
+def describe_cost_item(cost_item):
+    children = [c for rel in cost_item.IsNestedBy for c in rel.RelatedObjects]
+    return (
+        cost_item.Name,
+        cost_item.Identification,
+        [(v.Category, describe_value(v.AppliedValue), describe_value(v.UnitBasis)) for v in cost_item.CostValues or []],
+        [(q.is_a(), q.Name, q[3]) for q in cost_item.CostQuantities or []],
+        [describe_cost_item(c) for c in children],
+    )
+
+
+def describe_cost_schedule(cost_schedule):
+    return (
+        cost_schedule.Name,
+        cost_schedule.PredefinedType,
+        [describe_cost_item(c) for rel in cost_schedule.Controls for c in rel.RelatedObjects],
+    )
+
+
+def run_import(cls, filename, is_schedule_of_rates=False):
+    importer = cls()
+    importer.csv = os.path.join(DIRNAME, filename)
+    importer.is_schedule_of_rates = is_schedule_of_rates
+    importer.execute()
+    return importer
+
+
+class TestCsv2Ifc:
+    @pytest.mark.parametrize("filename,is_schedule_of_rates", [("schedule.csv", False), ("rates.csv", True)])
+    def test_importing_creates_the_same_tree_as_the_cost_api(self, filename, is_schedule_of_rates):
+        importer = run_import(Csv2Ifc, filename, is_schedule_of_rates)
+        expected = run_import(ApiCsv2Ifc, filename, is_schedule_of_rates)
+        result = describe_cost_schedule(importer.cost_schedule)
+        assert result[2]
+        assert result == describe_cost_schedule(expected.cost_schedule)
+
+    def test_items_share_one_relationship_per_parent(self):
+        importer = run_import(Csv2Ifc, "schedule.csv")
+        for cost_item in importer.file.by_type("IfcCostItem"):
+            assert len(cost_item.IsNestedBy) <= 1
+        assert len(importer.cost_schedule.Controls) == 1
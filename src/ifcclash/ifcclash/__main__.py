@@ -29,10 +29,22 @@ parser.add_argument("input", type=str, help="A JSON dataset describing a series
 parser.add_argument(
     "-o", "--output", type=str, help="The JSON diff file to output. Defaults to output.json", default="output.json"
 )
+parser.add_argument(
+    "-j", "--jobs", type=int, help="The number of narrowphase worker processes. Defaults to the CPU count", default=None
+)
+parser.add_argument(
+    "-c",
+    "--cache",
+    type=str,
+    help="A directory to cache geometry and results in, so later runs only process changed elements",
+    default=None,
+)
 args = parser.parse_args()
 
 settings = ClashSettings()
 settings.output = args.output
+settings.workers = args.jobs
+settings.cache = args.cache
 settings.logger = logging.getLogger("Clash")
 settings.logger.setLevel(logging.DEBUG)
 handler = logging.StreamHandler(sys.stdout)
@@ -16,44 +16,118 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcClash.  If not, see <http://www.gnu.org/licenses/>.
 
+import time
+import hashlib
 import hppfcl
+import multiprocessing
 import numpy as np
 import ifcopenshell
+import ifcopenshell.util.shape
+from concurrent.futures import ThreadPoolExecutor
+
+# Collision objects are not picklable, so forked narrowphase workers inherit
+# them through this module global instead.
+narrowphase_groups = {}
+
+
+def collide_pairs(args):
+    name1, name2, pairs = args
+    objects1 = narrowphase_groups[name1]["objects"]
+    objects2 = narrowphase_groups[name2]["objects"]
+    collisions = []
+    for id1, id2 in pairs:
+        result = hppfcl.CollisionResult()
+        hppfcl.collide(objects1[id1], objects2[id2], hppfcl.CollisionRequest(), result)
+        if result.isCollision():
+            contact = result.getContacts()[0]
+            collisions.append(
+                {
+                    "id1": id1,
+                    "id2": id2,
+                    "normal": list(contact.normal),
+                    "position": list(contact.pos),
+                    "penetration_depth": contact.penetration_depth,
+                }
+            )
+    return collisions
 
 
 class Collider:
-    def __init__(self, logger):
+    def __init__(self, logger, workers=None):
         self.logger = logger
+        self.workers = workers or multiprocessing.cpu_count()
+        self.chunk_size = 1000
         self.groups = {}
-        self.tree = ifcopenshell.geom.tree()
+        self.meshes = {}
+        self.digests = {}
+        self.timings = {}
 
     def create_group(self, name):
         self.logger.info(f"Creating group {name}")
-        self.groups[name] = {"elements": {}, "objects": {}}
+        self.groups[name] = {"elements": {}, "objects": {}, "boxes": {}}
 
-    def create_objects(self, name, ifc_file, iterator, elements):
-        import time
+    def create_objects(self, name, ifc_file, iterator, elements, cache=None):
+        """Tessellates elements and adds them to a group
 
+        If a geometry cache is provided, the tessellation and placement of
+        each shape is also stored in it. See create_cached_objects().
+        """
         start = time.time()
         self.logger.info(f"Adding objects {name}")
-        assert iterator.initialize()
-        while True:
-            self.tree.add_element(iterator.get_native())
-            shape = iterator.get()
-            self.create_object(name, shape.guid, shape)
-            if not iterator.next():
-                break
-        self.logger.info(f"Tree finished {time.time() - start}")
+        if iterator is not None and iterator.initialize():
+            while True:
+                shape = iterator.get()
+                self.create_object(name, shape.guid, shape, ifc_file)
+                if cache is not None:
+                    self.cache_object(cache, shape, ifc_file)
+                if not iterator.next():
+                    break
+        self.logger.info(f"Objects finished {time.time() - start}")
         start = time.time()
         self.groups[name]["elements"].update({e.GlobalId: e for e in elements})
         self.logger.info(f"Element metadata finished {time.time() - start}")
-        start = time.time()
 
-    def create_object(self, group_name, id, shape):
-        obj = hppfcl.CollisionObject(
-            self.create_bvh(shape.geometry), self.create_transform(shape.transformation.matrix.data)
-        )
+    def create_object(self, group_name, id, shape, ifc_file=None):
+        mesh = self.get_mesh(shape.geometry, ifc_file)
+        self.add_object(group_name, id, mesh, self.create_matrix(shape.transformation.matrix.data))
+
+    def create_cached_objects(self, name, cache, ids):
+        """Adds previously tessellated elements to a group from a geometry cache
+
+        The cache is a dictionary of {"elements": {id: {"mesh": digest,
+        "matrix": matrix}}, "meshes": {digest: (verts, faces)}}, where elements
+        with no geometry have a mesh of None.
+        """
+        for id in ids:
+            data = cache["elements"][id]
+            if data.get("mesh") is None:
+                continue
+            key = ("cache", data["mesh"])
+            mesh = self.meshes.get(key)
+            if mesh is None:
+                verts, faces = cache["meshes"][data["mesh"]]
+                mesh = self.meshes[key] = (self.create_bvh(verts, faces), verts)
+            self.add_object(name, id, mesh, data["matrix"])
+
+    def cache_object(self, cache, shape, ifc_file=None):
+        key = (ifc_file, shape.geometry.id)
+        digest = self.digests.get(key)
+        if digest is None:
+            verts = self.meshes[key][1]
+            faces = ifcopenshell.util.shape.get_faces(shape.geometry)
+            digest = self.digests[key] = hashlib.sha1(verts.tobytes() + faces.tobytes()).hexdigest()
+            cache["meshes"][digest] = (verts, faces)
+        data = cache["elements"].setdefault(shape.guid, {})
+        data["mesh"] = digest
+        data["matrix"] = self.create_matrix(shape.transformation.matrix.data)
+
+    def add_object(self, group_name, id, mesh, mat):
+        bvh, verts = mesh
+        obj = hppfcl.CollisionObject(bvh, hppfcl.Transform3f(mat[:3, :3], mat[:3, 3]))
         self.groups[group_name]["objects"][id] = obj
+        if len(verts):
+            world_verts = verts @ mat[:3, :3].T + mat[:3, 3]
+            self.groups[group_name]["boxes"][id] = (world_verts.min(axis=0), world_verts.max(axis=0))
 
     def collide_internal(self, name):
         return self.collide_narrowphase(name, name, self.collide_broadphase(name, name))
@@ -62,60 +136,106 @@ class Collider:
         return self.collide_narrowphase(name1, name2, self.collide_broadphase(name1, name2))
 
     def collide_broadphase(self, name1, name2):
-        import time
+        """Finds pairs with overlapping bounding boxes using a sorted sweep along X
 
+        Returns a list of (id1, id2) tuples. For internal collisions, each pair
+        is only returned once.
+        """
         start = time.time()
         self.logger.info("Starting broadphase")
+        ids1, mins1, maxs1 = self.get_boxes(name1)
+        ids2, mins2, maxs2 = self.get_boxes(name2)
         potential_collisions = []
-        checked_collisions = set()
-        for id, element in self.groups[name1]["elements"].items():
-            checked_collisions.add(id)
-            box_filter = self.tree.select_box(element)
-            pairs = [
-                {"id1": id, "id2": e.GlobalId}
-                for e in box_filter
-                if e.GlobalId not in checked_collisions and e.GlobalId in self.groups[name2]["elements"]
-            ]
-            potential_collisions.extend(pairs)
-        self.logger.info(f"Finished broadphase {time.time() - start}")
+        if not len(ids1) or not len(ids2):
+            self.timings["broadphase"] = time.time() - start
+            return potential_collisions
+
+        order = np.argsort(mins2[:, 0], kind="stable")
+        sorted_ids2 = [ids2[i] for i in order]
+        sorted_mins2 = mins2[order]
+        sorted_maxs2 = maxs2[order]
+        # Any box overlapping on X must start no earlier than this before the other box starts
+        max_width = (sorted_maxs2[:, 0] - sorted_mins2[:, 0]).max()
+        x_starts = sorted_mins2[:, 0]
+        lows = np.searchsorted(x_starts, mins1[:, 0] - max_width, side="left")
+        highs = np.searchsorted(x_starts, maxs1[:, 0], side="right")
+
+        checked_index = {id: i for i, id in enumerate(ids1)}
+        for i, id1 in enumerate(ids1):
+            low, high = lows[i], highs[i]
+            if low >= high:
+                continue
+            candidate_mins = sorted_mins2[low:high]
+            candidate_maxs = sorted_maxs2[low:high]
+            overlaps = np.all(candidate_mins <= maxs1[i], axis=1) & np.all(candidate_maxs >= mins1[i], axis=1)
+            for j in np.flatnonzero(overlaps):
+                id2 = sorted_ids2[low + j]
+                # Skip self-collisions and pairs already tested the other way around
+                if checked_index.get(id2, len(ids1)) <= i:
+                    continue
+                potential_collisions.append((id1, id2))
+
+        self.timings["broadphase"] = time.time() - start
+        self.logger.info(
+            f"Finished broadphase with {len(potential_collisions)} potential collisions {self.timings['broadphase']}"
+        )
         return potential_collisions
 
-    def collide_narrowphase(self, name1, name2, potential_collisions):
-        import time
+    def get_boxes(self, name):
+        boxes = self.groups[name]["boxes"]
+        ids = list(boxes.keys())
+        mins = np.array([boxes[id][0] for id in ids]).reshape(-1, 3)
+        maxs = np.array([boxes[id][1] for id in ids]).reshape(-1, 3)
+        return ids, mins, maxs
 
+    def collide_narrowphase(self, name1, name2, potential_collisions):
         start = time.time()
-        self.logger.info("Starting narrowphase")
+        self.logger.info(f"Starting narrowphase using {self.workers} workers")
+        chunks = [
+            (name1, name2, potential_collisions[i : i + self.chunk_size])
+            for i in range(0, len(potential_collisions), self.chunk_size)
+        ]
         collisions = []
-        for data in potential_collisions:
-            result = hppfcl.CollisionResult()
-            hppfcl.collide(
-                self.groups[name1]["objects"][data["id1"]],
-                self.groups[name2]["objects"][data["id2"]],
-                hppfcl.CollisionRequest(),
-                result,
-            )
-            if result.isCollision():
-                collisions.append({"id1": data["id1"], "id2": data["id2"], "collision": result})
-        self.logger.info(f"Finished narrowphase {time.time() - start}")
+        total = len(potential_collisions)
+        checked = 0
+        for i, results in enumerate(self.map_chunks(chunks)):
+            collisions.extend(results)
+            checked += len(chunks[i][2])
+            self.logger.info(f"Narrowphase progress {checked}/{total} ({len(collisions)} collisions)")
+        self.timings["narrowphase"] = time.time() - start
+        self.logger.info(f"Finished narrowphase {self.timings['narrowphase']}")
         return collisions
 
-    def create_transform(self, m):
-        mat = np.array([[m[0], m[3], m[6], m[9]], [m[1], m[4], m[7], m[10]], [m[2], m[5], m[8], m[11]], [0, 0, 0, 1]])
-        mat.transpose()
-        return hppfcl.Transform3f(mat[:3, :3], mat[:3, 3])
-
-    def create_bvh(self, mesh):
-        v = mesh.verts
-        f = mesh.faces
-        mesh_verts = np.array([[v[i], v[i + 1], v[i + 2]] for i in range(0, len(v), 3)])
-        mesh_faces = [(int(f[i]), int(f[i + 1]), int(f[i + 2])) for i in range(0, len(f), 3)]
-
+    def map_chunks(self, chunks):
+        narrowphase_groups.update(self.groups)
+        try:
+            if self.workers <= 1 or len(chunks) <= 1:
+                yield from map(collide_pairs, chunks)
+            elif "fork" in multiprocessing.get_all_start_methods():
+                with multiprocessing.get_context("fork").Pool(self.workers) as pool:
+                    yield from pool.imap(collide_pairs, chunks)
+            else:
+                with ThreadPoolExecutor(self.workers) as executor:
+                    yield from executor.map(collide_pairs, chunks)
+        finally:
+            narrowphase_groups.clear()
+
+    def create_matrix(self, m):
+        return np.array([[m[0], m[3], m[6], m[9]], [m[1], m[4], m[7], m[10]], [m[2], m[5], m[8], m[11]], [0, 0, 0, 1]])
+
+    def get_mesh(self, mesh, ifc_file=None):
+        # Mapped representations share a geometry id, so are only converted once
+        key = (ifc_file, mesh.id)
+        result = self.meshes.get(key)
+        if result is None:
+            verts = ifcopenshell.util.shape.get_vertices(mesh)
+            result = self.meshes[key] = (self.create_bvh(verts, ifcopenshell.util.shape.get_faces(mesh)), verts)
+        return result
+
+    def create_bvh(self, verts, faces):
         bvh = hppfcl.BVHModelOBB()
-        bvh.beginModel(len(mesh_faces), len(mesh_verts))
-        vertices = hppfcl.StdVec_Vec3f()
-        [vertices.append(v) for v in mesh_verts]
-        triangles = hppfcl.StdVec_Triangle()
-        [triangles.append(hppfcl.Triangle(f[0], f[1], f[2])) for f in mesh_faces]
-        bvh.addSubModel(vertices, triangles)
+        bvh.beginModel(len(faces), len(verts))
+        bvh.addVertices(verts)
+        bvh.addTriangles(faces.astype(np.intp))
         bvh.endModel()
         return bvh
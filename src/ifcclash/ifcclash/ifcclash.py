@@ -19,25 +19,31 @@
 # along with IfcClash.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import os
 import numpy as np
 import json
 import sys
+import pickle
+import hashlib
 import argparse
 import logging
 import multiprocessing
 import ifcopenshell
 import ifcopenshell.geom
 import ifcopenshell.util.selector
+import ifcopenshell.util.placement
 from . import collider
 
 
 class Clasher:
+    cache_version = 1
+
     def __init__(self, settings):
         self.settings = settings
         self.geom_settings = ifcopenshell.geom.settings()
         self.clash_sets = []
-        self.collider = collider.Collider(self.settings.logger)
-        self.selector = ifcopenshell.util.selector.Selector()
+        self.collider = collider.Collider(self.settings.logger, self.settings.workers)
+        self.selector = ifcopenshell.util.selector.Selector(cache=True)
         self.ifcs = {}
 
     def clash(self):
@@ -46,19 +52,52 @@ class Clasher:
             self.process_clash_set(clash_set)
 
     def process_clash_set(self, clash_set):
+        hashes = {}
         self.collider.create_group("a")
         for source in clash_set["a"]:
             source["ifc"] = self.load_ifc(source["file"])
-            self.add_collision_objects("a", source["ifc"], source.get("mode", None), source.get("selector", None))
+            hashes.setdefault("a", {}).update(
+                self.add_collision_objects(
+                    "a", source["ifc"], source.get("mode", None), source.get("selector", None), source["file"]
+                )
+            )
 
         if "b" in clash_set:
             self.collider.create_group("b")
             for source in clash_set["b"]:
                 source["ifc"] = self.load_ifc(source["file"])
-                self.add_collision_objects("b", source["ifc"], source.get("mode", None), source.get("selector", None))
-            results = self.collider.collide_group("a", "b")
+                hashes.setdefault("b", {}).update(
+                    self.add_collision_objects(
+                        "b", source["ifc"], source.get("mode", None), source.get("selector", None), source["file"]
+                    )
+                )
+            group_b = "b"
         else:
-            results = self.collider.collide_internal("a")
+            group_b = "a"
+
+        potential_collisions = self.collider.collide_broadphase("a", group_b)
+        reused_results = []
+        previous = self.load_clash_cache(clash_set) if self.settings.cache else None
+        if previous:
+            changed_a = self.get_changed_ids(hashes["a"], previous["hashes"].get("a", {}))
+            changed_b = self.get_changed_ids(hashes[group_b], previous["hashes"].get(group_b, {}))
+            objects_a = self.collider.groups["a"]["objects"]
+            objects_b = self.collider.groups[group_b]["objects"]
+            reused_results = [
+                r
+                for r in previous["results"]
+                if r["id1"] in objects_a
+                and r["id2"] in objects_b
+                and r["id1"] not in changed_a
+                and r["id2"] not in changed_b
+            ]
+            potential_collisions = [p for p in potential_collisions if p[0] in changed_a or p[1] in changed_b]
+            self.settings.logger.info(
+                f"Reusing {len(reused_results)} previous clashes, retesting {len(potential_collisions)} pairs"
+            )
+        results = reused_results + self.collider.collide_narrowphase("a", group_b, potential_collisions)
+        if self.settings.cache:
+            self.save_clash_cache(clash_set, {"hashes": hashes, "results": results})
 
         processed_results = {}
         for result in results:
@@ -68,7 +107,6 @@ class Clasher:
             else:
                 element2 = self.get_element(clash_set["a"], result["id2"])
 
-            contact = result["collision"].getContacts()[0]
             processed_results[f"{result['id1']}-{result['id2']}"] = {
                 "a_global_id": result["id1"],
                 "b_global_id": result["id2"],
@@ -76,9 +114,9 @@ class Clasher:
                 "b_ifc_class": element2.is_a(),
                 "a_name": element1.Name,
                 "b_name": element2.Name,
-                "normal": list(contact.normal),
-                "position": list(contact.pos),
-                "penetration_depth": contact.penetration_depth,
+                "normal": result["normal"],
+                "position": result["position"],
+                "penetration_depth": result["penetration_depth"],
             }
         clash_set["clashes"] = processed_results
 
@@ -94,7 +132,7 @@ class Clasher:
         self.settings.logger.info(f"Loading finished {time.time() - start}")
         return ifc
 
-    def add_collision_objects(self, name, ifc_file, mode=None, selector=None):
+    def add_collision_objects(self, name, ifc_file, mode=None, selector=None, path=None):
         import time
 
         start = time.time()
@@ -105,11 +143,129 @@ class Clasher:
             elements = set(ifc_file.by_type("IfcElement")) - set(self.selector.parse(ifc_file, selector))
         elif mode == "i":
             elements = self.selector.parse(ifc_file, selector)
-        iterator = ifcopenshell.geom.iterator(
-            self.geom_settings, ifc_file, multiprocessing.cpu_count(), include=elements
-        )
-        self.settings.logger.info(f"Iterator creation finished {time.time() - start}")
-        self.collider.create_objects(name, ifc_file, iterator, elements)
+
+        if not self.settings.cache:
+            iterator = ifcopenshell.geom.iterator(
+                self.geom_settings, ifc_file, multiprocessing.cpu_count(), include=elements
+            )
+            self.settings.logger.info(f"Iterator creation finished {time.time() - start}")
+            self.collider.create_objects(name, ifc_file, iterator, elements)
+            return {}
+
+        elements = list(elements)
+        hashes = self.get_geometry_hashes(ifc_file, elements)
+        cache = self.load_geometry_cache(path)
+        cached_ids = []
+        changed_elements = []
+        for element in elements:
+            data = cache["elements"].get(element.GlobalId)
+            if data and data.get("hash") == hashes[element.GlobalId]:
+                cached_ids.append(element.GlobalId)
+            else:
+                cache["elements"].pop(element.GlobalId, None)
+                changed_elements.append(element)
+        self.settings.logger.info(f"Reusing {len(cached_ids)} cached shapes, tessellating {len(changed_elements)}")
+        self.collider.create_cached_objects(name, cache, cached_ids)
+
+        iterator = None
+        if changed_elements:
+            iterator = ifcopenshell.geom.iterator(
+                self.geom_settings, ifc_file, multiprocessing.cpu_count(), include=changed_elements
+            )
+            self.settings.logger.info(f"Iterator creation finished {time.time() - start}")
+        self.collider.create_objects(name, ifc_file, iterator, elements, cache=cache)
+        for element in changed_elements:
+            data = cache["elements"].setdefault(element.GlobalId, {"mesh": None})
+            data["hash"] = hashes[element.GlobalId]
+        self.save_geometry_cache(path, cache)
+        return hashes
+
+    def get_geometry_hashes(self, ifc_file, elements):
+        """Hashes the placement and representation subgraph of each element
+
+        Step ids are replaced with positions in the traversed subgraph, so the
+        hashes are stable when unrelated parts of a model are renumbered.
+        """
+        subgraph_hashes = {}
+        matrices = ifcopenshell.util.placement.get_local_placements(elements)
+        results = {}
+        for element, matrix in zip(elements, matrices):
+            h = hashlib.sha1(np.round(matrix, 6).tobytes())
+            h.update(self.get_subgraph_hash(ifc_file, element.Representation, subgraph_hashes))
+            for rel in getattr(element, "HasOpenings", []):
+                opening = rel.RelatedOpeningElement
+                opening_matrix = ifcopenshell.util.placement.get_local_placement(opening.ObjectPlacement)
+                h.update(np.round(opening_matrix, 6).tobytes())
+                h.update(self.get_subgraph_hash(ifc_file, opening.Representation, subgraph_hashes))
+            results[element.GlobalId] = h.hexdigest()
+        return results
+
+    def get_subgraph_hash(self, ifc_file, root, subgraph_hashes):
+        if root is None:
+            return b""
+        digest = subgraph_hashes.get(root.id())
+        if digest is not None:
+            return digest
+        subgraph = ifc_file.traverse(root)
+        positions = {e.id(): i for i, e in enumerate(subgraph)}
+
+        def canonicalise(value):
+            if value.id():
+                return positions.get(value.id())
+            return (value.is_a(), value.wrappedValue)
+
+        h = hashlib.sha1()
+        for element in subgraph:
+            attributes = tuple(
+                element.walk(lambda v: isinstance(v, ifcopenshell.entity_instance), canonicalise, a) for a in element
+            )
+            h.update(repr((element.is_a(), attributes)).encode("utf-8"))
+        digest = subgraph_hashes[root.id()] = h.digest()
+        return digest
+
+    def get_changed_ids(self, hashes, previous_hashes):
+        return {id for id, digest in hashes.items() if previous_hashes.get(id) != digest}
+
+    def get_cache_path(self, prefix, key):
+        os.makedirs(self.settings.cache, exist_ok=True)
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.settings.cache, f"{prefix}-{name}.pickle")
+
+    def load_cache(self, path):
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data.get("version") != self.cache_version:
+            return None
+        return data
+
+    def save_cache(self, path, data):
+        data["version"] = self.cache_version
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+    def load_geometry_cache(self, path):
+        cache = self.load_cache(self.get_cache_path("geometry", os.path.abspath(path)))
+        return cache or {"elements": {}, "meshes": {}}
+
+    def save_geometry_cache(self, path, cache):
+        used_meshes = {data.get("mesh") for data in cache["elements"].values()}
+        cache["meshes"] = {k: v for k, v in cache["meshes"].items() if k in used_meshes}
+        self.save_cache(self.get_cache_path("geometry", os.path.abspath(path)), cache)
+
+    def get_clash_set_key(self, clash_set):
+        sources = lambda group: [
+            (os.path.abspath(s["file"]), s.get("mode", None), s.get("selector", None)) for s in clash_set.get(group, [])
+        ]
+        return repr((clash_set.get("name"), sources("a"), sources("b")))
+
+    def load_clash_cache(self, clash_set):
+        return self.load_cache(self.get_cache_path("clashes", self.get_clash_set_key(clash_set)))
+
+    def save_clash_cache(self, clash_set, data):
+        self.save_cache(self.get_cache_path("clashes", self.get_clash_set_key(clash_set)), data)
 
     def export(self):
         if len(self.settings.output) > 4 and self.settings.output[-4:] == ".bcf":
@@ -296,3 +452,6 @@ class ClashSettings:
     def __init__(self):
         self.logger = None
         self.output = "clashes.json"
+        self.workers = None
+        # A directory to persist tessellations and clash results between runs
+        self.cache = None
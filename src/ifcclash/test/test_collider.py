@@ -0,0 +1,129 @@
+import logging
+import numpy as np
+from ifcclash import collider
+
+
+def create_collider(workers=1):
+    return collider.Collider(logging.getLogger("ifcclash"), workers=workers)
+
+
+def create_cube(c, offset):
+    # A unit cube as a mesh placed at an offset
+    verts = np.array([[x, y, z] for x in (0.0, 1.0) for y in (0.0, 1.0) for z in (0.0, 1.0)])
+    faces = np.array(
+        [
+            [0, 1, 3],
+            [0, 3, 2],
+            [4, 6, 7],
+            [4, 7, 5],
+            [0, 4, 5],
+            [0, 5, 1],
+            [2, 3, 7],
+            [2, 7, 6],
+            [0, 2, 6],
+            [0, 6, 4],
+            [1, 5, 7],
+            [1, 7, 3],
+        ],
+        dtype=np.int32,
+    )
+    matrix = np.eye(4)
+    matrix[:3, 3] = offset
+    return (c.create_bvh(verts, faces), verts), matrix
+
+
+def add_box(c, group, id, offset, size=1.0):
+    offset = np.array(offset, dtype=float)
+    c.groups[group]["boxes"][id] = (offset, offset + size)
+
+
+class TestCollideBroadphase:
+    def test_overlapping_boxes_are_paired(self):
+        c = create_collider()
+        c.create_group("a")
+        c.create_group("b")
+        add_box(c, "a", "a1", (0, 0, 0))
+        add_box(c, "a", "a2", (10, 0, 0))
+        add_box(c, "b", "b1", (0.5, 0.5, 0.5))
+        add_box(c, "b", "b2", (10, 5, 0))
+        add_box(c, "b", "b3", (-20, 0, 0), size=25)
+        assert sorted(c.collide_broadphase("a", "b")) == [("a1", "b1"), ("a1", "b3")]
+
+    def test_touching_boxes_are_paired(self):
+        c = create_collider()
+        c.create_group("a")
+        c.create_group("b")
+        add_box(c, "a", "a1", (0, 0, 0))
+        add_box(c, "b", "b1", (1, 0, 0))
+        assert c.collide_broadphase("a", "b") == [("a1", "b1")]
+
+    def test_disjoint_boxes_are_not_paired(self):
+        c = create_collider()
+        c.create_group("a")
+        c.create_group("b")
+        add_box(c, "a", "a1", (0, 0, 0))
+        add_box(c, "b", "b1", (0, 2, 0))
+        add_box(c, "b", "b2", (0, 0, 2))
+        add_box(c, "b", "b3", (2, 0, 0))
+        assert c.collide_broadphase("a", "b") == []
+
+    def test_empty_groups_have_no_pairs(self):
+        c = create_collider()
+        c.create_group("a")
+        c.create_group("b")
+        add_box(c, "a", "a1", (0, 0, 0))
+        assert c.collide_broadphase("a", "b") == []
+        assert c.collide_broadphase("b", "a") == []
+
+    def test_internal_pairs_are_returned_once_without_self_collisions(self):
+        c = create_collider()
+        c.create_group("a")
+        add_box(c, "a", "a1", (0, 0, 0))
+        add_box(c, "a", "a2", (0.5, 0, 0))
+        add_box(c, "a", "a3", (0.75, 0, 0))
+        add_box(c, "a", "a4", (5, 0, 0))
+        pairs = c.collide_broadphase("a", "a")
+        assert sorted(tuple(sorted(p)) for p in pairs) == [("a1", "a2"), ("a1", "a3"), ("a2", "a3")]
+
+    def test_an_element_in_both_groups_is_only_paired_once_and_not_with_itself(self):
+        c = create_collider()
+        c.create_group("a")
+        c.create_group("b")
+        add_box(c, "a", "shared", (0, 0, 0))
+        add_box(c, "a", "a1", (0.5, 0, 0))
+        add_box(c, "b", "shared", (0, 0, 0))
+        add_box(c, "b", "a1", (0.5, 0, 0))
+        add_box(c, "b", "b1", (0.25, 0, 0))
+        pairs = c.collide_broadphase("a", "b")
+        assert sorted(pairs) == [("a1", "b1"), ("shared", "a1"), ("shared", "b1")]
+
+
+class TestCollideNarrowphase:
+    def create_groups(self, c):
+        c.create_group("a")
+        c.create_group("b")
+        for i in range(10):
+            c.add_object("a", "a%d" % i, *create_cube(c, (i * 3.0, 0.0, 0.0)))
+            # Every other cube of b intersects the cube of a at the same position
+            c.add_object("b", "b%d" % i, *create_cube(c, (i * 3.0 + 0.5, 0.0 if i % 2 else 5.0, 0.0)))
+
+    def get_collisions(self, workers):
+        c = create_collider(workers=workers)
+        c.chunk_size = 2
+        self.create_groups(c)
+        pairs = [("a%d" % i, "b%d" % i) for i in range(10)]
+        return sorted((r["id1"], r["id2"]) for r in c.collide_narrowphase("a", "b", pairs))
+
+    def test_colliding_pairs_are_found(self):
+        assert self.get_collisions(workers=1) == [("a%d" % i, "b%d" % i) for i in (1, 3, 5, 7, 9)]
+
+    def test_workers_find_the_same_collisions(self):
+        assert self.get_collisions(workers=3) == self.get_collisions(workers=1)
+
+    def test_the_broadphase_and_narrowphase_together(self):
+        c = create_collider(workers=2)
+        c.chunk_size = 1
+        self.create_groups(c)
+        collisions = c.collide_group("a", "b")
+        assert sorted((r["id1"], r["id2"]) for r in collisions) == [("a%d" % i, "b%d" % i) for i in (1, 3, 5, 7, 9)]
+        assert not collider.narrowphase_groups
@@ -0,0 +1,98 @@
+import logging
+import ifcopenshell
+from ifcclash import ifcclash
+
+
+def create_clasher(tmp_path):
+    settings = ifcclash.ClashSettings()
+    settings.logger = logging.getLogger("ifcclash")
+    settings.cache = str(tmp_path / "cache")
+    return ifcclash.Clasher(settings)
+
+
+def create_model(padding=0):
+    f = ifcopenshell.file(schema="IFC4")
+    # Unrelated instances shift the step ids of everything that follows
+    for i in range(padding):
+        f.createIfcCartesianPoint((float(i), 0.0, 0.0))
+    walls = []
+    for x in (0.0, 10.0):
+        point = f.createIfcCartesianPoint((x, 0.0, 0.0))
+        placement = f.createIfcLocalPlacement(RelativePlacement=f.createIfcAxis2Placement3D(point))
+        context = f.createIfcGeometricRepresentationContext(ContextType="Model", CoordinateSpaceDimension=3)
+        item = f.createIfcPolyline(
+            [f.createIfcCartesianPoint((0.0, 0.0, 0.0)), f.createIfcCartesianPoint((1.0, 0.0, 0.0))]
+        )
+        shape = f.createIfcShapeRepresentation(context, "Body", "Curve3D", [item])
+        representation = f.createIfcProductDefinitionShape(Representations=[shape])
+        walls.append(f.createIfcWall(ifcopenshell.guid.new(), ObjectPlacement=placement, Representation=representation))
+    return f, walls
+
+
+class TestGeometryHashes:
+    def test_hashes_are_stable_when_a_model_is_renumbered(self, tmp_path):
+        clasher = create_clasher(tmp_path)
+        f1, walls1 = create_model()
+        f2, walls2 = create_model(padding=5)
+        hashes1 = list(clasher.get_geometry_hashes(f1, walls1).values())
+        hashes2 = list(clasher.get_geometry_hashes(f2, walls2).values())
+        assert hashes1 == hashes2
+
+    def test_only_the_hash_of_a_changed_element_changes(self, tmp_path):
+        clasher = create_clasher(tmp_path)
+        f, walls = create_model()
+        before = clasher.get_geometry_hashes(f, walls)
+        walls[0].Representation.Representations[0].Items[0].Points[1].Coordinates = (2.0, 0.0, 0.0)
+        after = clasher.get_geometry_hashes(f, walls)
+        assert clasher.get_changed_ids(after, before) == {walls[0].GlobalId}
+
+    def test_moving_an_element_changes_its_hash(self, tmp_path):
+        clasher = create_clasher(tmp_path)
+        f, walls = create_model()
+        before = clasher.get_geometry_hashes(f, walls)
+        walls[1].ObjectPlacement.RelativePlacement.Location.Coordinates = (20.0, 0.0, 0.0)
+        after = clasher.get_geometry_hashes(f, walls)
+        assert clasher.get_changed_ids(after, before) == {walls[1].GlobalId}
+
+    def test_new_elements_are_reported_as_changed(self, tmp_path):
+        clasher = create_clasher(tmp_path)
+        f, walls = create_model()
+        hashes = clasher.get_geometry_hashes(f, walls)
+        previous = {walls[0].GlobalId: hashes[walls[0].GlobalId]}
+        assert clasher.get_changed_ids(hashes, previous) == {walls[1].GlobalId}
+
+
+class TestPickleCache:
+    def test_saving_and_loading_a_cache(self, tmp_path):
+        clasher = create_clasher(tmp_path)
+        path = clasher.get_cache_path("clashes", "key")
+        clasher.save_cache(path, {"hashes": {"a": {"guid": "digest"}}, "results": []})
+        assert clasher.load_cache(path)["hashes"] == {"a": {"guid": "digest"}}
+
+    def test_a_missing_cache_loads_as_none(self, tmp_path):
+        clasher = create_clasher(tmp_path)
+        assert clasher.load_cache(clasher.get_cache_path("clashes", "missing")) is None
+
+    def test_a_cache_from_another_version_is_discarded(self, tmp_path):
+        clasher = create_clasher(tmp_path)
+        path = clasher.get_cache_path("clashes", "key")
+        clasher.save_cache(path, {"hashes": {}, "results": []})
+        clasher.cache_version += 1
+        assert clasher.load_cache(path) is None
+
+    def test_saving_a_geometry_cache_drops_unused_meshes(self, tmp_path):
+        clasher = create_clasher(tmp_path)
+        cache = {
+            "elements": {"guid": {"mesh": "used", "matrix": None, "hash": "digest"}},
+            "meshes": {"used": ([], []), "unused": ([], [])},
+        }
+        clasher.save_geometry_cache("model.ifc", cache)
+        assert list(clasher.load_geometry_cache("model.ifc")["meshes"].keys()) == ["used"]
+
+    def test_clash_caches_are_keyed_by_clash_set(self, tmp_path):
+        clasher = create_clasher(tmp_path)
+        clash_set1 = {"name": "1", "a": [{"file": "a.ifc"}]}
+        clash_set2 = {"name": "2", "a": [{"file": "a.ifc"}]}
+        clasher.save_clash_cache(clash_set1, {"hashes": {}, "results": [{"id1": "x", "id2": "y"}]})
+        assert clasher.load_clash_cache(clash_set2) is None
+        assert clasher.load_clash_cache(clash_set1)["results"] == [{"id1": "x", "id2": "y"}]
@@ -1641,7 +1641,7 @@ if __name__ == "__main__":
     logging.basicConfig(filename=args["log"], filemode="a", level=logging.DEBUG)
     logger = logging.getLogger("IFCtoCOBie")
     logger.info("Starting conversion")
-    selector = ifcopenshell.util.selector.Selector()
+    selector = ifcopenshell.util.selector.Selector(cache=True)
     parser = IfcCobieParser(logger, selector)
     if args["data"]:
         with open(bpy.context.scene.BIMProperties.cobie_json_file, "r") as f:
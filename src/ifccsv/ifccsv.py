@@ -181,7 +181,7 @@ if __name__ == "__main__":
 
     if args.export:
         ifc_file = ifcopenshell.open(args.ifc)
-        selector = ifcopenshell.util.selector.Selector()
+        selector = ifcopenshell.util.selector.Selector(cache=True)
         results = selector.parse(ifc_file, args.query)
         ifc_csv = IfcCsv()
         ifc_csv.output = args.csv
@@ -24,19 +24,26 @@ import ifcopenshell
 from deepdiff import DeepDiff
 import time
 import json
+import hashlib
 import argparse
+import multiprocessing
 import decimal
 
 
 class IfcDiff:
-    def __init__(self, old_file, new_file, output_file, inverse_classes=None):
+    def __init__(self, old_file, new_file, output_file, inverse_classes=None, use_hashes=False, jobs=1):
         self.old_file = old_file
         self.new_file = new_file
         self.output_file = output_file
         self.change_register = {}
-        self.representation_ids = []
+        self.representation_ids = set()
         self.inverse_classes = inverse_classes
+        self.use_hashes = use_hashes
+        self.jobs = jobs
+        self.chunk_size = 500
         self.precision = 2
+        self.total_changed = 0
+        self.stream = None
 
     def diff(self):
         print("# IFC Diff")
@@ -57,26 +64,91 @@ class IfcDiff:
         print(" - {} item(s) were retained between the old and new IFC file".format(total_same_elements))
 
         start = time.time()
-        total_diffed = 0
 
-        for global_id in same_elements:
-            total_diffed += 1
-            print("{}/{} diffed ...".format(total_diffed, total_same_elements), end="\r", flush=True)
-            old_element = self.old.by_id(global_id)
-            new_element = self.new.by_id(global_id)
-            self.diff_element(old_element, new_element)
-            self.diff_element_inverse_relationships(old_element, new_element)
+        if self.is_streamed():
+            self.stream = open(self.output_file, "w", encoding="utf-8")
+            for global_id in self.added_elements:
+                self.write_record({"type": "added", "global_id": global_id})
+            for global_id in self.deleted_elements:
+                self.write_record({"type": "deleted", "global_id": global_id})
 
-            representation_id = self.get_representation_id(new_element)
-            if representation_id in self.representation_ids:
-                continue
-            self.representation_ids.append(representation_id)
-            self.diff_element_geometry(old_element, new_element)
+        try:
+            if self.jobs > 1:
+                self.diff_parallel(same_elements)
+            else:
+                self.prepare_hashers()
+                for total_diffed, global_id in enumerate(same_elements, 1):
+                    print("{}/{} diffed ...".format(total_diffed, total_same_elements), end="\r", flush=True)
+                    self.diff_global_id(global_id)
+                    self.flush_changes(global_id)
+        finally:
+            if self.stream:
+                self.stream.close()
+                self.stream = None
 
-        print(" - {} item(s) were changed either geometrically or with data".format(len(self.change_register.keys())))
+        print(" - {} item(s) were changed either geometrically or with data".format(self.total_changed))
         print("# Diff finished in {:.2f} seconds".format(time.time() - start))
 
+    def diff_parallel(self, global_ids):
+        """Diffs retained elements in a process pool
+
+        Forked workers inherit the loaded files, otherwise each worker opens
+        both files itself. Workers diff chunks of GlobalIds and changes are
+        written as they arrive when streaming to JSON Lines.
+        """
+        global worker_files
+        global_ids = sorted(global_ids)
+        chunks = [global_ids[i : i + self.chunk_size] for i in range(0, len(global_ids), self.chunk_size)]
+        settings = (self.old_file, self.new_file, self.inverse_classes, self.use_hashes, self.precision)
+        total_diffed = 0
+        worker_files = (self.old, self.new)
+        try:
+            with multiprocessing.Pool(self.jobs, initializer=init_worker, initargs=settings) as pool:
+                for chunk_size, changes in pool.imap_unordered(diff_worker, chunks):
+                    total_diffed += chunk_size
+                    print("{}/{} diffed ...".format(total_diffed, len(global_ids)), end="\r", flush=True)
+                    for global_id, change in changes.items():
+                        self.change_register[global_id] = change
+                        self.flush_changes(global_id)
+        finally:
+            worker_files = None
+
+    def prepare_hashers(self):
+        if self.use_hashes:
+            self.old_hasher = EntityHasher(self.precision, self.inverse_classes)
+            self.new_hasher = EntityHasher(self.precision, self.inverse_classes)
+
+    def diff_global_id(self, global_id):
+        old_element = self.old.by_id(global_id)
+        new_element = self.new.by_id(global_id)
+        if self.use_hashes:
+            return self.diff_element_hashes(old_element, new_element)
+        self.diff_element(old_element, new_element)
+        self.diff_element_inverse_relationships(old_element, new_element)
+
+        representation_id = self.get_representation_id(new_element)
+        if representation_id in self.representation_ids:
+            return
+        self.representation_ids.add(representation_id)
+        self.diff_element_geometry(old_element, new_element)
+
+    def flush_changes(self, global_id):
+        if global_id not in self.change_register:
+            return
+        self.total_changed += 1
+        if self.stream:
+            changes = self.change_register.pop(global_id)
+            self.write_record({"type": "changed", "global_id": global_id, "changes": changes})
+
+    def write_record(self, record):
+        self.stream.write(json.dumps(record, cls=DiffEncoder) + "\n")
+
+    def is_streamed(self):
+        return bool(self.output_file) and self.output_file.endswith(".jsonl")
+
     def export(self):
+        if self.is_streamed():
+            return  # Records are already written during the diff
         with open(self.output_file, "w", encoding="utf-8") as diff_file:
             json.dump(
                 {
@@ -107,6 +179,17 @@ class IfcDiff:
         except:
             return 2
 
+    def diff_element_hashes(self, old_element, new_element):
+        if self.old_hasher.get_attributes_hash(old_element) != self.new_hasher.get_attributes_hash(new_element):
+            self.diff_element(old_element, new_element)
+        if self.inverse_classes and self.old_hasher.get_inverses_hash(
+            self.old, old_element
+        ) != self.new_hasher.get_inverses_hash(self.new, new_element):
+            self.diff_element_inverse_relationships(old_element, new_element)
+        if self.old_hasher.get_geometry_hash(old_element) != self.new_hasher.get_geometry_hash(new_element):
+            if new_element.GlobalId:
+                self.change_register.setdefault(new_element.GlobalId, {}).update({"has_geometry_change": True})
+
     def diff_element(self, old_element, new_element):
         diff = DeepDiff(
             old_element,
@@ -213,6 +296,151 @@ class IfcDiff:
                 return representation.Items[0].MappingSource.MappedRepresentation.id()
 
 
+class EntityHasher:
+    """Computes canonical content hashes of entities in a file
+
+    An entity hash covers its class and attribute values, with references
+    replaced by the hashes of the referenced entities, so step ids do not
+    affect the result. OwnerHistory is ignored and floats are rounded to the
+    diff precision. Hashes are memoised, so each shared subgraph is only
+    hashed once per file.
+    """
+
+    element_ignore = {"OwnerHistory", "ObjectPlacement", "Representation"}
+    inverse_ignore = {
+        "GlobalId",
+        "OwnerHistory",
+        "RelatedObjects",
+        "RelatingObject",
+        "RelatingDefinitions",
+        "RelatedObjectsType",
+    }
+
+    def __init__(self, precision, inverse_classes=None):
+        self.precision = precision
+        self.inverse_classes = inverse_classes
+        self.hashes = {}
+        self.ignored_indices = {}
+
+    def get_hash(self, element):
+        if element is None:
+            return None
+        digest = self.hashes.get(element.id())
+        if digest is not None:
+            return digest
+        stack = [element]
+        visiting = set()
+        while stack:
+            entity = stack[-1]
+            if entity.id() in self.hashes:
+                stack.pop()
+                continue
+            visiting.add(entity.id())
+            pending = [r for r in self.get_references(entity) if r.id() not in self.hashes and r.id() not in visiting]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            self.hashes[entity.id()] = self.digest((entity.is_a(), self.get_values(entity, ("OwnerHistory",))))
+        return self.hashes[element.id()]
+
+    def get_attributes_hash(self, element):
+        for reference in self.get_references(element, self.element_ignore):
+            self.get_hash(reference)
+        return self.digest((element.is_a(), self.get_values(element, self.element_ignore)))
+
+    def get_geometry_hash(self, element):
+        # Only the geometry of openings and projections is hashed, as their
+        # relationships reference the element and would pull in its whole graph
+        return self.digest(
+            (
+                self.get_shape_hash(element),
+                sorted(self.get_shape_hash(r.RelatedOpeningElement) for r in getattr(element, "HasOpenings", ())),
+                sorted(self.get_shape_hash(r.RelatedFeatureElement) for r in getattr(element, "HasProjections", ())),
+            )
+        )
+
+    def get_shape_hash(self, element):
+        return self.digest((self.get_hash(element.ObjectPlacement), self.get_hash(element.Representation)))
+
+    def get_inverses_hash(self, ifc_file, element):
+        relationships = ifc_file.get_inverse(element)
+        if self.inverse_classes[0] != "all":
+            relationships = [r for r in relationships if r.is_a() in self.inverse_classes]
+        digests = []
+        for relationship in relationships:
+            for reference in self.get_references(relationship, self.inverse_ignore):
+                self.get_hash(reference)
+            digests.append(self.digest((relationship.is_a(), self.get_values(relationship, self.inverse_ignore))))
+        return self.digest(sorted(digests))
+
+    def get_indices(self, element, ignore):
+        key = (element.is_a(), ignore if isinstance(ignore, tuple) else tuple(sorted(ignore)))
+        indices = self.ignored_indices.get(key)
+        if indices is None:
+            names = element.wrapped_data.get_attribute_names()
+            indices = self.ignored_indices[key] = [i for i, name in enumerate(names) if name not in ignore]
+        return indices
+
+    def get_references(self, element, ignore=("OwnerHistory",)):
+        references = []
+        queue = [element[i] for i in self.get_indices(element, ignore)]
+        while queue:
+            value = queue.pop()
+            if isinstance(value, tuple):
+                queue.extend(value)
+            elif isinstance(value, ifcopenshell.entity_instance) and value.id():
+                references.append(value)
+        return references
+
+    def get_values(self, element, ignore):
+        return tuple(self.canonicalise(element[i]) for i in self.get_indices(element, ignore))
+
+    def canonicalise(self, value):
+        if isinstance(value, ifcopenshell.entity_instance):
+            if value.id():
+                # Unresolved references only occur in cyclic graphs
+                return self.hashes.get(value.id(), value.is_a())
+            return (value.is_a(), self.canonicalise(value.wrappedValue))
+        elif isinstance(value, tuple):
+            return tuple(self.canonicalise(v) for v in value)
+        elif isinstance(value, bool) or value is None:
+            return value
+        elif isinstance(value, (int, float)):
+            # Normalise integers, negative zero, and insignificant digits
+            return round(float(value), self.precision) + 0.0
+        return value
+
+    def digest(self, value):
+        return hashlib.blake2b(repr(value).encode("utf-8"), digest_size=16).digest()
+
+
+# Files are not picklable, so forked workers inherit the files loaded by the
+# parent through this module global instead of opening them again.
+worker_files = None
+worker_diff = None
+
+
+def init_worker(old_file, new_file, inverse_classes, use_hashes, precision):
+    global worker_diff
+    worker_diff = IfcDiff(old_file, new_file, None, inverse_classes, use_hashes)
+    if worker_files is not None:
+        worker_diff.old, worker_diff.new = worker_files
+    else:
+        worker_diff.old = ifcopenshell.open(old_file)
+        worker_diff.new = ifcopenshell.open(new_file)
+    worker_diff.precision = precision
+    worker_diff.prepare_hashers()
+
+
+def diff_worker(global_ids):
+    worker_diff.change_register = {}
+    for global_id in global_ids:
+        worker_diff.diff_global_id(global_id)
+    # DeepDiff results may reference entity instances, which cannot be pickled
+    return len(global_ids), json.loads(json.dumps(worker_diff.change_register, cls=DiffEncoder))
+
+
 class DiffEncoder(json.JSONEncoder):
     def default(self, obj):
         try:
@@ -226,7 +454,11 @@ if __name__ == "__main__":
     parser.add_argument("old", type=str, help="The old IFC file")
     parser.add_argument("new", type=str, help="The new IFC file")
     parser.add_argument(
-        "-o", "--output", type=str, help="The JSON diff file to output. Defaults to diff.json", default="diff.json"
+        "-o",
+        "--output",
+        type=str,
+        help="The JSON diff file to output. Use a .jsonl extension to stream JSON Lines. Defaults to diff.json",
+        default="diff.json",
     )
     parser.add_argument(
         "-r",
@@ -235,8 +467,18 @@ if __name__ == "__main__":
         help='A list of IFC classes to check in inverse relationships, like "IfcRelDefinesByProperties", or "all".',
         default="",
     )
+    parser.add_argument(
+        "--hash",
+        action="store_true",
+        help="Compare content hashes first and only run a detailed diff on elements whose hashes differ",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, help="The number of worker processes to diff with. Defaults to 1", default=1
+    )
     args = parser.parse_args()
 
-    ifc_diff = IfcDiff(args.old, args.new, args.output, args.relationships.split())
+    ifc_diff = IfcDiff(
+        args.old, args.new, args.output, args.relationships.split(), use_hashes=args.hash, jobs=args.jobs
+    )
     ifc_diff.diff()
     ifc_diff.export()
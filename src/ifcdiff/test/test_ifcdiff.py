@@ -0,0 +1,111 @@
+import json
+import ifcopenshell
+import ifcdiff
+
+GLOBAL_IDS = {name: ifcopenshell.guid.compress("%032x" % i) for i, name in enumerate("ABCDE", 1)}
+
+
+def create_model(path, names, moved=(), renamed=(), padding=0):
+    f = ifcopenshell.file(schema="IFC4")
+    # Unrelated instances shift the step ids of everything that follows
+    for i in range(padding):
+        f.createIfcCartesianPoint((float(i), 0.0, 0.0))
+    context = f.createIfcGeometricRepresentationContext(
+        ContextType="Model", CoordinateSpaceDimension=3, Precision=0.001
+    )
+    for i, name in enumerate(names):
+        x = 100.0 if name in moved else float(i)
+        placement = f.createIfcLocalPlacement(
+            RelativePlacement=f.createIfcAxis2Placement3D(f.createIfcCartesianPoint((x, 0.0, 0.0)))
+        )
+        item = f.createIfcPolyline(
+            [f.createIfcCartesianPoint((0.0, 0.0, 0.0)), f.createIfcCartesianPoint((1.0, 0.0, 0.0))]
+        )
+        shape = f.createIfcShapeRepresentation(context, "Body", "Curve3D", [item])
+        f.createIfcWall(
+            GLOBAL_IDS[name],
+            Name=name + "2" if name in renamed else name,
+            ObjectPlacement=placement,
+            Representation=f.createIfcProductDefinitionShape(Representations=[shape]),
+        )
+    f.write(str(path))
+    return str(path)
+
+
+def create_models(tmp_path):
+    old = create_model(tmp_path / "old.ifc", "ABCD")
+    new = create_model(tmp_path / "new.ifc", "ABCE", moved="B", renamed="A", padding=5)
+    return old, new
+
+
+def run_diff(old, new, output, **kwargs):
+    ifc_diff = ifcdiff.IfcDiff(old, new, str(output), **kwargs)
+    ifc_diff.diff()
+    ifc_diff.export()
+    return ifc_diff
+
+
+def read_json_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestHashDiff:
+    def test_hashes_only_report_changed_elements(self, tmp_path):
+        old, new = create_models(tmp_path)
+        ifc_diff = run_diff(old, new, tmp_path / "diff.json", use_hashes=True)
+        assert ifc_diff.added_elements == {GLOBAL_IDS["E"]}
+        assert ifc_diff.deleted_elements == {GLOBAL_IDS["D"]}
+        assert set(ifc_diff.change_register) == {GLOBAL_IDS["A"], GLOBAL_IDS["B"]}
+        assert ifc_diff.change_register[GLOBAL_IDS["B"]] == {"has_geometry_change": True}
+        with open(tmp_path / "diff.json", encoding="utf-8") as f:
+            assert set(json.load(f)["changed"]) == {GLOBAL_IDS["A"], GLOBAL_IDS["B"]}
+
+    def test_diffing_in_parallel(self, tmp_path):
+        old, new = create_models(tmp_path)
+        serial = run_diff(old, new, tmp_path / "serial.json", use_hashes=True)
+        parallel = run_diff(old, new, tmp_path / "parallel.json", use_hashes=True, jobs=2)
+        assert parallel.total_changed == serial.total_changed == 2
+        with open(tmp_path / "serial.json", encoding="utf-8") as f:
+            expected = json.load(f)["changed"]
+        with open(tmp_path / "parallel.json", encoding="utf-8") as f:
+            assert json.load(f)["changed"] == expected
+
+    def test_streaming_json_lines(self, tmp_path):
+        old, new = create_models(tmp_path)
+        ifc_diff = run_diff(old, new, tmp_path / "diff.jsonl", use_hashes=True)
+        records = read_json_lines(tmp_path / "diff.jsonl")
+        assert sorted((r["type"], r["global_id"]) for r in records) == sorted(
+            [
+                ("added", GLOBAL_IDS["E"]),
+                ("deleted", GLOBAL_IDS["D"]),
+                ("changed", GLOBAL_IDS["A"]),
+                ("changed", GLOBAL_IDS["B"]),
+            ]
+        )
+        # Streamed changes are not also kept in memory
+        assert ifc_diff.change_register == {}
+        assert ifc_diff.total_changed == 2
+
+    def test_streaming_json_lines_in_parallel(self, tmp_path):
+        old, new = create_models(tmp_path)
+        run_diff(old, new, tmp_path / "serial.jsonl", use_hashes=True)
+        run_diff(old, new, tmp_path / "parallel.jsonl", use_hashes=True, jobs=2)
+        serial = sorted(read_json_lines(tmp_path / "serial.jsonl"), key=lambda r: (r["type"], r["global_id"]))
+        parallel = sorted(read_json_lines(tmp_path / "parallel.jsonl"), key=lambda r: (r["type"], r["global_id"]))
+        assert parallel == serial
+
+
+class TestEntityHasher:
+    def test_hashes_do_not_depend_on_step_ids(self, tmp_path):
+        old, new = create_models(tmp_path)
+        old_file, new_file = ifcopenshell.open(old), ifcopenshell.open(new)
+        old_hasher, new_hasher = ifcdiff.EntityHasher(3), ifcdiff.EntityHasher(3)
+        old_wall, new_wall = old_file.by_id(GLOBAL_IDS["C"]), new_file.by_id(GLOBAL_IDS["C"])
+        assert old_wall.id() != new_wall.id()
+        assert old_hasher.get_attributes_hash(old_wall) == new_hasher.get_attributes_hash(new_wall)
+        assert old_hasher.get_geometry_hash(old_wall) == new_hasher.get_geometry_hash(new_wall)
+
+    def test_insignificant_digits_are_ignored(self):
+        hasher = ifcdiff.EntityHasher(2)
+        assert hasher.canonicalise((1, 1.001, -0.0)) == (1.0, 1.0, 0.0)
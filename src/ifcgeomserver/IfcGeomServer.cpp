@@ -173,6 +173,7 @@ const int32_t GET_LOG   = BYE       + 1;
 const int32_t LOG       = GET_LOG   + 1;
 const int32_t DEFLECTION = LOG        + 1;
 const int32_t SETTING    = DEFLECTION + 1;
+const int32_t INCLUDE    = SETTING    + 1;
 
 class Hello : public Command {
 private:
@@ -449,6 +450,31 @@ public:
 	uint32_t value() const { return value_; }
 };
 
+// Restricts the products of subsequent models to the given instance ids,
+// so that a model can be processed in parts by several server processes.
+// An empty list of ids removes the restriction.
+class Include : public Command {
+private:
+	std::set<int32_t> ids_;
+protected:
+	void read_content(std::istream& s) {
+		ids_.clear();
+		const int32_t n = sread<int32_t>(s);
+		for (int32_t i = 0; i < n; ++i) {
+			ids_.insert(sread<int32_t>(s));
+		}
+	}
+	void write_content(std::ostream& s) {
+		swrite<int32_t>(s, (int32_t)ids_.size());
+		for (auto& id : ids_) {
+			swrite(s, id);
+		}
+	}
+public:
+	Include() : Command(INCLUDE) {};
+	const std::set<int32_t>& ids() const { return ids_; }
+};
+
 static const std::string TOTAL_SURFACE_AREA = "TOTAL_SURFACE_AREA";
 static const std::string TOTAL_SHAPE_VOLUME = "TOTAL_SHAPE_VOLUME";
 static const std::string SURFACE_AREA_ALONG_X = "SURFACE_AREA_ALONG_X";
@@ -563,6 +589,7 @@ int main () {
 	IfcGeom::Iterator<double, double>* iterator = 0;
 	IfcParse::IfcFile* file = 0;
 	std::vector< std::pair<uint32_t, uint32_t> > setting_pairs;
+	std::set<int32_t> include_ids;
 
 	Hello().write(std::cout);
 
@@ -595,8 +622,24 @@ int main () {
 			settings.set_deflection_tolerance(deflection);
 
 			file = new IfcParse::IfcFile(data, (int)len);
-			iterator = new IfcGeom::Iterator<double, double>(settings, file);
+			if (include_ids.empty()) {
+				iterator = new IfcGeom::Iterator<double, double>(settings, file);
+			} else {
+				const std::set<int32_t>* ids = &include_ids;
+				IfcGeom::filter_t include_filter = [ids](IfcUtil::IfcBaseEntity* prod) {
+					return ids->find((int32_t)prod->data().id()) != ids->end();
+				};
+				iterator = new IfcGeom::Iterator<double, double>(settings, file, { include_filter });
+			}
 			has_more = iterator->initialize();
+			if (!has_more) {
+				// None of the (included) products has a representation that can be processed,
+				// the server is ready for the next model as it would be at the end of iteration
+				delete iterator;
+				delete file;
+				file = 0;
+				iterator = 0;
+			}
 
 			More(has_more).write(std::cout);
 			continue;
@@ -659,6 +702,16 @@ int main () {
 				break;
 			}
 		}
+		case INCLUDE: {
+			Include i; i.read(std::cin);
+			if (!iterator) {
+				include_ids = i.ids();
+				continue;
+			} else {
+				exit_code = 1;
+				break;
+			}
+		}
 		default:
 			exit_code = 1; 
 			break;
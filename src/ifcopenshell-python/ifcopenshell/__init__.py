@@ -53,6 +53,7 @@ except Exception as e:
 from . import guid
 from .file import file
 from .entity_instance import entity_instance
+from .scanner import scan
 
 READ_ERROR = ifcopenshell_wrapper.file_open_status.READ_ERROR
 NO_HEADER = ifcopenshell_wrapper.file_open_status.NO_HEADER
@@ -67,8 +68,16 @@ class SchemaError(Error):
     pass
 
 
-def open(fn):
-    f = ifcopenshell_wrapper.open(os.path.abspath(fn))
+def open(fn, mmap=False, lazy=False):
+    """
+    Opens the IFC SPF file at path `fn`.
+
+    With `mmap` the file is memory mapped instead of read into memory, which requires IfcOpenShell to be built with
+    USE_MMAP. With `lazy` the attributes of instances are only parsed on first access and the GlobalId and inverse
+    maps are built on the first call that needs them, such as `by_guid()`, `get_inverse()` or a modification. This
+    reduces the time and memory spent opening large files of which only a few instances are read.
+    """
+    f = ifcopenshell_wrapper.open(os.path.abspath(fn), mmap, lazy)
     if f.good():
         return file(f)
     else:
@@ -7,6 +7,8 @@ import ifcopenshell.api
 
 pre_listeners = {}
 post_listeners = {}
+recorders = {}
+usecases = {}
 
 
 def run(usecase_path, ifc_file=None, should_run_listeners=True, **settings):
@@ -14,6 +16,32 @@ def run(usecase_path, ifc_file=None, should_run_listeners=True, **settings):
         for listener in pre_listeners.get(usecase_path, {}).values():
             listener(usecase_path, ifc_file, settings)
 
+    if recorders:
+        vcs_settings = serialise_settings(settings)
+        for recorder in recorders.values():
+            recorder(usecase_path, ifc_file, vcs_settings)
+
+    usecase_class = usecases.get(usecase_path)
+    if usecase_class is None:
+        usecase_class = usecases[usecase_path] = get_usecase_class(usecase_path)
+
+    if ifc_file:
+        result = usecase_class(ifc_file, **settings).execute()
+    else:
+        result = usecase_class(**settings).execute()
+
+    if should_run_listeners:
+        for listener in post_listeners.get(usecase_path, {}).values():
+            listener(usecase_path, ifc_file, settings)
+
+    return result
+
+
+def get_usecase_class(usecase_path):
+    return importlib.import_module(f"ifcopenshell.api.{usecase_path}").Usecase
+
+
+def serialise_settings(settings):
     def serialise_entity_instance(entity):
         return {"cast_type": "entity_instance", "value": entity.id(), "Name": getattr(entity, "Name", None)}
 
@@ -25,33 +53,26 @@ def run(usecase_path, ifc_file=None, should_run_listeners=True, **settings):
             vcs_settings[key] = {"cast_type": "ndarray", "value": value.tolist()}
         elif isinstance(value, list) and value and isinstance(value[0], ifcopenshell.entity_instance):
             vcs_settings[key] = [serialise_entity_instance(i) for i in value]
-    if "add_representation" in usecase_path:
-        pass
-        # print(usecase_path, "{ ... settings too complex right now ... }")
-    elif "owner." in usecase_path:
-        pass
-    else:
-        pass
-        # print(vcs_settings)
-        # try:
-        #    print(usecase_path, json.dumps(vcs_settings))
-        # except:
-        #    print(usecase_path, vcs_settings)
+    return vcs_settings
 
-    importlib.import_module(f"ifcopenshell.api.{usecase_path}")
-    module, usecase = usecase_path.split(".")
-    usecase_class = getattr(getattr(getattr(ifcopenshell.api, module), usecase), "Usecase")
 
-    if ifc_file:
-        result = usecase_class(ifc_file, **settings).execute()
-    else:
-        result = usecase_class(**settings).execute()
+def add_recorder(name, callback):
+    """Add a recorder which receives the serialised settings of every use case run
 
-    if should_run_listeners:
-        for listener in post_listeners.get(usecase_path, {}).values():
-            listener(usecase_path, ifc_file, settings)
+    Settings are only serialised whilst at least one recorder is registered.
 
-    return result
+    :param name: string, name of recorder
+    :param callback: callback function
+    """
+    recorders[name] = callback
+
+
+def remove_recorder(name):
+    """Remove a recorder
+
+    :param name: string, name of recorder
+    """
+    recorders.pop(name, None)
 
 
 def add_pre_listener(usecase_path, name, callback):
@@ -7,15 +7,14 @@ class Usecase:
         self.file = file
         self.settings = {
             "product": None,
+            "products": None,
             "relating_object": None,
         }
         for key, value in settings.items():
             self.settings[key] = value
 
     def execute(self):
-        decomposes = None
-        if self.settings["product"].Decomposes:
-            decomposes = self.settings["product"].Decomposes[0]
+        products = self.settings["products"] or [self.settings["product"]]
 
         is_decomposed_by = None
         for rel in self.settings["relating_object"].IsDecomposedBy:
@@ -23,22 +22,30 @@ class Usecase:
                 is_decomposed_by = rel
                 break
 
-        if decomposes and decomposes == is_decomposed_by:
+        # Group products by their old decomposition so that each relationship is only rewritten once
+        old_rels = {}
+        new_products = []
+        for product in dict.fromkeys(products):
+            if product.Decomposes:
+                decomposes = product.Decomposes[0]
+                if decomposes == is_decomposed_by:
+                    continue
+                old_rels.setdefault(decomposes, set()).add(product)
+            new_products.append(product)
+
+        if not new_products:
             return
 
-        if decomposes:
-            related_objects = list(decomposes.RelatedObjects)
-            related_objects.remove(self.settings["product"])
+        for rel, old_products in old_rels.items():
+            related_objects = [o for o in rel.RelatedObjects if o not in old_products]
             if related_objects:
-                decomposes.RelatedObjects = related_objects
-                ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": decomposes})
+                rel.RelatedObjects = related_objects
+                ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": rel})
             else:
-                self.file.remove(decomposes)
+                self.file.remove(rel)
 
         if is_decomposed_by:
-            related_objects = set(is_decomposed_by.RelatedObjects)
-            related_objects.add(self.settings["product"])
-            is_decomposed_by.RelatedObjects = list(related_objects)
+            is_decomposed_by.RelatedObjects = list(is_decomposed_by.RelatedObjects) + new_products
             ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": is_decomposed_by})
         else:
             is_decomposed_by = self.file.create_entity(
@@ -46,7 +53,7 @@ class Usecase:
                 **{
                     "GlobalId": ifcopenshell.guid.new(),
                     "OwnerHistory": ifcopenshell.api.run("owner.create_owner_history", self.file),
-                    "RelatedObjects": [self.settings["product"]],
+                    "RelatedObjects": new_products,
                     "RelatingObject": self.settings["relating_object"],
                 }
             )
@@ -4,6 +4,8 @@ import ifcopenshell.util.cost
 
 
 class CostValueTrait:
+    subtotals = {}
+
     @classmethod
     def load_cost_values(cls, root_element, data):
         data["CostValues"] = []
@@ -94,6 +96,15 @@ class CostValueTrait:
 
     @classmethod
     def sum_child_root_elements(cls, root_element, category_filter=None):
+        # Subtotals are memoised per load so that every branch of the hierarchy is only rolled up once
+        key = (root_element.id(), category_filter)
+        result = cls.subtotals.get(key)
+        if result is None:
+            result = cls.subtotals[key] = cls.calculate_child_root_elements(root_element, category_filter)
+        return result
+
+    @classmethod
+    def calculate_child_root_elements(cls, root_element, category_filter=None):
         result = 0
         for rel in root_element.IsNestedBy:
             for child_root_element in rel.RelatedObjects:
@@ -140,6 +151,7 @@ class Data(CostValueTrait):
     physical_quantities = {}
     cost_values = {}
     categories = []
+    subtotals = {}
 
     @classmethod
     def purge(cls):
@@ -149,6 +161,7 @@ class Data(CostValueTrait):
         cls.physical_quantities = {}
         cls.cost_values = {}
         cls.categories = []
+        cls.subtotals = {}
 
     @classmethod
     def set_categories(cls, categories):
@@ -161,6 +174,7 @@ class Data(CostValueTrait):
         cls.cost_items = {}
         cls.physical_quantities = {}
         cls.cost_values = {}
+        cls.subtotals = {}
 
         for cost_schedule in cls.file.by_type("IfcCostSchedule"):
             data = cost_schedule.get_info()
@@ -30,6 +30,7 @@ class Usecase:
         placement = self.file.createIfcLocalPlacement(placement_rel_to, self.get_relative_placement(placement_rel_to))
         old_placement = self.settings["product"].ObjectPlacement
         if old_placement:
+            ifcopenshell.util.placement.invalidate_cache(self.file, old_placement)
             self.settings["product"].ObjectPlacement = None
             inverses = self.file.get_inverse(old_placement)
             for inverse in inverses:
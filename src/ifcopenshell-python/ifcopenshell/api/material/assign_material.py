@@ -7,14 +7,51 @@ import ifcopenshell.util.representation
 class Usecase:
     def __init__(self, file, **settings):
         self.file = file
-        self.settings = {"product": None, "type": "IfcMaterial", "material": None}
+        self.settings = {"product": None, "products": None, "type": "IfcMaterial", "material": None}
         for key, value in settings.items():
             self.settings[key] = value
 
     def execute(self):
+        if self.settings["products"]:
+            return self.assign_products()
         material = ifcopenshell.util.element.get_material(self.settings["product"])
         if material:
             ifcopenshell.api.run("material.unassign_material", self.file, product=self.settings["product"])
+        return self.assign_material()
+
+    def assign_products(self):
+        products = list(dict.fromkeys(self.settings["products"]))
+        self.unassign_materials(products)
+        if self.settings["type"] == "IfcMaterial":
+            return self.assign_ifc_material(products)
+        results = []
+        for product in products:
+            self.settings["product"] = product
+            results.append(self.assign_material())
+        return results
+
+    def unassign_materials(self, products):
+        # Plain associations shared by many products are rewritten once rather than once per product
+        old_rels = {}
+        for product in products:
+            rels = []
+            if not product.is_a("IfcTypeObject"):
+                rels = [r for r in product.HasAssociations if r.is_a("IfcRelAssociatesMaterial")]
+            if len(rels) == 1 and rels[0].RelatingMaterial.is_a() not in [
+                "IfcMaterialLayerSetUsage",
+                "IfcMaterialProfileSetUsage",
+            ]:
+                old_rels.setdefault(rels[0], set()).add(product)
+            elif ifcopenshell.util.element.get_material(product):
+                ifcopenshell.api.run("material.unassign_material", self.file, product=product)
+        for rel, old_products in old_rels.items():
+            related_objects = [o for o in rel.RelatedObjects if o not in old_products]
+            if related_objects:
+                rel.RelatedObjects = related_objects
+            else:
+                self.file.remove(rel)
+
+    def assign_material(self):
         if self.settings["type"] == "IfcMaterial":
             return self.assign_ifc_material()
         elif self.settings["type"] == "IfcMaterialConstituentSet":
@@ -86,21 +123,20 @@ class Usecase:
     def create_profile_set_usage(self, material_set):
         return self.file.create_entity("IfcMaterialProfileSetUsage", **{"ForProfileSet": material_set})
 
-    def assign_ifc_material(self):
+    def assign_ifc_material(self, products=None):
+        products = products or [self.settings["product"]]
         rel = self.get_rel_associates_material(self.settings["material"])
         if not rel:
-            return self.create_material_association(self.settings["material"])
-        related_objects = list(rel.RelatedObjects)
-        related_objects.append(self.settings["product"])
-        rel.RelatedObjects = related_objects
+            return self.create_material_association(self.settings["material"], products)
+        rel.RelatedObjects = list(rel.RelatedObjects) + products
         return rel
 
-    def create_material_association(self, relating_material):
+    def create_material_association(self, relating_material, products=None):
         return self.file.create_entity(
             "IfcRelAssociatesMaterial",
             **{
                 "GlobalId": ifcopenshell.guid.new(),
-                "RelatedObjects": [self.settings["product"]],
+                "RelatedObjects": products or [self.settings["product"]],
                 "RelatingMaterial": relating_material,
             }
         )
@@ -8,6 +8,7 @@ class Data(CostValueTrait):
     resources = {}
     resource_times = {}
     cost_values = {}
+    subtotals = {}
 
     @classmethod
     def purge(cls):
@@ -15,12 +16,14 @@ class Data(CostValueTrait):
         cls.resources = {}
         cls.resource_times = {}
         cls.cost_values = {}
+        cls.subtotals = {}
 
     @classmethod
     def load(cls, file):
         cls._file = file
         if not cls._file:
             return
+        cls.subtotals = {}
         cls.load_resources()
         cls.load_resource_times()
         cls.is_loaded = True
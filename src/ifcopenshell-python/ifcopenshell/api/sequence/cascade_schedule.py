@@ -12,65 +12,122 @@ class Usecase:
 
     def execute(self):
         self.calendar_cache = {}
-        self.cascade_task(self.settings["task"], is_first_task=True)
+        self.nodes = {}
+        task = self.settings["task"]
 
-    def cascade_task(self, task, is_first_task=False):
-        if not task.TaskTime:
-            return
+        # Dates are propagated in memory through the tasks that succeed the edited task. A task is only recalculated
+        # when the dates of one of its predecessors changed and every task time is written back once at the end.
+        changed = set()
+        for node in self.get_cascade_order(task):
+            is_first_task = node["task"].id() == task.id()
+            if is_first_task or any(rel["predecessor"] in changed for rel in node["predecessors"]):
+                if self.cascade_task(node, is_first_task=is_first_task):
+                    changed.add(node["task"].id())
+
+        for node in self.nodes.values():
+            task_time = node["task_time"]
+            if task_time is None:
+                continue
+            if task_time.ScheduleStart != node["ScheduleStart"]:
+                task_time.ScheduleStart = node["ScheduleStart"]
+            if task_time.ScheduleFinish != node["ScheduleFinish"]:
+                task_time.ScheduleFinish = node["ScheduleFinish"]
+
+    def get_cascade_order(self, task):
+        # Successors are sorted topologically, so that every task is visited after all of its predecessors within
+        # the cascade. The edited task always comes first and tasks in a cycle after it are not visited.
+        reachable = {}
+        queue = [task]
+        while queue:
+            node = self.get_node(queue.pop())
+            if node["task"].id() in reachable:
+                continue
+            reachable[node["task"].id()] = node
+            queue.extend(node["successors"])
+
+        in_degree = {
+            task_id: sum(1 for rel in node["predecessors"] if rel["predecessor"] in reachable)
+            for task_id, node in reachable.items()
+        }
+        in_degree[task.id()] = 0
+        queue = [task.id()]
+        while queue:
+            node = reachable[queue.pop()]
+            yield node
+            for successor in node["successors"]:
+                in_degree[successor.id()] -= 1
+                if not in_degree[successor.id()]:
+                    queue.append(successor.id())
+
+    def get_node(self, task):
+        node = self.nodes.get(task.id())
+        if node is None:
+            task_time = task.TaskTime
+            node = self.nodes[task.id()] = {
+                "task": task,
+                "task_time": task_time,
+                "ScheduleStart": task_time.ScheduleStart if task_time else None,
+                "ScheduleFinish": task_time.ScheduleFinish if task_time else None,
+                "predecessors": [
+                    {
+                        "predecessor": rel.RelatingProcess.id(),
+                        "task": rel.RelatingProcess,
+                        "type": rel.SequenceType,
+                        "lag_time": rel.TimeLag,
+                    }
+                    for rel in task.IsSuccessorFrom
+                ],
+                "successors": [rel.RelatedProcess for rel in task.IsPredecessorTo],
+            }
+        return node
+
+    def cascade_task(self, node, is_first_task=False):
+        task = node["task"]
+        if not node["task_time"]:
+            return False
 
         duration = (
-            ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleDuration)
-            if task.TaskTime.ScheduleDuration
+            ifcopenshell.util.date.ifc2datetime(node["task_time"].ScheduleDuration)
+            if node["task_time"].ScheduleDuration
             else datetime.timedelta()
         )
+        duration_type = node["task_time"].DurationType
 
         finishes = []
         starts = []
 
-        for rel in task.IsSuccessorFrom:
-            predecessor = rel.RelatingProcess
-            if rel.SequenceType == "FINISH_START":
+        for rel in node["predecessors"]:
+            predecessor = rel["task"]
+            if rel["type"] == "FINISH_START":
                 finish = self.get_task_time_attribute(predecessor, "ScheduleFinish")
                 if not finish:
                     continue
-                if rel.TimeLag:
-                    days = self.get_lag_time_days(rel.TimeLag)
-                    duration_type = rel.TimeLag.DurationType
-                    starts.append(self.offset_date(finish, days, duration_type, self.get_calendar(task)))
-                    starts.append(self.offset_date(finish, days, duration_type, self.get_calendar(predecessor)))
+                if rel["lag_time"]:
+                    starts.extend(self.offset_lag_time(finish, rel["lag_time"], task, predecessor))
                 else:
                     starts.append(finish)
-            elif rel.SequenceType == "START_START":
+            elif rel["type"] == "START_START":
                 start = self.get_task_time_attribute(predecessor, "ScheduleStart")
                 if not start:
                     continue
-                if rel.TimeLag:
-                    days = self.get_lag_time_days(rel.TimeLag)
-                    duration_type = rel.TimeLag.DurationType
-                    starts.append(self.offset_date(start, days, duration_type, self.get_calendar(task)))
-                    starts.append(self.offset_date(start, days, duration_type, self.get_calendar(predecessor)))
+                if rel["lag_time"]:
+                    starts.extend(self.offset_lag_time(start, rel["lag_time"], task, predecessor))
                 else:
                     starts.append(start)
-            elif rel.SequenceType == "FINISH_FINISH":
+            elif rel["type"] == "FINISH_FINISH":
                 finish = self.get_task_time_attribute(predecessor, "ScheduleFinish")
                 if not finish:
                     continue
-                if rel.TimeLag:
-                    days = self.get_lag_time_days(rel.TimeLag)
-                    duration_type = rel.TimeLag.DurationType
-                    finishes.append(self.offset_date(finish, days, duration_type, self.get_calendar(task)))
-                    finishes.append(self.offset_date(finish, days, duration_type, self.get_calendar(predecessor)))
+                if rel["lag_time"]:
+                    finishes.extend(self.offset_lag_time(finish, rel["lag_time"], task, predecessor))
                 else:
                     finishes.append(finish)
-            elif rel.SequenceType == "START_FINISH":
+            elif rel["type"] == "START_FINISH":
                 start = self.get_task_time_attribute(predecessor, "ScheduleStart")
                 if not start:
                     continue
-                if rel.TimeLag:
-                    days = self.get_lag_time_days(rel.TimeLag)
-                    duration_type = rel.TimeLag.DurationType
-                    finishes.append(self.offset_date(start, days, duration_type, self.get_calendar(task)))
-                    finishes.append(self.offset_date(start, days, duration_type, self.get_calendar(predecessor)))
+                if rel["lag_time"]:
+                    finishes.extend(self.offset_lag_time(start, rel["lag_time"], task, predecessor))
                 else:
                     finishes.append(start)
 
@@ -78,67 +135,56 @@ class Usecase:
             start = max(starts)
             finish = max(finishes)
             potential_finish = datetime.datetime.combine(
-                ifcopenshell.util.sequence.get_finish_date(
-                    start,
-                    duration,
-                    task.TaskTime.DurationType,
-                    self.get_calendar(task),
-                ),
+                ifcopenshell.util.sequence.get_finish_date(start, duration, duration_type, self.get_calendar(task)),
                 datetime.datetime.min.time(),
             )
             if potential_finish > finish:
                 start_ifc = ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime")
-                if task.TaskTime.ScheduleStart == start_ifc and not is_first_task:
-                    return
-                task.TaskTime.ScheduleStart = start_ifc
-                task.TaskTime.ScheduleFinish = ifcopenshell.util.date.datetime2ifc(potential_finish, "IfcDateTime")
+                if node["ScheduleStart"] == start_ifc and not is_first_task:
+                    return False
+                node["ScheduleStart"] = start_ifc
+                node["ScheduleFinish"] = ifcopenshell.util.date.datetime2ifc(potential_finish, "IfcDateTime")
             else:
                 finish_ifc = ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime")
-                if task.TaskTime.ScheduleFinish == finish_ifc and not is_first_task:
-                    return
-                task.TaskTime.ScheduleFinish = finish_ifc
-                task.TaskTime.ScheduleStart = ifcopenshell.util.date.datetime2ifc(
+                if node["ScheduleFinish"] == finish_ifc and not is_first_task:
+                    return False
+                node["ScheduleFinish"] = finish_ifc
+                node["ScheduleStart"] = ifcopenshell.util.date.datetime2ifc(
                     ifcopenshell.util.sequence.get_finish_date(
-                        finish,
-                        -duration,
-                        task.TaskTime.DurationType,
-                        self.get_calendar(task),
+                        finish, -duration, duration_type, self.get_calendar(task)
                     ),
                     "IfcDateTime",
                 )
         elif finishes:
             finish = max(finishes)
             finish_ifc = ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime")
-            if task.TaskTime.ScheduleFinish == finish_ifc and not is_first_task:
-                return
-            task.TaskTime.ScheduleFinish = finish_ifc
-            task.TaskTime.ScheduleStart = ifcopenshell.util.date.datetime2ifc(
-                ifcopenshell.util.sequence.get_finish_date(
-                    finish,
-                    -duration,
-                    task.TaskTime.DurationType,
-                    self.get_calendar(task),
-                ),
+            if node["ScheduleFinish"] == finish_ifc and not is_first_task:
+                return False
+            node["ScheduleFinish"] = finish_ifc
+            node["ScheduleStart"] = ifcopenshell.util.date.datetime2ifc(
+                ifcopenshell.util.sequence.get_finish_date(finish, -duration, duration_type, self.get_calendar(task)),
                 "IfcDateTime",
             )
         elif starts:
             start = max(starts)
             start_ifc = ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime")
-            if task.TaskTime.ScheduleStart == start_ifc and not is_first_task:
-                return
-            task.TaskTime.ScheduleStart = start_ifc
-            task.TaskTime.ScheduleFinish = ifcopenshell.util.date.datetime2ifc(
-                ifcopenshell.util.sequence.get_finish_date(
-                    start,
-                    duration,
-                    task.TaskTime.DurationType,
-                    self.get_calendar(task),
-                ),
+            if node["ScheduleStart"] == start_ifc and not is_first_task:
+                return False
+            node["ScheduleStart"] = start_ifc
+            node["ScheduleFinish"] = ifcopenshell.util.date.datetime2ifc(
+                ifcopenshell.util.sequence.get_finish_date(start, duration, duration_type, self.get_calendar(task)),
                 "IfcDateTime",
             )
 
-        for rel in task.IsPredecessorTo:
-            self.cascade_task(rel.RelatedProcess)
+        return True
+
+    def offset_lag_time(self, date, lag_time, task, predecessor):
+        days = self.get_lag_time_days(lag_time)
+        duration_type = lag_time.DurationType
+        return [
+            self.offset_date(date, days, duration_type, self.get_calendar(task)),
+            self.offset_date(date, days, duration_type, self.get_calendar(predecessor)),
+        ]
 
     def get_lag_time_days(self, lag_time):
         return ifcopenshell.util.date.ifc2datetime(lag_time.LagValue.wrappedValue).days
@@ -155,7 +201,8 @@ class Usecase:
         )
 
     def get_task_time_attribute(self, task, attribute):
-        if task.TaskTime:
-            value = getattr(task.TaskTime, attribute)
-            if value:
-                return ifcopenshell.util.date.ifc2datetime(value)
+        # Dates of tasks in the cascade are read from memory, as they may not have been written back yet
+        node = self.nodes.get(task.id())
+        value = node[attribute] if node else getattr(task.TaskTime, attribute) if task.TaskTime else None
+        if value:
+            return ifcopenshell.util.date.ifc2datetime(value)
@@ -18,21 +18,15 @@ class Usecase:
         self.start_dates = []
         self.build_network_graph()
 
-        self.pending_nodes = set(self.g.nodes)
-        while self.pending_nodes:
-            remaining_nodes = set()
-            for pending_node in self.pending_nodes:
-                if not self.forward_pass(pending_node):
-                    remaining_nodes.add(pending_node)
-            self.pending_nodes = remaining_nodes
+        # Calendars may have been edited since they were last compiled
+        ifcopenshell.util.sequence.clear_calendar_indices(self.file)
 
-        self.pending_nodes = set(self.g.nodes)
-        while self.pending_nodes:
-            remaining_nodes = set()
-            for pending_node in self.pending_nodes:
-                if not self.backward_pass(pending_node):
-                    remaining_nodes.add(pending_node)
-            self.pending_nodes = remaining_nodes
+        # In topological order, every predecessor is passed before its successors, so each pass visits a node once
+        nodes = list(nx.topological_sort(self.g))
+        for node in nodes:
+            self.forward_pass(node)
+        for node in reversed(nodes):
+            self.backward_pass(node)
 
         self.update_task_times()
 
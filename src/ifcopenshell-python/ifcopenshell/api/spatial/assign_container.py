@@ -1,5 +1,7 @@
+import numpy as np
 import ifcopenshell
 import ifcopenshell.api
+import ifcopenshell.util.element
 import ifcopenshell.util.placement
 
 
@@ -8,48 +10,83 @@ class Usecase:
         self.file = file
         self.settings = {
             "product": None,
+            "products": None,
             "relating_structure": None,
         }
         for key, value in settings.items():
             self.settings[key] = value
 
     def execute(self):
-        contained_in_structure = self.settings["product"].ContainedInStructure
+        products = self.settings["products"] or [self.settings["product"]]
         contains_elements = self.settings["relating_structure"].ContainsElements
+        contains_elements = contains_elements[0] if contains_elements else None
 
-        if contains_elements and contained_in_structure and contained_in_structure[0] == contains_elements[0]:
+        # Group products by their old containment so that each relationship is only rewritten once
+        old_rels = {}
+        new_products = []
+        for product in dict.fromkeys(products):
+            contained_in_structure = product.ContainedInStructure
+            if contained_in_structure:
+                if contained_in_structure[0] == contains_elements:
+                    continue
+                old_rels.setdefault(contained_in_structure[0], set()).add(product)
+            new_products.append(product)
+
+        if not new_products:
             return
 
-        if contained_in_structure:
-            related_elements = list(contained_in_structure[0].RelatedElements)
-            related_elements.remove(self.settings["product"])
+        for rel, old_products in old_rels.items():
+            related_elements = [e for e in rel.RelatedElements if e not in old_products]
             if related_elements:
-                contained_in_structure[0].RelatedElements = related_elements
-                ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": contained_in_structure[0]})
+                rel.RelatedElements = related_elements
+                ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": rel})
             else:
-                self.file.remove(contained_in_structure[0])
+                self.file.remove(rel)
 
         if contains_elements:
-            related_elements = list(contains_elements[0].RelatedElements)
-            related_elements.append(self.settings["product"])
-            contains_elements[0].RelatedElements = related_elements
-            ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": contains_elements[0]})
+            contains_elements.RelatedElements = list(contains_elements.RelatedElements) + new_products
+            ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": contains_elements})
         else:
             contains_elements = self.file.create_entity(
                 "IfcRelContainedInSpatialStructure",
                 **{
                     "GlobalId": ifcopenshell.guid.new(),
                     "OwnerHistory": ifcopenshell.api.run("owner.create_owner_history", self.file),
-                    "RelatedElements": [self.settings["product"]],
+                    "RelatedElements": new_products,
                     "RelatingStructure": self.settings["relating_structure"],
                 }
             )
 
-        if getattr(self.settings["product"], "ObjectPlacement", None):
-            ifcopenshell.api.run(
-                "geometry.edit_object_placement",
-                self.file,
-                product=self.settings["product"],
-                matrix=ifcopenshell.util.placement.get_local_placement(self.settings["product"].ObjectPlacement),
-                is_si=False,
+        self.relate_placements(new_products)
+
+    def relate_placements(self, products):
+        # Products keep their absolute position, so each local placement is made relative to the new
+        # container in place, using one inverse container matrix for all products
+        placement_rel_to = self.settings["relating_structure"].ObjectPlacement
+        inverse_matrix = np.eye(4)
+        if placement_rel_to:
+            inverse_matrix = np.linalg.inv(ifcopenshell.util.placement.get_local_placement(placement_rel_to))
+        for product in products:
+            placement = getattr(product, "ObjectPlacement", None)
+            if not placement:
+                continue
+            if not placement.is_a("IfcLocalPlacement"):
+                ifcopenshell.api.run(
+                    "geometry.edit_object_placement",
+                    self.file,
+                    product=product,
+                    matrix=ifcopenshell.util.placement.get_local_placement(placement),
+                    is_si=False,
+                )
+                continue
+            matrix = inverse_matrix @ ifcopenshell.util.placement.get_local_placement(placement)
+            ifcopenshell.util.placement.invalidate_cache(self.file, placement)
+            old_relative_placement = placement.RelativePlacement
+            placement.PlacementRelTo = placement_rel_to
+            placement.RelativePlacement = self.file.createIfcAxis2Placement3D(
+                self.file.createIfcCartesianPoint(matrix[0:3, 3].tolist()),
+                self.file.createIfcDirection(matrix[0:3, 2].tolist()),
+                self.file.createIfcDirection(matrix[0:3, 0].tolist()),
             )
+            ifcopenshell.util.element.remove_deep(self.file, old_relative_placement)
+            ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": product})
@@ -8,54 +8,70 @@ class Usecase:
         self.file = file
         self.settings = {
             "related_object": None,
+            "related_objects": None,
             "relating_type": None,
         }
         for key, value in settings.items():
             self.settings[key] = value
 
     def execute(self):
+        related_objects = self.settings["related_objects"] or [self.settings["related_object"]]
+
         if self.file.schema == "IFC2X3":
-            is_typed_by = None
-            is_defined_by = self.settings["related_object"].IsDefinedBy
-            for rel in is_defined_by:
-                if rel.is_a("IfcRelDefinesByType"):
-                    is_typed_by = [rel]
-                    break
             types = self.settings["relating_type"].ObjectTypeOf
         else:
-            is_typed_by = self.settings["related_object"].IsTypedBy
             types = self.settings["relating_type"].Types
+        types = types[0] if types else None
+
+        # Group objects by their old type relationship so that each relationship is only rewritten once
+        old_rels = {}
+        new_objects = []
+        for related_object in dict.fromkeys(related_objects):
+            is_typed_by = self.get_is_typed_by(related_object)
+            if is_typed_by:
+                if is_typed_by == types:
+                    continue
+                old_rels.setdefault(is_typed_by, set()).add(related_object)
+            new_objects.append(related_object)
 
-        if types and is_typed_by == types:
+        if not new_objects:
             return
 
-        if is_typed_by:
-            related_objects = list(is_typed_by[0].RelatedObjects)
-            related_objects.remove(self.settings["related_object"])
-            if related_objects:
-                is_typed_by[0].RelatedObjects = related_objects
-                ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": is_typed_by[0]})
+        for rel, old_objects in old_rels.items():
+            objects = [o for o in rel.RelatedObjects if o not in old_objects]
+            if objects:
+                rel.RelatedObjects = objects
+                ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": rel})
             else:
-                self.file.remove(is_typed_by[0])
+                self.file.remove(rel)
 
         if types:
-            related_objects = list(types[0].RelatedObjects)
-            related_objects.append(self.settings["related_object"])
-            types[0].RelatedObjects = related_objects
-            ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": types[0]})
+            types.RelatedObjects = list(types.RelatedObjects) + new_objects
+            ifcopenshell.api.run("owner.update_owner_history", self.file, **{"element": types})
         else:
             types = self.file.create_entity(
                 "IfcRelDefinesByType",
                 **{
                     "GlobalId": ifcopenshell.guid.new(),
                     "OwnerHistory": ifcopenshell.api.run("owner.create_owner_history", self.file),
-                    "RelatedObjects": [self.settings["related_object"]],
+                    "RelatedObjects": new_objects,
                     "RelatingType": self.settings["relating_type"],
                 }
             )
 
-        self.map_representations()
-        self.map_material_usages()
+        for related_object in new_objects:
+            self.settings["related_object"] = related_object
+            self.map_representations()
+            self.map_material_usages()
+        return types
+
+    def get_is_typed_by(self, related_object):
+        if self.file.schema == "IFC2X3":
+            for rel in related_object.IsDefinedBy:
+                if rel.is_a("IfcRelDefinesByType"):
+                    return rel
+        elif related_object.IsTypedBy:
+            return related_object.IsTypedBy[0]
 
     def map_representations(self):
         if not self.settings["relating_type"].RepresentationMaps:
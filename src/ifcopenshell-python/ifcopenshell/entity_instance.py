@@ -33,6 +33,24 @@ except ImportError as e:
     logging = type("logger", (object,), {"exception": staticmethod(lambda s: print(s))})
 
 
+# Attribute categories and indices by name, per schema qualified entity name
+attribute_tables = {}
+
+
+def get_attribute(wrapped_data, name):
+    key = wrapped_data.qualified_name()
+    table = attribute_tables.get(key)
+    if table is None:
+        table = attribute_tables[key] = {}
+    attribute = table.get(name)
+    if attribute is None:
+        category = wrapped_data.get_attribute_category(name)
+        # Category 1 is a forward attribute, see entity_instance.__getattr__()
+        index = wrapped_data.get_argument_index(name) if category == 1 else None
+        attribute = table[name] = (category, index)
+    return attribute
+
+
 class entity_instance(object):
     """This is the base Python class for all IFC objects.
 
@@ -48,6 +66,8 @@ class entity_instance(object):
         >>> #423=IfcProductDefinitionShape($,$,(#409,#421))
     """
 
+    __slots__ = ("wrapped_data", "__weakref__")
+
     def __init__(self, e, file=None):
         if isinstance(e, tuple):
             e = ifcopenshell_wrapper.new_IfcBaseClass(*e)
@@ -56,11 +76,9 @@ class entity_instance(object):
 
     def __getattr__(self, name):
         INVALID, FORWARD, INVERSE = range(3)
-        attr_cat = self.wrapped_data.get_attribute_category(name)
+        attr_cat, attr_idx = get_attribute(self.wrapped_data, name)
         if attr_cat == FORWARD:
-            return entity_instance.wrap_value(
-                self.wrapped_data.get_argument(self.wrapped_data.get_argument_index(name)), self.wrapped_data.file
-            )
+            return entity_instance.wrap_value(self.wrapped_data.get_argument(attr_idx), self.wrapped_data.file)
         elif attr_cat == INVERSE:
             return entity_instance.wrap_value(self.wrapped_data.get_inverse(name), self.wrapped_data.file)
         else:
@@ -77,10 +95,31 @@ class entity_instance(object):
         else:
             return value
 
+    @staticmethod
+    def wrap_instance(e, file):
+        """Return an entity_instance for a wrapped instance, reusing the
+        existing one if the instance cache of the file is enabled
+
+        :param e: The wrapped instance
+        :param file: The file the instance belongs to, or None
+        :rtype: ifcopenshell.entity_instance.entity_instance
+        """
+        cache = getattr(file, "instance_cache", None)
+        if cache is None:
+            return entity_instance(e, file)
+        # Type declarations in select types, such as IfcLabel, have no id and are never cached
+        id = e.id()
+        inst = cache.get(id) if id else None
+        if inst is None:
+            inst = entity_instance(e, file)
+            if id:
+                cache[id] = inst
+        return inst
+
     @staticmethod
     def wrap_value(v, file):
         def wrap(e):
-            return entity_instance(e, file)
+            return entity_instance.wrap_instance(e, file)
 
         def is_instance(e):
             return isinstance(e, ifcopenshell_wrapper.entity_instance)
@@ -104,7 +143,9 @@ class entity_instance(object):
         :type attr: int
         :rtype: string
         """
-        attr_idx = attr if isinstance(attr, numbers.Integral) else self.wrapped_data.get_argument_index(attr)
+        attr_idx = attr if isinstance(attr, numbers.Integral) else get_attribute(self.wrapped_data, attr)[1]
+        if attr_idx is None:
+            attr_idx = self.wrapped_data.get_argument_index(attr)
         return self.wrapped_data.get_argument_type(attr_idx)
 
     def attribute_name(self, attr_idx):
@@ -117,7 +158,9 @@ class entity_instance(object):
         return self.wrapped_data.get_argument_name(attr_idx)
 
     def __setattr__(self, key, value):
-        index = self.wrapped_data.get_argument_index(key)
+        index = get_attribute(self.wrapped_data, key)[1]
+        if index is None:
+            index = self.wrapped_data.get_argument_index(key)
         self[index] = value
 
     def __getitem__(self, key):
@@ -126,8 +169,9 @@ class entity_instance(object):
         return entity_instance.wrap_value(self.wrapped_data.get_argument(key), self.wrapped_data.file)
 
     def __setitem__(self, idx, value):
-        if self.wrapped_data.file and self.wrapped_data.file.transaction:
-            self.wrapped_data.file.transaction.store_edit(self, idx, value)
+        transaction = self.wrapped_data.file.transaction if self.wrapped_data.file else None
+        if transaction:
+            old_value = transaction.pack_value(self[idx])
 
         attr_type = real_attr_type = self.attribute_type(idx).title().replace(" ", "")
         real_attr_type = real_attr_type.replace("Derived", "None")
@@ -160,6 +204,9 @@ class entity_instance(object):
                     % (real_attr_type, self.is_a(), self.attribute_name(idx), value)
                 )
 
+        if transaction:
+            transaction.store_edit(self, idx, old_value)
+
         return value
 
     def __len__(self):
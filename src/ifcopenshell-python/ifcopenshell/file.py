@@ -21,7 +21,12 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import io
+import array
+import marshal
 import numbers
+import tempfile
+import weakref
 import functools
 import ifcopenshell.util.element
 
@@ -36,45 +41,157 @@ except NameError:
     basestring = (str, bytes)
 
 
+def to_numpy_column(column):
+    import numpy
+
+    values = [v for v in column if v is not None]
+    if values and all(type(v) is int for v in values):
+        return numpy.array([0 if v is None else v for v in column], dtype=numpy.int64)
+    elif values and all(type(v) in (int, float) for v in values):
+        return numpy.array([numpy.nan if v is None else v for v in column], dtype=numpy.float64)
+    # Assigned one by one, as numpy would otherwise unpack aggregates into another dimension
+    result = numpy.empty(len(column), dtype=object)
+    for i, v in enumerate(column):
+        result[i] = v
+    return result
+
+
 class Transaction:
+    """A journal of the changes made to a file, which can be rolled back and committed again
+
+    Operations are stored as typed arrays of actions, entity ids and attribute
+    indices. Attribute values are packed with marshal, with entity references
+    replaced by their ids and class names interned in a string table. Once the
+    packed values exceed the file's transaction memory limit, or when the
+    transaction is pushed out of the undo history, they are spilled to disk.
+    """
+
+    CREATE = 0
+    EDIT = 1
+    DELETE = 2
+    BATCH_DELETE = 3
+
+    # Indices of the attributes that can reference other entities, by schema and class
+    reference_indices = {}
+
     def __init__(self, ifc_file):
         self.file = ifc_file
-        self.operations = []
+        self.actions = array.array("b")
+        self.ids = array.array("q")
+        self.indices = array.array("q")
+        self.strings = {}
+        self.string_values = []
+        self.blobs = []
+        self.offsets = None
+        self.lengths = None
+        self.size = 0
         self.is_batched = False
         self.batch_delete_index = 0
         self.batch_delete_ids = set()
         self.batch_inverses = []
 
-    def serialise_entity_instance(self, element):
-        info = element.get_info()
-        for key, value in info.items():
-            info[key] = self.serialise_value(element, value)
-        return info
-
-    def serialise_value(self, element, value):
-        return element.walk(
-            lambda v: isinstance(v, entity_instance),
-            lambda v: {"id": v.id()} if v.id() else {"type": v.is_a(), "value": v.wrappedValue},
-            value,
-        )
+    def __len__(self):
+        return len(self.actions)
+
+    def __bool__(self):
+        # A transaction that has just begun has no actions yet, but is still recording
+        return True
+
+    def pack_value(self, value):
+        if isinstance(value, entity_instance):
+            return [value.id()] if value.id() else [value.is_a(), self.pack_value(value.wrappedValue)]
+        elif isinstance(value, (tuple, list)):
+            return tuple(map(self.pack_value, value))
+        return value
+
+    def unpack_value(self, value):
+        # Entity references are the only lists in packed values, tuples are aggregates
+        if isinstance(value, list):
+            if len(value) == 1:
+                return self.file.by_id(value[0])
+            return self.file.create_entity(value[0], self.unpack_value(value[1]))
+        elif isinstance(value, tuple):
+            return tuple(map(self.unpack_value, value))
+        return value
+
+    def pack_entity_instance(self, element):
+        values = []
+        for i in range(len(element)):
+            try:
+                values.append(self.pack_value(element[i]))
+            except (RuntimeError, ValueError):
+                values.append(None)
+        return tuple(values)
+
+    def unpack_entity_instance(self, element, values):
+        for i, value in enumerate(values):
+            if value is None:
+                continue
+            try:
+                element[i] = self.unpack_value(value)
+            except (RuntimeError, ValueError):
+                # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
+                pass
 
-    def unserialise_value(self, element, value):
-        return element.walk(
-            lambda v: isinstance(v, dict),
-            lambda v: self.file.by_id(v["id"]) if v.get("id") else self.file.create_entity(v["type"], v["value"]),
-            value,
-        )
+    def get_string_index(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.string_values)
+            self.string_values.append(value)
+        return index
+
+    def store(self, action, element_id, index, value, position=None):
+        blob = marshal.dumps(value)
+        if position is None:
+            position = len(self.actions)
+        self.actions.insert(position, action)
+        self.ids.insert(position, element_id)
+        self.indices.insert(position, index)
+        if self.offsets is None:
+            self.blobs.insert(position, blob)
+            self.size += len(blob)
+            if self.size > self.file.transaction_memory_limit:
+                self.spill()
+        else:
+            history_file = self.file.get_history_file()
+            history_file.seek(0, 2)
+            self.offsets.insert(position, history_file.tell())
+            self.lengths.insert(position, len(blob))
+            history_file.write(blob)
+
+    def load(self, position):
+        if self.offsets is None:
+            return marshal.loads(self.blobs[position])
+        history_file = self.file.get_history_file()
+        history_file.seek(self.offsets[position])
+        return marshal.loads(history_file.read(self.lengths[position]))
+
+    def spill(self):
+        if self.offsets is not None:
+            return
+        history_file = self.file.get_history_file()
+        history_file.seek(0, 2)
+        offset = history_file.tell()
+        self.offsets = array.array("q")
+        self.lengths = array.array("q")
+        for blob in self.blobs:
+            self.offsets.append(offset)
+            self.lengths.append(len(blob))
+            offset += len(blob)
+        history_file.write(b"".join(self.blobs))
+        self.blobs = None
+        self.size = 0
 
     def batch(self):
         self.is_batched = True
-        self.batch_delete_index = len(self.operations)
+        self.batch_delete_index = len(self.actions)
         self.batch_delete_ids = set()
         self.batch_inverses = []
 
     def unbatch(self):
         for inverses in self.batch_inverses:
             if inverses:
-                self.operations.insert(self.batch_delete_index, {"action": "batch_delete", "inverses": inverses})
+                self.store(self.BATCH_DELETE, 0, 0, inverses, position=self.batch_delete_index)
         self.is_batched = False
         self.batch_delete_index = 0
         self.batch_delete_ids = set()
@@ -82,92 +199,91 @@ class Transaction:
 
     def store_create(self, element):
         if element.id():
-            self.operations.append({"action": "create", "value": self.serialise_entity_instance(element)})
-
-    def store_edit(self, element, index, value):
-        self.operations.append(
-            {
-                "action": "edit",
-                "id": element.id(),
-                "index": index,
-                "old": self.serialise_value(element, element[index]),
-                "new": self.serialise_value(element, value),
-            }
-        )
+            index = self.get_string_index(element.is_a())
+            self.store(self.CREATE, element.id(), index, self.pack_entity_instance(element))
+
+    def store_edit(self, element, index, old):
+        # The new value is read back from the element, so it is stored as the plain values the file holds
+        # rather than as whatever was assigned, such as numpy scalars, which marshal cannot pack
+        self.store(self.EDIT, element.id(), index, (old, self.pack_value(element[index])))
 
     def store_delete(self, element):
-        inverses = {}
+        inverses = ()
         if self.is_batched:
             if element.id() not in self.batch_delete_ids:
                 self.batch_inverses.append(self.get_element_inverses(element))
             self.batch_delete_ids.add(element.id())
         else:
             inverses = self.get_element_inverses(element)
-        self.operations.append(
-            {"action": "delete", "inverses": inverses, "value": self.serialise_entity_instance(element)}
-        )
+        index = self.get_string_index(element.is_a())
+        self.store(self.DELETE, element.id(), index, (self.pack_entity_instance(element), inverses))
 
     def get_element_inverses(self, element):
-        inverses = {}
+        inverses = []
         for inverse in self.file.get_inverse(element):
+            # Only attributes that can hold entities are searched for the element
             inverse_references = []
-            for i, attribute in enumerate(inverse):
+            for i in self.get_reference_indices(inverse):
+                attribute = inverse[i]
                 if ifcopenshell.util.element.has_element_reference(attribute, element):
-                    inverse_references.append((i, self.serialise_value(inverse, attribute)))
-            inverses[inverse.id()] = inverse_references
-        return inverses
+                    inverse_references.append((i, self.pack_value(attribute)))
+            inverses.append((inverse.id(), tuple(inverse_references)))
+        return tuple(inverses)
+
+    def get_reference_indices(self, element):
+        key = (self.file.schema, element.is_a())
+        indices = self.reference_indices.get(key)
+        if indices is None:
+            indices = tuple(i for i in range(len(element)) if "ENTITY INSTANCE" in element.attribute_type(i))
+            self.reference_indices[key] = indices
+        return indices
+
+    def restore_inverses(self, inverses):
+        for inverse_id, data in inverses:
+            inverse = self.file.by_id(inverse_id)
+            for index, value in data:
+                try:
+                    inverse[index] = self.unpack_value(value)
+                except (RuntimeError, ValueError):
+                    # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
+                    pass
 
     def rollback(self):
-        for operation in self.operations[::-1]:
-            if operation["action"] == "create":
-                element = self.file.by_id(operation["value"]["id"])
+        for i in reversed(range(len(self.actions))):
+            action = self.actions[i]
+            if action == self.CREATE:
+                element = self.file.by_id(self.ids[i])
                 if hasattr(element, "GlobalId") and element.GlobalId is None:
                     # hack, otherwise ifcopenshell gets upset
                     element.GlobalId = "x"
                 self.file.remove(element)
-            elif operation["action"] == "edit":
-                element = self.file.by_id(operation["id"])
+            elif action == self.EDIT:
+                element = self.file.by_id(self.ids[i])
                 try:
-                    element[operation["index"]] = self.unserialise_value(element, operation["old"])
-                except:
+                    element[self.indices[i]] = self.unpack_value(self.load(i)[0])
+                except (RuntimeError, ValueError):
                     # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
                     pass
-            elif operation["action"] == "delete":
-                e = self.file.create_entity(operation["value"]["type"], id=operation["value"]["id"])
-                for k, v in operation["value"].items():
-                    try:
-                        setattr(e, k, self.unserialise_value(e, v))
-                    except:
-                        # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
-                        pass
-                for inverse_id, data in operation["inverses"].items():
-                    inverse = self.file.by_id(inverse_id)
-                    for index, value in data:
-                        inverse[index] = self.unserialise_value(inverse, value)
-            elif operation["action"] == "batch_delete":
-                for inverse_id, data in operation["inverses"].items():
-                    inverse = self.file.by_id(inverse_id)
-                    for index, value in data:
-                        inverse[index] = self.unserialise_value(inverse, value)
+            elif action == self.DELETE:
+                values, inverses = self.load(i)
+                e = self.file.create_entity(self.string_values[self.indices[i]], id=self.ids[i])
+                self.unpack_entity_instance(e, values)
+                self.restore_inverses(inverses)
+            elif action == self.BATCH_DELETE:
+                self.restore_inverses(self.load(i))
 
     def commit(self):
-        for operation in self.operations:
-            if operation["action"] == "create":
-                e = self.file.create_entity(operation["value"]["type"], id=operation["value"]["id"])
-                for k, v in operation["value"].items():
-                    try:
-                        setattr(e, k, self.unserialise_value(e, v))
-                    except:
-                        # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
-                        pass
-            elif operation["action"] == "edit":
-                element = self.file.by_id(operation["id"])
-                element[operation["index"]] = self.unserialise_value(element, operation["new"])
-            elif operation["action"] == "delete":
-                element = self.file.by_id(operation["value"]["id"])
+        for i in range(len(self.actions)):
+            action = self.actions[i]
+            if action == self.CREATE:
+                e = self.file.create_entity(self.string_values[self.indices[i]], id=self.ids[i])
+                self.unpack_entity_instance(e, self.load(i))
+            elif action == self.EDIT:
+                element = self.file.by_id(self.ids[i])
+                element[self.indices[i]] = self.unpack_value(self.load(i)[1])
+            elif action == self.DELETE:
+                element = self.file.by_id(self.ids[i])
                 self.file.remove(element)
-            elif operation["action"] == "batch_delete":
-                pass
 
 
 class file(object):
@@ -195,23 +311,64 @@ class file(object):
             args = map(ifcopenshell_wrapper.schema_by_name, args)
             self.wrapped_data = ifcopenshell_wrapper.file(*args)
         self.history_size = 64
+        self.history_spill = False
+        self.history_file = None
+        self.transaction_memory_limit = 64 * 1024 * 1024
         self.history = []
         self.future = []
         self.transaction = None
+        self.instance_cache = None
+
+    def set_instance_cache(self, enabled=True):
+        """Sets whether entity instances are reused for the same element
+
+        When enabled, by_id(), by_type(), traverse(), get_inverse() and
+        attribute access return the same entity_instance for an element for
+        as long as it is referenced elsewhere, so that fewer wrappers are
+        allocated and identity based caches can be used.
 
-    def set_history_size(self, size):
+        :param enabled: Whether to cache entity instances
+        :type enabled: bool
+        :rtype: None
+        """
+        self.instance_cache = weakref.WeakValueDictionary() if enabled else None
+
+    def set_history_size(self, size, spill=None):
+        """Sets how many transactions are kept in memory for undo
+
+        :param size: The number of transactions to keep in memory
+        :type size: int
+        :param spill: If true, older transactions are spilled to a temporary
+            file on disk instead of being forgotten. If None, the current
+            setting is kept.
+        :type spill: bool
+        :rtype: None
+        """
         self.history_size = size
+        if spill is not None:
+            self.history_spill = spill
+        self.trim_history()
+
+    def trim_history(self):
+        if self.history_spill:
+            for transaction in self.history[: max(len(self.history) - self.history_size, 0)]:
+                transaction.spill()
+            return
         while len(self.history) > self.history_size:
             self.history.pop(0)
 
+    def get_history_file(self):
+        if self.history_file is None:
+            self.history_file = tempfile.TemporaryFile()
+        return self.history_file
+
     def begin_transaction(self):
         self.transaction = Transaction(self)
 
     def end_transaction(self):
         if self.transaction:
             self.history.append(self.transaction)
-            if len(self.history) > self.history_size:
-                self.history.pop(0)
+            self.trim_history()
             self.future = []
             self.transaction = None
 
@@ -290,6 +447,9 @@ class file(object):
         # the owner.
         e.wrapped_data.this.disown()
 
+        if self.instance_cache is not None:
+            self.instance_cache[e.id()] = e
+
         if self.transaction:
             self.transaction.store_create(e)
 
@@ -303,9 +463,9 @@ class file(object):
 
     def __getitem__(self, key):
         if isinstance(key, numbers.Integral):
-            return entity_instance(self.wrapped_data.by_id(key), self)
+            return entity_instance.wrap_instance(self.wrapped_data.by_id(key), self)
         elif isinstance(key, basestring):
-            return entity_instance(self.wrapped_data.by_guid(str(key)), self)
+            return entity_instance.wrap_instance(self.wrapped_data.by_guid(str(key)), self)
 
     def by_id(self, id):
         """Return an IFC entity instance filtered by IFC ID.
@@ -335,7 +495,9 @@ class file(object):
             # TODO confirm this method of tracking added elements and use MaxId directly instead of FreshId
             max_id = self.wrapped_data.FreshId()
         inst.wrapped_data.this.disown()
-        result = entity_instance(self.wrapped_data.add(inst.wrapped_data, -1 if _id is None else _id), self)
+        result = entity_instance.wrap_instance(
+            self.wrapped_data.add(inst.wrapped_data, -1 if _id is None else _id), self
+        )
         if self.transaction:
             added_elements = [e for e in self.traverse(result) if e.id() > max_id]
             [self.transaction.store_create(e) for e in reversed(added_elements)]
@@ -354,8 +516,41 @@ class file(object):
         :rtype: list
         """
         if include_subtypes:
-            return [entity_instance(e, self) for e in self.wrapped_data.by_type(type)]
-        return [entity_instance(e, self) for e in self.wrapped_data.by_type_excl_subtypes(type)]
+            return [entity_instance.wrap_instance(e, self) for e in self.wrapped_data.by_type(type)]
+        return [entity_instance.wrap_instance(e, self) for e in self.wrapped_data.by_type_excl_subtypes(type)]
+
+    def get_attributes(self, type, attributes, include_subtypes=True, as_numpy=False):
+        """Return the values of a few attributes of all instances of an IFC class as columns
+
+        The values are read in a single call without creating an entity
+        instance wrapper per element. Entity instances are represented by
+        their STEP id.
+
+        Example::
+
+            columns = ifc_file.get_attributes("IfcWall", ["GlobalId", "Name"])
+            for id, name in zip(columns["id"], columns["Name"]):
+                print(id, name)
+
+        :param type: The case insensitive type of IFC class to read.
+        :type type: string
+        :param attributes: The names of the attributes to read
+        :type attributes: list
+        :param include_subtypes: Whether or not to include subtypes of the IFC class
+        :type include_subtypes: bool
+        :param as_numpy: Whether to return numpy arrays. Columns of integers,
+            including entity ids, become integer arrays with nulls as 0.
+            Columns of numbers become float arrays with nulls as NaN. Other
+            columns become object arrays.
+        :type as_numpy: bool
+        :returns: A dictionary of the "id" column and a column per attribute
+        :rtype: dict
+        """
+        attributes = list(attributes)
+        columns = self.wrapped_data.get_attributes(type, attributes, include_subtypes)
+        if as_numpy:
+            columns = [to_numpy_column(column) for column in columns]
+        return dict(zip(["id"] + attributes, columns))
 
     def traverse(self, inst, max_levels=None, breadth_first=False):
         """Get a list of all referenced instances for a particular instance including itself
@@ -377,7 +572,7 @@ class file(object):
         else:
             fn = self.wrapped_data.traverse
 
-        return [entity_instance(e, self) for e in fn(inst.wrapped_data, max_levels)]
+        return [entity_instance.wrap_instance(e, self) for e in fn(inst.wrapped_data, max_levels)]
 
     def get_inverse(self, inst):
         """Return a list of entities that reference this entity
@@ -387,7 +582,7 @@ class file(object):
         :returns: A list of ifcopenshell.entity_instance.entity_instance objects
         :rtype: list
         """
-        return [entity_instance(e, self) for e in self.wrapped_data.get_inverse(inst.wrapped_data)]
+        return [entity_instance.wrap_instance(e, self) for e in self.wrapped_data.get_inverse(inst.wrapped_data)]
 
     def remove(self, inst):
         """Deletes an IFC object in the file.
@@ -402,8 +597,57 @@ class file(object):
         """
         if self.transaction:
             self.transaction.store_delete(inst)
+        if self.instance_cache is not None:
+            self.instance_cache.pop(inst.id(), None)
         return self.wrapped_data.remove(inst.wrapped_data)
 
+    def write_stream(self, stream, ids=None, chunk_size=10000, progress=None):
+        """Writes the file in SPF format to a file-like object, serialising a chunk of instances at a time
+
+        Unlike write() and to_string(), the model is never serialised as a
+        whole, so large models can be written to compressed streams or
+        sockets without holding a copy of the output in memory.
+
+        :param stream: A writable file-like object. Text streams are written
+            str, other streams are written encoded bytes.
+        :type stream: file-like object
+        :param ids: The STEP ids or entity instances to write, all instances
+            if None. References to instances outside of this subset are
+            written unchanged.
+        :type ids: None|iterable
+        :param chunk_size: The number of instances serialised at a time
+        :type chunk_size: int
+        :param progress: Called after every chunk with the number of bytes
+            (characters for text streams) and instances written so far and
+            the number of instances to write
+        :type progress: None|callable
+        :returns: The number of bytes written, or for text streams the number
+            of characters written. Non-ASCII text is escaped in SPF, so these
+            are the same unless a text stream itself re-encodes the output.
+        :rtype: int
+        """
+        if ids is None:
+            ids = sorted(self.wrapped_data.entity_names())
+        else:
+            ids = sorted(i.id() if isinstance(i, entity_instance) else i for i in ids)
+        is_text = isinstance(stream, io.TextIOBase)
+
+        def write(data):
+            # Text streams count characters, which the stream may encode to more bytes
+            if not is_text:
+                data = data.encode("utf-8")
+            stream.write(data)
+            return len(data)
+
+        n_bytes = write(self.wrapped_data.header_to_string())
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i : i + chunk_size]
+            n_bytes += write(self.wrapped_data.instances_to_string(chunk))
+            if progress:
+                progress(n_bytes, i + len(chunk), len(ids))
+        n_bytes += write("ENDSEC;\nEND-ISO-10303-21;\n")
+        return n_bytes
+
     def batch(self):
         """Low-level mechanism to speed up deletion of large subgraphs"""
         if self.transaction:
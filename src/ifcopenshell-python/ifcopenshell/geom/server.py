@@ -0,0 +1,370 @@
+###############################################################################
+#                                                                             #
+# This file is part of IfcOpenShell.                                          #
+#                                                                             #
+# IfcOpenShell is free software: you can redistribute it and/or modify        #
+# it under the terms of the Lesser GNU General Public License as published by #
+# the Free Software Foundation, either version 3.0 of the License, or         #
+# (at your option) any later version.                                         #
+#                                                                             #
+# IfcOpenShell is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the                #
+# Lesser GNU General Public License for more details.                         #
+#                                                                             #
+# You should have received a copy of the Lesser GNU General Public License    #
+# along with this program. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                             #
+###############################################################################
+
+"""Client for IfcGeomServer, which tessellates a model in a child process
+
+A crash on an invalid element only takes down the child process. The pool
+in this module shards the products of a model over several server
+processes, restarts a server that crashed and isolates the product that
+caused the crash, so that the remaining products are still tessellated.
+
+example:
+
+    f = ifcopenshell.open(file_path)
+    p = ifcopenshell.geom.server.pool(f, num_workers=4)
+    for element in p:
+        print(element.id, element.type, len(element.faces) // 3)
+    print("Failed to process", p.failed)
+"""
+
+import os
+import json
+import queue
+import struct
+import threading
+import subprocess
+import collections
+
+import numpy
+
+HELLO = 0xFF00
+IFC_MODEL = HELLO + 1
+GET = IFC_MODEL + 1
+ENTITY = GET + 1
+MORE = ENTITY + 1
+NEXT = MORE + 1
+BYE = NEXT + 1
+GET_LOG = BYE + 1
+LOG = GET_LOG + 1
+DEFLECTION = LOG + 1
+SETTING = DEFLECTION + 1
+INCLUDE = SETTING + 1
+
+element = collections.namedtuple(
+    "element",
+    (
+        "id",
+        "guid",
+        "name",
+        "type",
+        "parent_id",
+        "matrix",
+        "representation_id",
+        "verts",
+        "normals",
+        "faces",
+        "colors",
+        "material_ids",
+        "quantities",
+    ),
+)
+
+
+class ServerError(Exception):
+    pass
+
+
+class ServerCrash(ServerError):
+    pass
+
+
+def encode_string(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return struct.pack("=i", len(data)) + data + b"\0" * (-len(data) % 4)
+
+
+class message_reader:
+    """Reads the fields of a message payload in order"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.offset = 0
+
+    def int32(self):
+        (value,) = struct.unpack_from("=i", self.payload, self.offset)
+        self.offset += 4
+        return value
+
+    def bytes(self):
+        n = self.int32()
+        data = self.payload[self.offset : self.offset + n]
+        self.offset += n + (-n % 4)
+        return data
+
+    def string(self):
+        return bytes(self.bytes()).decode("utf-8")
+
+    def array(self, dtype):
+        # The array is a view on the message, no values are copied
+        return numpy.frombuffer(self.bytes(), dtype=dtype)
+
+    def rest(self):
+        return self.payload[self.offset :]
+
+
+def read_element(payload):
+    reader = message_reader(payload)
+    id = reader.int32()
+    guid = reader.string()
+    name = reader.string()
+    type = reader.string()
+    parent_id = reader.int32()
+    matrix = reader.array(numpy.float64).reshape(4, 4)
+    representation_id = reader.int32()
+    verts = reader.array(numpy.float64)
+    normals = reader.array(numpy.float32)
+    faces = reader.array(numpy.int32)
+    colors = reader.array(numpy.float32).reshape(-1, 4)
+    material_ids = reader.array(numpy.int32)
+    quantities = bytes(reader.rest()).strip()
+    quantities = json.loads(quantities) if quantities else {}
+    return element(
+        id,
+        guid,
+        name,
+        type,
+        parent_id,
+        matrix,
+        representation_id,
+        verts,
+        normals,
+        faces,
+        colors,
+        material_ids,
+        quantities,
+    )
+
+
+class server:
+    """A single IfcGeomServer child process
+
+    :param executable: The path of the IfcGeomServer executable
+    :type executable: str
+    :param settings: Iterator settings as a mapping of setting, for example
+        ifcopenshell.geom.settings.SEW_SHELLS, to a boolean value. Settings
+        apply to every model sent to the server.
+    :type settings: None|dict
+    :param deflection: The deflection tolerance used for tessellation
+    :type deflection: None|float
+    """
+
+    def __init__(self, executable="IfcGeomServer", settings=None, deflection=None):
+        self.process = subprocess.Popen(
+            [executable], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self.version = message_reader(self.read(HELLO)).string()
+        for setting, value in (settings or {}).items():
+            self.write(SETTING, struct.pack("=II", setting, 1 if value else 0))
+        if deflection is not None:
+            self.write(DEFLECTION, struct.pack("=d", deflection))
+
+    def read_exactly(self, n):
+        data = self.process.stdout.read(n)
+        if len(data) != n:
+            raise ServerCrash("IfcGeomServer exited with code %s" % self.process.wait())
+        return data
+
+    def read(self, expected_type):
+        message_type, n = struct.unpack("=ii", self.read_exactly(8))
+        if message_type != expected_type:
+            raise ServerError("Expected message %x, received %x" % (expected_type, message_type))
+        return memoryview(self.read_exactly(n + (-n % 4)))[:n]
+
+    def write(self, message_type, payload=b""):
+        try:
+            self.process.stdin.write(struct.pack("=ii", message_type, len(payload)) + payload)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            raise ServerCrash("IfcGeomServer exited with code %s" % self.process.wait())
+
+    def read_more(self):
+        return message_reader(self.read(MORE)).int32() == 1
+
+    def iterate(self, data, include=None):
+        """Tessellates a model and yields an element for every product
+
+        :param data: The model in SPF format
+        :type data: str|bytes
+        :param include: The ids of the products to tessellate, all products if None
+        :type include: None|list
+        """
+        include = numpy.asarray(include or [], dtype=numpy.int32)
+        self.write(INCLUDE, struct.pack("=i", len(include)) + include.tobytes())
+        self.write(IFC_MODEL, encode_string(data))
+        has_more = self.read_more()
+        while has_more:
+            self.write(GET)
+            yield read_element(self.read(ENTITY))
+            self.write(NEXT)
+            has_more = self.read_more()
+
+    def get_log(self):
+        self.write(GET_LOG)
+        return message_reader(self.read(LOG)).string()
+
+    def close(self):
+        try:
+            self.write(BYE)
+            self.read(BYE)
+        except ServerError:
+            self.kill()
+        else:
+            self.process.stdin.close()
+            self.process.wait()
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+class pool:
+    """Tessellates the products of a model in a pool of IfcGeomServer processes
+
+    Products are divided over the workers, which each send the whole model to
+    their own server, restricted to their share of the products. When a
+    server crashes, it is restarted for the products that remain. A product
+    that crashes a server on its own is skipped and listed in failed.
+
+    If servers keep crashing, for example because the model itself cannot be
+    loaded, iteration stops with a ServerError once max_restarts is exceeded.
+
+    Elements are yielded as soon as any worker produces them, so not in the
+    order of the model.
+
+    :param file: The model to tessellate
+    :type file: ifcopenshell.file
+    :param num_workers: The number of server processes, the number of CPUs if None
+    :type num_workers: None|int
+    :param products: The products to tessellate, all products with a
+        representation if None
+    :type products: None|list
+    :param executable: The path of the IfcGeomServer executable
+    :type executable: str
+    :param settings: Iterator settings, see server
+    :type settings: None|dict
+    :param deflection: The deflection tolerance used for tessellation
+    :type deflection: None|float
+    :param max_restarts: The number of server restarts over all workers after
+        which iteration is aborted, unlimited if None
+    :type max_restarts: None|int
+    """
+
+    def __init__(
+        self,
+        file,
+        num_workers=None,
+        products=None,
+        executable="IfcGeomServer",
+        settings=None,
+        deflection=None,
+        max_restarts=100,
+    ):
+        self.file = file
+        self.num_workers = num_workers or os.cpu_count() or 1
+        if products is None:
+            products = [p.id() for p in file.by_type("IfcProduct") if p.Representation]
+        else:
+            products = [p if isinstance(p, int) else p.id() for p in products]
+        self.products = products
+        self.executable = executable
+        self.settings = settings
+        self.deflection = deflection
+        self.max_restarts = max_restarts
+        self.failed = []
+        self.restarts = 0
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        data = self.file.wrapped_data.to_string().encode("utf-8")
+        shards = [self.products[i :: self.num_workers] for i in range(self.num_workers)]
+        shards = [shard for shard in shards if shard]
+        results = queue.Queue(maxsize=64 * len(shards))
+        stop = threading.Event()
+        workers = [
+            threading.Thread(target=self.run_worker, args=(data, shard, results, stop), daemon=True) for shard in shards
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            remaining = len(workers)
+            while remaining:
+                result = results.get()
+                if result is None:
+                    remaining -= 1
+                elif isinstance(result, Exception):
+                    raise result
+                else:
+                    yield result
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+    def run_worker(self, data, products, results, stop):
+        def put(result):
+            while not stop.is_set():
+                try:
+                    results.put(result, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        geom_server = None
+        pending = [products]
+        try:
+            while pending and not stop.is_set():
+                products = pending.pop()
+                processed = set()
+                if geom_server is None:
+                    geom_server = server(self.executable, self.settings, self.deflection)
+                try:
+                    for result in geom_server.iterate(data, products):
+                        processed.add(result.id)
+                        if not put(result):
+                            return
+                except ServerCrash:
+                    geom_server.kill()
+                    geom_server = None
+                    with self.lock:
+                        self.restarts += 1
+                        if self.max_restarts is not None and self.restarts > self.max_restarts:
+                            raise ServerError("IfcGeomServer crashed more than %d times" % self.max_restarts)
+                    products = [p for p in products if p not in processed]
+                    # Retry what remains, unless no progress was made at all in which case
+                    # the products are bisected until the one that causes the crash is found
+                    if processed:
+                        pending.append(products)
+                    elif len(products) == 1:
+                        with self.lock:
+                            self.failed.append(products[0])
+                    else:
+                        pending.append(products[len(products) // 2 :])
+                        pending.append(products[: len(products) // 2])
+        except Exception as e:
+            put(e)
+        finally:
+            if geom_server is not None:
+                if stop.is_set():
+                    geom_server.kill()
+                else:
+                    geom_server.close()
+            put(None)
@@ -19,6 +19,7 @@
 import os
 import re
 import logging
+import multiprocessing
 import numpy as np
 from datetime import date
 
@@ -32,7 +33,6 @@ from xmlschema import XMLSchema
 from xmlschema import etree_tostring
 from xmlschema.validators import identities
 
-
 cwd = os.path.dirname(os.path.realpath(__file__))
 ids_schema = XMLSchema(os.path.join(cwd, "ids.xsd"))  # source: "http://standards.buildingsmart.org/IDS/ids_04.xsd"
 
@@ -183,13 +183,15 @@ class ids:
         ids_file.specifications = [specification.parse(s) for s in ids_content["specification"]]
         return ids_file
 
-    def validate(self, ifc_file, logger=None):
+    def validate(self, ifc_file, logger=None, jobs=1):
         """Use to validate IFC model against IDS specifications.
 
         :param ifc_file: path to ifc file
         :type ifc_file: str
         :param logger: Logging object with handlers, defaults to None
         :type logger: logging, optional
+        :param jobs: Number of worker processes to evaluate specifications in, None for all cores, defaults to 1
+        :type jobs: int, optional
         """
         if not isinstance(logger, logging.Logger):
             logger = logging.getLogger("IDS_Logger")
@@ -210,39 +212,200 @@ class ids:
                 else:
                     logger.error("IFC version not recognized")
 
-        # Consider other way around: for elem, for spec so we can see if an element pass all IDSes?
-        for spec in self.specifications:
-            self.ifc_applicable = 0
-            self.ifc_passed = 0
-            for elem in ifc_file.by_type("IfcObject"):
-                apply, comply = spec(elem, logger)
-                if apply:
-                    self.ifc_applicable += 1
-                if comply:
-                    self.ifc_passed += 1
-            if self.ifc_applicable == 0:
-                if spec.necessity == "required":
-                    logger.error("No applicable elements found. Minimum 1 applicable element required.")
-                else:
-                    logger.debug("No applicable elements found. None required.")
-
-            try:
-                percentage = self.ifc_passed / self.ifc_applicable * 100
-            except ZeroDivisionError:
-                percentage = 0
-
-            logger.debug(
-                "Out of %s IFC elements, %s were applicable and %s of them passed (%s)."
-                % (
-                    len(ifc_file.by_type("IfcProduct")),
-                    self.ifc_applicable,
-                    self.ifc_passed,
-                    str(percentage) + "%",
+        global run_cache
+        report_valid = is_reported(logger, logging.INFO)
+        total_products = len(ifc_file.by_type("IfcProduct"))
+        has_index = ifc_file in ifcopenshell.util.element.indices
+        if not has_index:
+            ifcopenshell.util.element.build_index(ifc_file)
+        run_cache = {}
+
+        try:
+            if jobs != 1 and len(self.specifications) > 1 and "fork" in multiprocessing.get_all_start_methods():
+                results = self.validate_parallel(ifc_file, logger, report_valid, jobs)
+            else:
+                results = (
+                    self.validate_specification(spec, ifc_file, report_valid, logger.log)
+                    for spec in self.specifications
                 )
-            )
+
+            # Consider other way around: for elem, for spec so we can see if an element pass all IDSes?
+            for spec, (applicable, passed) in zip(self.specifications, results):
+                self.ifc_applicable = applicable
+                self.ifc_passed = passed
+                if self.ifc_applicable == 0:
+                    if spec.necessity == "required":
+                        logger.error("No applicable elements found. Minimum 1 applicable element required.")
+                    else:
+                        logger.debug("No applicable elements found. None required.")
+
+                try:
+                    percentage = self.ifc_passed / self.ifc_applicable * 100
+                except ZeroDivisionError:
+                    percentage = 0
+
+                logger.debug(
+                    "Out of %s IFC elements, %s were applicable and %s of them passed (%s)."
+                    % (
+                        total_products,
+                        self.ifc_applicable,
+                        self.ifc_passed,
+                        str(percentage) + "%",
+                    )
+                )
+        finally:
+            run_cache = None
+            if not has_index:
+                ifcopenshell.util.element.clear_index(ifc_file)
         for h in logger.handlers:
             h.flush()
 
+    @staticmethod
+    def validate_specification(spec, ifc_file, report_valid, emit):
+        """Validates all applicable elements against a single specification.
+
+        :param spec: The specification to check
+        :type spec: specification
+        :param ifc_file: The IFC model
+        :type ifc_file: ifcopenshell.file
+        :param report_valid: Whether results of compliant elements are needed
+        :type report_valid: bool
+        :param emit: Called with the log level and message of every result
+        :type emit: function
+        :return: The number of applicable and passed elements
+        :rtype: (int, int)
+        """
+        applicable = passed = 0
+        for elem in spec.get_applicable_elements(ifc_file):
+            apply, comply, result = spec.evaluate(elem, report_valid=report_valid)
+            applicable += apply
+            passed += comply
+            if result:
+                emit(*result)
+        return applicable, passed
+
+    def validate_parallel(self, ifc_file, logger, report_valid, jobs=None):
+        """Validates specifications in a pool of forked processes, yielding results in order.
+
+        Worker processes report element ids, which are mapped back to elements before logging.
+        """
+        global worker_state
+        worker_state = (self, ifc_file, report_valid)
+        try:
+            with multiprocessing.get_context("fork").Pool(jobs) as pool:
+                for applicable, passed, results in pool.imap(
+                    validate_worker_specification, range(len(self.specifications))
+                ):
+                    for level, msg in results:
+                        msg["ifc_element"] = ifc_file.by_id(msg["ifc_element"])
+                        logger.log(level, msg)
+                    yield applicable, passed
+        finally:
+            worker_state = None
+
+
+worker_state = None
+
+
+def validate_worker_specification(index):
+    ids_file, ifc_file, report_valid = worker_state
+    results = []
+
+    def emit(level, msg):
+        results.append((level, dict(msg, ifc_element=msg["ifc_element"].id())))
+
+    applicable, passed = ids_file.validate_specification(ids_file.specifications[index], ifc_file, report_valid, emit)
+    return applicable, passed, results
+
+
+def is_reported(logger, level):
+    """Whether any handler would receive a record of that level, mirroring `logging.Logger.callHandlers`."""
+    if not logger.isEnabledFor(level):
+        return False
+    current = logger
+    has_handlers = False
+    while current:
+        for handler in current.handlers:
+            has_handlers = True
+            if level >= handler.level:
+                return True
+        if not current.propagate:
+            break
+        current = current.parent
+    return not has_handlers and logging.lastResort is not None and level >= logging.lastResort.level
+
+
+run_cache = None
+
+
+def get_cached(element, category, getter):
+    """Memoises data about elements for the duration of a validation run, shared by all facets and specifications."""
+    if run_cache is None:
+        return getter(element)
+    cache = run_cache.setdefault(category, {})
+    key = element.id()
+    try:
+        return cache[key]
+    except KeyError:
+        value = cache[key] = getter(element)
+        return value
+
+
+def get_type(element):
+    return get_cached(element, "type", ifcopenshell.util.element.get_type)
+
+
+def get_psets(element):
+    return get_cached(element, "psets", ifcopenshell.util.element.get_psets)
+
+
+def get_attributes(element):
+    return get_cached(element, "attributes", lambda e: {k.lower(): v for k, v in e.get_info().items()})
+
+
+def get_classification_references(element):
+    def get_references(element):
+        refs = []
+        for association in element.HasAssociations:
+            if association.is_a("IfcRelAssociatesClassification"):
+                cref = association.RelatingClassification
+                if hasattr(cref, "ItemReference"):  # IFC2x3
+                    refs.append((cref.ReferencedSource.Name, cref.ItemReference))
+                elif hasattr(cref, "Identification"):  # IFC4
+                    refs.append((cref.ReferencedSource.Name, cref.Identification))
+        return refs
+
+    return get_cached(element, "classifications", get_references)
+
+
+def get_material_names(element):
+    def get_names(element):
+        materials = []
+        for rel in element.HasAssociations:
+            if not rel.is_a("IfcRelAssociatesMaterial"):
+                continue
+            if rel.RelatingMaterial.is_a() == "IfcMaterial":
+                materials.append(rel.RelatingMaterial.Name)
+            elif rel.RelatingMaterial.is_a() == "IfcMaterialMaterialList":  # DEPRECATED in IFC4
+                [materials.append(mat.Name) for mat in rel.RelatingMaterial]
+            elif rel.RelatingMaterial.is_a() == "IfcMaterialConstituentSet":
+                [materials.append(mat.Material.Name) for mat in rel.RelatingMaterial.MaterialConstituents]
+            elif rel.RelatingMaterial.is_a() == "IfcMaterialLayerSet":
+                [materials.append(mat.Name) for mat in rel.RelatingMaterial.MaterialLayers]
+            elif rel.RelatingMaterial.is_a() == "IfcMaterialLayerSetUsage":
+                layers = rel.RelatingMaterial.ForLayerSet.MaterialLayers
+                [materials.append(layer.Material.Name) for layer in layers]
+            elif rel.RelatingMaterial.is_a() == "IfcMaterialProfileSet":
+                [materials.append(mat.Material.Name) for mat in rel.RelatingMaterial.MaterialProfiles]
+            elif rel.RelatingMaterial.is_a() == "IfcMaterialProfileSetUsage":
+                profileSets = rel.RelatingMaterial.ForProfileSet.MaterialProfiles
+                [materials.append(pset.Material.Name) for pset in profileSets]
+            else:
+                raise Exception("IfcRelAssociatesMaterial not implemented")
+        return materials
+
+    return get_cached(element, "materials", get_names)
+
 
 class specification:
     """Represents the XML <specification> node and its two children <applicability> and <requirements>"""
@@ -333,6 +496,65 @@ class specification:
         else:
             self.requirements = boolean_and([facet])
 
+    def get_applicable_elements(self, ifc_file):
+        """Returns the elements which may be applicable, using the entity facet to filter by class if possible.
+
+        :param ifc_file: The IFC model
+        :type ifc_file: ifcopenshell.file
+        :return: Candidate elements for the applicability
+        :rtype: list
+        """
+        if isinstance(self.applicability, boolean_and):
+            # An entity term of a conjunction must match, so only its class needs to be checked
+            for term in self.applicability.terms:
+                if isinstance(term, entity) and isinstance(term.name, str):
+                    try:
+                        return [e for e in ifc_file.by_type(term.name) if e.is_a("IfcObject")]
+                    except RuntimeError:
+                        return []
+        return ifc_file.by_type("IfcObject")
+
+    def evaluate(self, inst, logger=None, report_valid=True):
+        """Validates an ifc instance against applicability and requirements without logging.
+
+        :param inst: IFC entity element
+        :type inst: IFC entity
+        :param logger: Logging object
+        :type logger: logging
+        :param report_valid: Whether the result of a compliant element is needed, defaults to True
+        :type report_valid: bool, optional
+        :return: results of validation on applicability and requirements, and the log level and message, if any
+        :rtype: [bool,bool,(int,dict)]
+        """
+        if not self.applicability(inst, logger):
+            return False, False, None
+
+        valid = self.requirements(inst, logger)
+
+        if valid:
+            if not report_valid:
+                return True, True, None
+            return True, True, (logging.INFO, self.get_result(inst, valid, " so is compliant"))
+        # BUG "has does not have"
+        return True, False, (logging.ERROR, self.get_result(inst, valid, " so is not compliant"))
+
+    def get_result(self, inst, valid, conclusion):
+        return {
+            "guid": inst.GlobalId,
+            "result": valid.success,
+            "sentence": str(self)
+            + ".\n"
+            + inst.is_a()
+            + " '"
+            + str(inst.Name)
+            + "' (#"
+            + str(inst.id())
+            + ") has "
+            + str(valid)
+            + conclusion,
+            "ifc_element": inst,
+        }
+
     def __call__(self, inst, logger):
         """When specification is called on an ifc instance, it validates against applicability and requirements.
 
@@ -343,51 +565,10 @@ class specification:
         :return: results of validation on applicability and requirements
         :rtype: [bool,bool]
         """
-        if self.applicability(inst, logger):
-
-            valid = self.requirements(inst, logger)
-
-            if valid:
-                logger.info(
-                    {
-                        "guid": inst.GlobalId,
-                        "result": valid.success,
-                        "sentence": str(self)
-                        + ".\n"
-                        + inst.is_a()
-                        + " '"
-                        + str(inst.Name)
-                        + "' (#"
-                        + str(inst.id())
-                        + ") has "
-                        + str(valid)
-                        + " so is compliant",
-                        "ifc_element": inst,
-                    }
-                )
-                return True, True
-            else:
-                # BUG "has does not have"
-                logger.error(
-                    {
-                        "guid": inst.GlobalId,
-                        "result": valid.success,
-                        "sentence": str(self)
-                        + ".\n"
-                        + inst.is_a()
-                        + " '"
-                        + str(inst.Name)
-                        + "' (#"
-                        + str(inst.id())
-                        + ") has "
-                        + str(valid)
-                        + " so is not compliant",
-                        "ifc_element": inst,
-                    }
-                )
-                return True, False
-        else:
-            return False, False
+        apply, comply, result = self.evaluate(inst, logger, report_valid=logger.isEnabledFor(logging.INFO))
+        if result:
+            logger.log(*result)
+        return apply, comply
 
     def __str__(self):
         """Represent the specification in human readible sentence.
@@ -409,6 +590,9 @@ class facet_evaluation:
         return self.success
 
     def __str__(self):
+        # The message may be a callable so that it is only formatted when it is needed
+        if callable(self.str):
+            self.str = self.str()
         return self.str
 
 
@@ -519,14 +703,15 @@ class entity(facet):
 
         # @nb with inheritance
         if self.predefinedtype and hasattr(inst, "PredefinedType"):
-            self.message = "an entity name '%(name)s' of predefined type '%(predefinedtype)s'"
+            self.message = message = "an entity name '%(name)s' of predefined type '%(predefinedtype)s'"
+            predefined_type = inst.PredefinedType
             return facet_evaluation(
-                inst.is_a(self.name) and inst.PredefinedType == self.predefinedtype,
-                self.message % {"name": inst.is_a(), "predefinedtype": inst.PredefinedType},
+                inst.is_a(self.name) and predefined_type == self.predefinedtype,
+                lambda: message % {"name": inst.is_a(), "predefinedtype": predefined_type},
             )
         else:
-            self.message = "an entity name '%(name)s'"
-            return facet_evaluation(inst.is_a(self.name), self.message % {"name": inst.is_a()})
+            self.message = message = "an entity name '%(name)s'"
+            return facet_evaluation(inst.is_a(self.name), lambda: message % {"name": inst.is_a()})
 
 
 class classification(facet):
@@ -582,44 +767,34 @@ class classification(facet):
         :rtype: facet_evaluation(bool, str)
         """
 
-        instance_classiciations = inst.HasAssociations
-        if ifcopenshell.util.element.get_type(inst):
-            type_classifications = ifcopenshell.util.element.get_type(inst).HasAssociations
-        else:
-            type_classifications = ()
-
-        if self.location == "instance" and instance_classiciations:
-            associations = instance_classiciations
-        elif self.location == "type" and type_classifications:
-            associations = type_classifications
-        elif self.location == "any" and (instance_classiciations or type_classifications):
-            associations = instance_classiciations + type_classifications
-        else:
-            associations = ()
+        element_type = get_type(inst)
+        instance_refs = get_classification_references(inst)
+        type_refs = get_classification_references(element_type) if element_type else []
 
-        refs = []
-        for association in associations:
-            if association.is_a("IfcRelAssociatesClassification"):
-                cref = association.RelatingClassification
-                if hasattr(cref, "ItemReference"):  # IFC2x3
-                    refs.append((cref.ReferencedSource.Name, cref.ItemReference))
-                elif hasattr(cref, "Identification"):  # IFC4
-                    refs.append((cref.ReferencedSource.Name, cref.Identification))
+        if self.location == "instance":
+            refs = instance_refs
+        elif self.location == "type":
+            refs = type_refs
+        elif self.location == "any":
+            refs = instance_refs + type_refs
+        else:
+            refs = []
 
-        self.location_msg = location[self.location]
+        self.location_msg = location_msg = location[self.location]
 
         if refs:
+            message = self.message
             return facet_evaluation(
                 (self.system, self.value) in refs,
-                self.message
+                lambda: message
                 % {
                     "system": refs[0][0],
                     "value": "'" + refs[0][1] + "'",
-                    "location": self.location_msg,
+                    "location": location_msg,
                 },  # what if not first item of refs?
             )
         else:
-            return facet_evaluation(False, "does not have %sclassification reference" % self.location_msg)
+            return facet_evaluation(False, "does not have %sclassification reference" % location_msg)
 
 
 class property(facet):
@@ -684,14 +859,16 @@ class property(facet):
 
         self.location = self.node["@location"]
 
+        pset = None
         if self.propertyset == "attribute":
-            val = {k.lower(): v for k, v in inst.get_info().items()}.get(self.name, None)
+            val = get_attributes(inst).get(self.name, None)
         else:
             # TODO sometimes AttributeError: 'str' object has no attribute 'wrappedValue'
-            instance_props = ifcopenshell.util.element.get_psets(inst)
+            instance_props = get_psets(inst)
 
-            if ifcopenshell.util.element.get_type(inst):
-                type_props = ifcopenshell.util.element.get_psets(ifcopenshell.util.element.get_type(inst))
+            element_type = get_type(inst)
+            if element_type:
+                type_props = get_psets(element_type)
             else:
                 type_props = {}
 
@@ -709,14 +886,14 @@ class property(facet):
 
         self.location_msg = location[self.location]
         di = {"name": self.name, "propertyset": self.propertyset, "value": "'%s'" % val, "location": self.location_msg}
+        message = self.message
 
-        if val is not None:
-            msg = self.message % di
-        else:
-            if pset:
-                msg = "does not have %(location)sproperty '%(name)s' in a set '%(propertyset)s'" % di
-            else:
-                msg = "does not have %(location)sset '%(propertyset)s'" % di
+        def msg():
+            if val is not None:
+                return message % di
+            elif pset:
+                return "does not have %(location)sproperty '%(name)s' in a set '%(propertyset)s'" % di
+            return "does not have %(location)sset '%(propertyset)s'" % di
 
         # TODO implement data type comparison
         # xs:string
@@ -785,54 +962,23 @@ class material(facet):
 
         self.location = self.node["@location"]
 
-        instance_material_rel = [rel for rel in inst.HasAssociations if rel.is_a("IfcRelAssociatesMaterial")]
-        if ifcopenshell.util.element.get_type(inst):
-            type_material_rel = [
-                rel
-                for rel in ifcopenshell.util.element.get_type(inst).HasAssociations
-                if rel.is_a("IfcRelAssociatesMaterial")
-            ]
-        else:
-            type_material_rel = []
-
-        if self.location == "instance":
-            material_relations = list(instance_material_rel)
-        elif self.location == "type" and type_material_rel:
-            material_relations = list(type_material_rel)
-        elif self.location == "any" and (instance_material_rel or type_material_rel):
-            material_relations = instance_material_rel + type_material_rel
-        else:
-            material_relations = []
-
         materials = []
-        for rel in material_relations:
-            if rel.RelatingMaterial.is_a() == "IfcMaterial":
-                materials.append(rel.RelatingMaterial.Name)
-            elif rel.RelatingMaterial.is_a() == "IfcMaterialMaterialList":  # DEPRECATED in IFC4
-                [materials.append(mat.Name) for mat in rel.RelatingMaterial]
-            elif rel.RelatingMaterial.is_a() == "IfcMaterialConstituentSet":
-                [materials.append(mat.Material.Name) for mat in rel.RelatingMaterial.MaterialConstituents]
-            elif rel.RelatingMaterial.is_a() == "IfcMaterialLayerSet":
-                [materials.append(mat.Name) for mat in rel.RelatingMaterial.MaterialLayers]
-            elif rel.RelatingMaterial.is_a() == "IfcMaterialLayerSetUsage":
-                layers = rel.RelatingMaterial.ForLayerSet.MaterialLayers
-                [materials.append(layer.Material.Name) for layer in layers]
-            elif rel.RelatingMaterial.is_a() == "IfcMaterialProfileSet":
-                [materials.append(mat.Material.Name) for mat in rel.RelatingMaterial.MaterialProfiles]
-            elif rel.RelatingMaterial.is_a() == "IfcMaterialProfileSetUsage":
-                profileSets = rel.RelatingMaterial.ForProfileSet.MaterialProfiles
-                [materials.append(pset.Material.Name) for pset in profileSets]
-            else:
-                raise Exception("IfcRelAssociatesMaterial not implemented")
+        if self.location in ("instance", "any"):
+            materials.extend(get_material_names(inst))
+        if self.location in ("type", "any"):
+            element_type = get_type(inst)
+            if element_type:
+                materials.extend(get_material_names(element_type))
 
         if not materials:
             materials.append("UNDEFINED")
 
-        self.location_msg = location[self.location]
+        self.location_msg = location_msg = location[self.location]
+        message = self.message
 
         return facet_evaluation(
             self.value in materials,
-            self.message % {"value": "'/'".join(materials), "location": self.location_msg},
+            lambda: message % {"value": "'/'".join(materials), "location": location_msg},
         )
 
 
@@ -864,7 +1010,7 @@ class boolean_logic:
     def __call__(self, *args):
         eval = [t(*args) for t in self.terms]
         join = [" and ", " or "][self.fold == any]
-        return facet_evaluation(self.fold(eval), join.join(map(str, eval)))
+        return facet_evaluation(self.fold(eval), lambda: join.join(map(str, eval)))
 
     def __str__(self):
         return [" and ", " or "][self.fold == any].join(map(str, self.terms))
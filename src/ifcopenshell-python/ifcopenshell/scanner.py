@@ -0,0 +1,156 @@
+###############################################################################
+#                                                                             #
+# This file is part of IfcOpenShell.                                          #
+#                                                                             #
+# IfcOpenShell is free software: you can redistribute it and/or modify        #
+# it under the terms of the Lesser GNU General Public License as published by #
+# the Free Software Foundation, either version 3.0 of the License, or         #
+# (at your option) any later version.                                         #
+#                                                                             #
+# IfcOpenShell is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the                #
+# Lesser GNU General Public License for more details.                         #
+#                                                                             #
+# You should have received a copy of the Lesser GNU General Public License    #
+# along with this program. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                             #
+###############################################################################
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import re
+import io
+
+from collections import namedtuple
+
+from . import ifcopenshell_wrapper
+
+type_census = namedtuple("type_census", ("count", "bytes", "start", "end"))
+
+special_token = re.compile(rb"'|/\*|;")
+instance_statement = re.compile(rb"(\s*)#\s*\d+\s*=\s*([A-Za-z0-9_]+)")
+data_statement = re.compile(rb"\s*DATA\s*[;(]")
+endsec_statement = re.compile(rb"\s*ENDSEC\s*;")
+
+
+class scan_result(object):
+    """
+    The outcome of scanning an IFC SPF file, see ifcopenshell.scan(). The `types` dictionary maps entity names to a
+    type_census of the number of instances, the bytes they occupy and the offsets of the first and past the last
+    instance of that type.
+    """
+
+    def __init__(self, header_file, types):
+        # The header is owned by the header-only file, which therefore needs to stay alive
+        self.header_file = header_file
+        self.types = types
+
+    @property
+    def header(self):
+        return self.header_file.header if self.header_file else None
+
+    @property
+    def schema(self):
+        if self.header_file:
+            return self.header_file.schema_name() or ",".join(self.header.file_schema.schema_identifiers)
+
+    def __len__(self):
+        return sum(census.count for census in self.types.values())
+
+
+def read_header(data):
+    return ifcopenshell_wrapper.read((data + b"\nDATA;\nENDSEC;\nEND-ISO-10303-21;\n").decode("utf-8", "replace"))
+
+
+def get_type_names(header_file, names):
+    try:
+        schema = ifcopenshell_wrapper.schema_by_name(header_file.schema_name())
+    except:
+        return {name: name.decode("ascii") for name in names}
+    type_names = {}
+    for name in names:
+        try:
+            type_names[name] = schema.declaration_by_name(name.decode("ascii")).name()
+        except:
+            type_names[name] = name.decode("ascii")
+    return type_names
+
+
+def scan(fn, chunk_size=1 << 20):
+    """
+    Reads the header and counts the instances per entity type of an IFC SPF file in a single sequential pass,
+    without parsing the file into memory. `fn` is a path or a binary file-like object. Only the header and the
+    statement that is being read are buffered, so files larger than the available memory can be scanned.
+
+    Strings and comments are skipped over, but attribute values are otherwise not validated. Entity names are
+    reported with the capitalisation of the schema, or as written in the file when the schema is not supported.
+    """
+    if isinstance(fn, (str, bytes)) or hasattr(fn, "__fspath__"):
+        with io.open(fn, "rb") as f:
+            return scan(f, chunk_size)
+
+    header_parts = []
+    header_file = None
+    in_data = False
+    counts = {}
+    offset = 0
+    buffer = b""
+
+    while True:
+        # Statements that do not fit in the buffer are carried over, so read at least as much as is carried over
+        chunk = fn.read(max(chunk_size, len(buffer)))
+        buffer += chunk
+        start = pos = 0
+        while True:
+            match = special_token.search(buffer, pos)
+            if match is None:
+                break
+            token = match.group()
+            if token == b";":
+                end = match.end()
+                if in_data:
+                    statement = instance_statement.match(buffer, start, end)
+                    if statement:
+                        census = counts.get(statement.group(2))
+                        if census is None:
+                            entity_start = statement.end(1)
+                            counts[statement.group(2)] = [1, end - entity_start, offset + entity_start, offset + end]
+                        else:
+                            census[0] += 1
+                            census[1] += end - statement.end(1)
+                            census[3] = offset + end
+                    elif endsec_statement.match(buffer, start, end):
+                        in_data = False
+                elif data_statement.match(buffer, start, end):
+                    in_data = True
+                    if header_file is None:
+                        header_file = read_header(b"".join(header_parts))
+                        header_parts = None
+                elif header_parts is not None:
+                    header_parts.append(buffer[start:end])
+                start = pos = end
+            elif token == b"'":
+                # Escaped quotes ('') are read as an empty string followed by the remainder
+                close = buffer.find(b"'", match.end())
+                if close == -1:
+                    break
+                pos = close + 1
+            else:
+                close = buffer.find(b"*/", match.end())
+                if close == -1:
+                    break
+                pos = close + 2
+                if not buffer[start : match.start()].strip():
+                    start = pos
+        offset += start
+        buffer = buffer[start:]
+        if not chunk:
+            break
+
+    if header_file is None and header_parts:
+        header_file = read_header(b"".join(header_parts))
+    names = get_type_names(header_file, counts) if header_file else {name: name.decode("ascii") for name in counts}
+    return scan_result(header_file, {names[name]: type_census(*census) for name, census in counts.items()})
@@ -1,4 +1,6 @@
+import copy
 import lark
+import functools
 
 
 arithmetic_operator_symbols = {"ADD": "+", "DIVIDE": "/", "MULTIPLY": "*", "SUBTRACT": "-"}
@@ -45,9 +47,14 @@ def serialise_applied_value(applied_value):
     return "?"
 
 
+@functools.lru_cache(maxsize=4096)
+def parse_cost_formula(formula):
+    return CostValueUnserialiser().parse(formula)
+
+
 def unserialise_cost_value(formula, cost_value):
-    unserialiser = CostValueUnserialiser()
-    result = unserialiser.parse(formula)
+    # Parsed formulas are shared between calls, so only ever annotate a copy
+    result = copy.deepcopy(parse_cost_formula(formula))
 
     def map_element_to_result(element, result):
         result["ifc"] = element
@@ -60,9 +67,18 @@ def unserialise_cost_value(formula, cost_value):
 
 
 class CostValueUnserialiser:
+    parser = None
+
     def parse(self, formula):
-        l = lark.Lark(
-            """start: formula
+        start = self.get_parser().parse(formula)
+        return self.get_formula(start.children[0])
+
+    @classmethod
+    def get_parser(cls):
+        # Building the grammar dominates the cost of parsing a formula, so it is only done once
+        if cls.parser is None:
+            cls.parser = lark.Lark(
+                """start: formula
                     formula: operand (operator operand)*
                     operand: value | category "(" formula ")"
                     value: NUMBER?
@@ -100,9 +116,8 @@ class CostValueUnserialiser:
 
                     %ignore WS // Disregard spaces in text
                  """
-        )
-        start = l.parse(formula)
-        return self.get_formula(start.children[0])
+            )
+        return cls.parser
 
     def get_formula(self, formula):
         if len(formula.children) == 1:
@@ -1,7 +1,100 @@
+import weakref
 import ifcopenshell
 
 
+indices = weakref.WeakKeyDictionary()
+
+
+class ElementIndex:
+    """A snapshot of element relationships built in one pass over a file
+
+    Once registered using build_index(), get_psets, get_type, get_material
+    and get_container use dictionary lookups instead of traversing inverse
+    attributes. The index is not updated when the file is edited, so call
+    build_index() again or clear_index() after making changes.
+    """
+
+    def __init__(self, ifc_file):
+        self.file = ifc_file
+        self.property_definitions = {}
+        self.types = {}
+        self.materials = {}
+        self.containers = {}
+        self.aggregates = {}
+        for rel in ifc_file.by_type("IfcRelDefinesByProperties"):
+            definition = rel.RelatingPropertyDefinition
+            for element in rel.RelatedObjects:
+                self.property_definitions.setdefault(element.id(), []).append(definition)
+        self.add_relationships("IfcRelDefinesByType", "RelatedObjects", "RelatingType", self.types)
+        self.add_relationships("IfcRelAssociatesMaterial", "RelatedObjects", "RelatingMaterial", self.materials)
+        self.add_relationships(
+            "IfcRelContainedInSpatialStructure", "RelatedElements", "RelatingStructure", self.containers
+        )
+        aggregate_class = "IfcRelDecomposes" if ifc_file.schema == "IFC2X3" else "IfcRelAggregates"
+        self.add_relationships(aggregate_class, "RelatedObjects", "RelatingObject", self.aggregates)
+
+    def add_relationships(self, ifc_class, related_name, relating_name, results):
+        for rel in self.file.by_type(ifc_class):
+            relating = getattr(rel, relating_name)
+            for element in getattr(rel, related_name):
+                results.setdefault(element.id(), relating)
+
+    def get_psets(self, element):
+        psets = {}
+        if element.is_a("IfcTypeObject"):
+            for definition in element.HasPropertySets or []:
+                psets[definition.Name] = get_property_definition(definition)
+        else:
+            for definition in self.property_definitions.get(element.id(), []):
+                psets[definition.Name] = get_property_definition(definition)
+        return psets
+
+    def get_type(self, element):
+        if element.is_a("IfcTypeObject"):
+            return element
+        return self.types.get(element.id())
+
+    def get_material(self, element, should_skip_usage=False):
+        material = self.materials.get(element.id())
+        if material:
+            if should_skip_usage:
+                if material.is_a("IfcMaterialLayerSetUsage"):
+                    return material.ForLayerSet
+                elif material.is_a("IfcMaterialProfileSetUsage"):
+                    return material.ForProfileSet
+            return material
+        relating_type = self.get_type(element)
+        if relating_type and relating_type != element:
+            return self.get_material(relating_type, should_skip_usage)
+
+    def get_container(self, element):
+        aggregate = self.aggregates.get(element.id())
+        if aggregate:
+            return self.get_container(aggregate)
+        return self.containers.get(element.id())
+
+
+def build_index(ifc_file):
+    index = indices[ifc_file] = ElementIndex(ifc_file)
+    return index
+
+
+def clear_index(ifc_file):
+    indices.pop(ifc_file, None)
+
+
+def get_index(element):
+    if not indices:
+        return
+    ifc_file = element.wrapped_data.file
+    if ifc_file is not None:
+        return indices.get(ifc_file)
+
+
 def get_psets(element):
+    index = get_index(element)
+    if index:
+        return index.get_psets(element)
     psets = {}
     if element.is_a("IfcTypeObject"):
         if element.HasPropertySets:
@@ -53,6 +146,9 @@ def get_properties(properties):
 
 
 def get_type(element):
+    index = get_index(element)
+    if index:
+        return index.get_type(element)
     if element.is_a("IfcTypeObject"):
         return element
     elif hasattr(element, "IsTypedBy") and element.IsTypedBy:
@@ -64,6 +160,9 @@ def get_type(element):
 
 
 def get_material(element, should_skip_usage=False):
+    index = get_index(element)
+    if index:
+        return index.get_material(element, should_skip_usage)
     if hasattr(element, "HasAssociations") and element.HasAssociations:
         for relationship in element.HasAssociations:
             if relationship.is_a("IfcRelAssociatesMaterial"):
@@ -79,6 +178,9 @@ def get_material(element, should_skip_usage=False):
 
 
 def get_container(element):
+    index = get_index(element)
+    if index:
+        return index.get_container(element)
     aggregate = get_aggregate(element)
     if aggregate:
         return get_container(aggregate)
@@ -1,6 +1,10 @@
+import weakref
 import numpy as np
 
 
+caches = weakref.WeakKeyDictionary()
+
+
 def a2p(o, z, x):
     y = np.cross(z, x)
     r = np.eye(4)
@@ -16,11 +20,76 @@ def get_axis2placement(plc):
     return a2p(o, z, x)
 
 
+def enable_cache(ifc_file):
+    """Caches resolved placement matrices by placement id
+
+    Placements edited using geometry.edit_object_placement are invalidated
+    automatically. Call invalidate_cache() after editing placements directly.
+    """
+    caches.setdefault(ifc_file, {})
+
+
+def disable_cache(ifc_file):
+    caches.pop(ifc_file, None)
+
+
+def invalidate_cache(ifc_file, placement=None):
+    cache = caches.get(ifc_file)
+    if cache is None:
+        return
+    if placement is None:
+        cache.clear()
+        return
+    queue = [placement]
+    while queue:
+        placement = queue.pop()
+        cache.pop(placement.id(), None)
+        queue.extend(getattr(placement, "ReferencedByPlacements", ()))
+
+
+def get_cache(plc):
+    if not caches:
+        return
+    ifc_file = plc.wrapped_data.file
+    if ifc_file is not None:
+        return caches.get(ifc_file)
+
+
+def resolve_local_placement(plc, matrices):
+    chain = []
+    while plc is not None and plc.id() not in matrices:
+        chain.append(plc)
+        plc = plc.PlacementRelTo
+    parent = np.eye(4) if plc is None else matrices[plc.id()]
+    for plc in reversed(chain):
+        parent = matrices[plc.id()] = np.dot(parent, get_axis2placement(plc.RelativePlacement))
+    return parent
+
+
 def get_local_placement(plc):
     if plc is None:
         return np.eye(4)
-    if plc.PlacementRelTo is None:
-        parent = np.eye(4)
-    else:
-        parent = get_local_placement(plc.PlacementRelTo)
-    return np.dot(parent, get_axis2placement(plc.RelativePlacement))
+    cache = get_cache(plc)
+    if cache is None:
+        return resolve_local_placement(plc, {})
+    return resolve_local_placement(plc, cache).copy()
+
+
+def get_local_placements(elements):
+    """Returns an (N, 4, 4) array of the object placement matrices of elements
+
+    Shared parent placements are resolved once for the whole batch.
+    """
+    results = np.empty((len(elements), 4, 4))
+    matrices = None
+    for i, element in enumerate(elements):
+        plc = getattr(element, "ObjectPlacement", None)
+        if plc is None:
+            results[i] = np.eye(4)
+            continue
+        if matrices is None:
+            matrices = get_cache(plc)
+            if matrices is None:
+                matrices = {}
+        results[i] = resolve_local_placement(plc, matrices)
+    return results
@@ -1,70 +1,107 @@
+import functools
 import ifcopenshell.util
 import ifcopenshell.util.fm
 import ifcopenshell.util.element
 import lark
 
 
+grammar = """start: query (lfunction query)*
+    query: selector | group
+    group: "(" query (lfunction query)* ")"
+    selector: (inverse_relationship)? guid_selector | (inverse_relationship)? class_selector
+    guid_selector: "#" /[0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$]{22}/
+    class_selector: "." WORD filter ?
+    filter: "[" filter_key (comparison filter_value)? "]"
+    filter_key: WORD | pset_or_qto
+    filter_value: ESCAPED_STRING
+    pset_or_qto: /[A-Za-z0-9_]+/ "." /[A-Za-z0-9_]+/
+    lfunction: and | or
+    inverse_relationship: types | contains_elements | boundedby
+    types: "*"
+    contains_elements: "@"
+    boundedby: "@@"
+    and: "&"
+    or: "|"
+    comparison: contains | morethanequalto | lessthanequalto | equal | morethan | lessthan
+    contains: "*="
+    morethanequalto: ">="
+    lessthanequalto: "<"
+    equal: "="
+    morethan: ">"
+    lessthan: "<"
+
+    // Embed common.lark for packaging
+    DIGIT: "0".."9"
+    HEXDIGIT: "a".."f"|"A".."F"|DIGIT
+    INT: DIGIT+
+    SIGNED_INT: ["+"|"-"] INT
+    DECIMAL: INT "." INT? | "." INT
+    _EXP: ("e"|"E") SIGNED_INT
+    FLOAT: INT _EXP | DECIMAL _EXP?
+    SIGNED_FLOAT: ["+"|"-"] FLOAT
+    NUMBER: FLOAT | INT
+    SIGNED_NUMBER: ["+"|"-"] NUMBER
+    _STRING_INNER: /.*?/
+    _STRING_ESC_INNER: _STRING_INNER /(?<!\\\\)(\\\\\\\\)*?/
+    ESCAPED_STRING : "\\"" _STRING_ESC_INNER "\\""
+    LCASE_LETTER: "a".."z"
+    UCASE_LETTER: "A".."Z"
+    LETTER: UCASE_LETTER | LCASE_LETTER
+    WORD: LETTER+
+    CNAME: ("_"|LETTER) ("_"|LETTER|DIGIT)*
+    WS_INLINE: (" "|/\\t/)+
+    WS: /[ \\t\\f\\r\\n]/+
+    CR : /\\r/
+    LF : /\\n/
+    NEWLINE: (CR? LF)+
+
+    %ignore WS // Disregard spaces in text
+ """
+
+parser = None
+
+
+def get_parser():
+    global parser
+    if parser is None:
+        parser = lark.Lark(grammar)
+    return parser
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_query(query):
+    return get_parser().parse(query)
+
+
 class Selector:
+    """Runs selector queries against a file
+
+    Query strings are compiled once per process. With cache enabled, query
+    results and lookups of attributes, property sets, types, materials and
+    containers are also kept per file, which only suits repeated queries
+    against a file that is not being modified. Call clear_cache() if the file
+    changes in between.
+    """
+
+    def __init__(self, cache=False):
+        self.file = None
+        self.use_cache = cache
+        self.clear_cache()
+
     def parse(self, ifc_file, query):
-        self.file = ifc_file
-
-        l = lark.Lark(
-            """start: query (lfunction query)*
-                    query: selector | group
-                    group: "(" query (lfunction query)* ")"
-                    selector: (inverse_relationship)? guid_selector | (inverse_relationship)? class_selector
-                    guid_selector: "#" /[0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$]{22}/
-                    class_selector: "." WORD filter ?
-                    filter: "[" filter_key (comparison filter_value)? "]"
-                    filter_key: WORD | pset_or_qto
-                    filter_value: ESCAPED_STRING
-                    pset_or_qto: /[A-Za-z0-9_]+/ "." /[A-Za-z0-9_]+/
-                    lfunction: and | or
-                    inverse_relationship: types | contains_elements | boundedby
-                    types: "*"
-                    contains_elements: "@"
-                    boundedby: "@@"
-                    and: "&"
-                    or: "|"
-                    comparison: contains | morethanequalto | lessthanequalto | equal | morethan | lessthan
-                    contains: "*="
-                    morethanequalto: ">="
-                    lessthanequalto: "<"
-                    equal: "="
-                    morethan: ">"
-                    lessthan: "<"
-
-                    // Embed common.lark for packaging
-                    DIGIT: "0".."9"
-                    HEXDIGIT: "a".."f"|"A".."F"|DIGIT
-                    INT: DIGIT+
-                    SIGNED_INT: ["+"|"-"] INT
-                    DECIMAL: INT "." INT? | "." INT
-                    _EXP: ("e"|"E") SIGNED_INT
-                    FLOAT: INT _EXP | DECIMAL _EXP?
-                    SIGNED_FLOAT: ["+"|"-"] FLOAT
-                    NUMBER: FLOAT | INT
-                    SIGNED_NUMBER: ["+"|"-"] NUMBER
-                    _STRING_INNER: /.*?/
-                    _STRING_ESC_INNER: _STRING_INNER /(?<!\\\\)(\\\\\\\\)*?/
-                    ESCAPED_STRING : "\\"" _STRING_ESC_INNER "\\""
-                    LCASE_LETTER: "a".."z"
-                    UCASE_LETTER: "A".."Z"
-                    LETTER: UCASE_LETTER | LCASE_LETTER
-                    WORD: LETTER+
-                    CNAME: ("_"|LETTER) ("_"|LETTER|DIGIT)*
-                    WS_INLINE: (" "|/\\t/)+
-                    WS: /[ \\t\\f\\r\\n]/+
-                    CR : /\\r/
-                    LF : /\\n/
-                    NEWLINE: (CR? LF)+
-
-                    %ignore WS // Disregard spaces in text
-                 """
-        )
-
-        start = l.parse(query)
-        return self.get_group(start)
+        if ifc_file is not self.file:
+            self.file = ifc_file
+            self.clear_cache()
+        if not self.use_cache:
+            return self.get_group(compile_query(query))
+        results = self.cache["results"].get(query)
+        if results is None:
+            results = self.get_group(compile_query(query))
+            self.cache["results"][query] = results
+        return list(results)
+
+    def clear_cache(self):
+        self.cache = {"results": {}, "info": {}, "psets": {}, "type": {}, "material": {}, "container": {}}
 
     def get_group(self, group):
         lfunction = None
@@ -155,7 +192,7 @@ class Selector:
     def get_element_value(self, element, key):
         if "." in key and key.split(".")[0] == "type":
             try:
-                element = ifcopenshell.util.element.get_type(element)
+                element = self.get_cached(element, "type", ifcopenshell.util.element.get_type)
                 if not element:
                     return None
             except:
@@ -163,7 +200,11 @@ class Selector:
             key = ".".join(key.split(".")[1:])
         elif "." in key and key.split(".")[0] == "material":
             try:
-                element = ifcopenshell.util.element.get_material(element, should_skip_usage=True)
+                element = self.get_cached(
+                    element,
+                    "material",
+                    lambda e: ifcopenshell.util.element.get_material(e, should_skip_usage=True),
+                )
                 if not element:
                     return None
             except:
@@ -171,21 +212,31 @@ class Selector:
             key = ".".join(key.split(".")[1:])
         elif "." in key and key.split(".")[0] == "container":
             try:
-                element = ifcopenshell.util.element.get_container(element)
+                element = self.get_cached(element, "container", ifcopenshell.util.element.get_container)
                 if not element:
                     return None
             except:
                 return
             key = ".".join(key.split(".")[1:])
-        info = element.get_info()
+        info = self.get_cached(element, "info", lambda e: e.get_info())
         if key in info:
             return info[key]
         elif "." in key:
             pset_name, prop = key.split(".")
-            psets = ifcopenshell.util.element.get_psets(element)
+            psets = self.get_cached(element, "psets", ifcopenshell.util.element.get_psets)
             if pset_name in psets and prop in psets[pset_name]:
                 return psets[pset_name][prop]
 
+    def get_cached(self, element, category, getter):
+        if not self.use_cache:
+            return getter(element)
+        cache = self.cache[category]
+        try:
+            return cache[element]
+        except KeyError:
+            value = cache[element] = getter(element)
+            return value
+
     def filter_element(self, element, element_value, comparison, value):
         if comparison == "equal":
             return str(element_value) == value
@@ -1,7 +1,13 @@
+import math
+import bisect
+import weakref
 import datetime
 import ifcopenshell.util.date
 from functools import lru_cache
 
+# Compiled calendars of each file by calendar id, see get_calendar_index()
+calendar_indices = weakref.WeakKeyDictionary()
+
 
 def derive_calendar(task):
     calendar = [
@@ -15,33 +21,134 @@ def derive_calendar(task):
         return derive_calendar(rel.RelatingObject)
 
 
+class CalendarIndex:
+    """Working days of an IfcWorkCalendar compiled into a bitmap with a prefix sum
+
+    The bitmap covers a range of days, as ordinals, which is grown on demand.
+    Counting working days and offsetting a date by a number of working days
+    then become a subtraction and a bisection, instead of a walk through the
+    calendar one day at a time.
+    """
+
+    # The minimum number of days by which the range is grown
+    block_size = 366
+    # A search for a working day fails after growing this many days without finding any
+    max_idle_days = 3660
+
+    def __init__(self, calendar):
+        self.calendar = calendar
+        self.origin = None
+        self.working = bytearray()
+        # prefix[i] is the number of working days in the range before day origin + i
+        self.prefix = [0]
+
+    def evaluate(self, day):
+        return is_working_day.__wrapped__(datetime.date.fromordinal(day), self.calendar)
+
+    def cover(self, start, finish):
+        """Grows the range to include the days from start up to but excluding finish"""
+        if self.origin is None:
+            self.origin = start
+        if start < self.origin:
+            self.extend_backward(max(self.origin - start, len(self.working), self.block_size))
+        if finish > self.origin + len(self.working):
+            self.extend_forward(max(finish - self.origin - len(self.working), len(self.working), self.block_size))
+
+    def extend_forward(self, days):
+        first = self.origin + len(self.working)
+        total = self.prefix[-1]
+        for day in range(first, first + days):
+            is_working = self.evaluate(day)
+            self.working.append(is_working)
+            total += is_working
+            self.prefix.append(total)
+        if total == self.prefix[-days - 1] and days >= self.max_idle_days:
+            raise ValueError("No working days found in calendar %s" % self.calendar)
+
+    def extend_backward(self, days):
+        self.origin -= days
+        self.working[0:0] = bytearray(self.evaluate(day) for day in range(self.origin, self.origin + days))
+        total = 0
+        self.prefix = [0]
+        for is_working in self.working:
+            total += is_working
+            self.prefix.append(total)
+        if not self.prefix[days] and days >= self.max_idle_days:
+            raise ValueError("No working days found in calendar %s" % self.calendar)
+
+    def is_working(self, day):
+        self.cover(day, day + 1)
+        return bool(self.working[day - self.origin])
+
+    def count(self, start, finish):
+        """Returns the number of working days from start up to but excluding finish"""
+        if finish <= start:
+            return 0
+        self.cover(start, finish)
+        return self.prefix[finish - self.origin] - self.prefix[start - self.origin]
+
+    def get_nth_working_day_after(self, start, n):
+        """Returns the nth working day on or after start"""
+        self.cover(start, start + 1)
+        while True:
+            rank = self.prefix[start - self.origin] + n
+            if rank <= self.prefix[-1]:
+                return self.origin + bisect.bisect_left(self.prefix, rank) - 1
+            self.cover(start, self.origin + 2 * len(self.working))
+
+    def get_nth_working_day_before(self, start, n):
+        """Returns the nth working day on or before start"""
+        self.cover(start, start + 1)
+        while True:
+            rank = self.prefix[start - self.origin + 1] - n + 1
+            if rank >= 1:
+                return self.origin + bisect.bisect_left(self.prefix, rank) - 1
+            self.cover(self.origin - len(self.working), start + 1)
+
+
+def get_calendar_index(calendar):
+    """Returns the compiled working days of a calendar
+
+    Indices are cached per file, see clear_calendar_indices() to recompile
+    them after editing a calendar.
+    """
+    ifc_file = calendar.wrapped_data.file
+    if ifc_file is None:
+        return CalendarIndex(calendar)
+    indices = calendar_indices.setdefault(ifc_file, {})
+    index = indices.get(calendar.id())
+    if index is None:
+        index = indices[calendar.id()] = CalendarIndex(calendar)
+    return index
+
+
+def clear_calendar_indices(ifc_file=None):
+    """Discards compiled calendars of a file, or of all files if None"""
+    if ifc_file is None:
+        calendar_indices.clear()
+    else:
+        calendar_indices.pop(ifc_file, None)
+    is_working_day.cache_clear()
+
+
 def count_working_days(start, finish, calendar):
-    result = 0
-    current_date = datetime.date(start.year, start.month, start.day)
-    finish_date = datetime.date(finish.year, finish.month, finish.day)
-    while current_date < finish_date:
-        if is_working_day(current_date, calendar):
-            result += 1
-        current_date += datetime.timedelta(days=1)
-    return result
+    start = datetime.date(start.year, start.month, start.day).toordinal()
+    finish = datetime.date(finish.year, finish.month, finish.day).toordinal()
+    return get_calendar_index(calendar).count(start, finish)
 
 
 def get_finish_date(start, duration, duration_type, calendar):
     current_date = datetime.date(start.year, start.month, start.day)
-    abs_duration = abs(duration.days)
-    date_offset = datetime.timedelta(days=1 if duration.days > 0 else -1)
-    while abs_duration > 0:
-        if duration_type == "ELAPSEDTIME" or not calendar:
-            abs_duration -= 1
-        elif ifcopenshell.util.sequence.is_working_day(current_date, calendar):
-            abs_duration -= 1
-        current_date += date_offset
-
+    if duration_type == "ELAPSEDTIME" or not calendar:
+        return current_date + datetime.timedelta(days=duration.days)
+    index = get_calendar_index(calendar)
+    # Counting down the working days from the start date lands on the day after the last working day counted,
+    # which then snaps forward to the soonest working day, or back to the most recent one for negative durations.
     if duration.days > 0:
-        current_date = get_soonest_working_day(current_date, duration_type, calendar)
+        day = index.get_nth_working_day_after(current_date.toordinal(), duration.days + 1)
     else:
-        current_date = get_recent_working_day(current_date, duration_type, calendar)
-    return current_date
+        day = index.get_nth_working_day_before(current_date.toordinal(), -duration.days + 1)
+    return datetime.date.fromordinal(day)
 
 
 def get_soonest_working_day(start, duration_type, calendar):
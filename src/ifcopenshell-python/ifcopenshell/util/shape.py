@@ -0,0 +1,15 @@
+import numpy as np
+
+
+def get_vertices(geometry):
+    """Returns the vertices of a triangulated shape as an (N, 3) float64 array
+
+    Only the double precision triangulation exposes verts_buffer(), so the
+    buffer always holds doubles.
+    """
+    return np.frombuffer(geometry.verts_buffer(), dtype=np.float64).reshape(-1, 3)
+
+
+def get_faces(geometry):
+    """Returns the triangle vertex indices of a triangulated shape as an (M, 3) array"""
+    return np.frombuffer(geometry.faces_buffer(), dtype=np.intc).reshape(-1, 3)
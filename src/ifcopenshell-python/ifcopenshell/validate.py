@@ -3,6 +3,7 @@ from __future__ import print_function
 import sys
 import json
 import functools
+import multiprocessing
 
 from collections import namedtuple
 
@@ -113,7 +114,183 @@ def try_valid(attr, val, schema):
         return False
 
 
-def validate(f, logger):
+validation_plan = namedtuple("validation_plan", ("entity", "attributes", "inverses"))
+
+plans = {}
+schema_checkers = {}
+schema_enumerations = {}
+
+
+def get_plan(schema, type_name):
+    """
+    Returns the validation plan of an entity type, which is compiled once per schema. The plan stores the checker of
+    every attribute so that the type declaration chains do not have to be resolved again for every instance.
+    """
+    key = (schema.name(), type_name)
+    plan = plans.get(key)
+    if plan is None and key not in plans:
+        entity = schema.declaration_by_name(type_name)
+        if isinstance(entity, entity_type):
+            checkers = schema_checkers.setdefault(schema.name(), {})
+            attributes = [
+                (attr, is_derived or attr.optional(), compile_checker(attr.type_of_attribute(), schema, checkers))
+                for attr, is_derived in zip(entity.all_attributes(), entity.derived())
+            ]
+            inverses = [(attr, attr.name(), attr.bound1(), attr.bound2()) for attr in entity.all_inverse_attributes()]
+            plan = validation_plan(entity, attributes, inverses)
+        plans[key] = plan
+    return plan
+
+
+def compile_checker(attr_type, schema, checkers):
+    # Entity instances are only unwrapped up to type declarations, see assert_valid()
+    instance_type = attr_type
+    while isinstance(instance_type, named_type):
+        instance_type = instance_type.declared_type()
+    value_type = instance_type
+    while isinstance(value_type, (named_type, type_declaration)):
+        value_type = value_type.declared_type()
+
+    check_entity = compile_resolved_checker(instance_type, schema, checkers)
+    if value_type is instance_type:
+        return check_entity
+    check_value = compile_resolved_checker(value_type, schema, checkers)
+    return lambda val: check_entity(val) if isinstance(val, ifcopenshell.entity_instance) else check_value(val)
+
+
+def compile_resolved_checker(attr_type, schema, checkers):
+    if isinstance(attr_type, simple_type):
+        python_type = simple_type_python_mapping[attr_type.declared_type()]
+        return lambda val: type(val) == python_type
+    elif isinstance(attr_type, (entity_type, type_declaration)):
+        name = attr_type.name()
+        return lambda val: isinstance(val, ifcopenshell.entity_instance) and val.is_a(name)
+    elif isinstance(attr_type, select_type):
+        checker = checkers.get(attr_type.name())
+        if checker is None:
+            select_checkers = [compile_checker(x, schema, checkers) for x in attr_type.select_list()]
+            enumerations = schema_enumerations.setdefault(schema.name(), {})
+
+            def checker(val):
+                name = val.is_a()
+                is_enumeration = enumerations.get(name)
+                if is_enumeration is None:
+                    is_enumeration = enumerations[name] = isinstance(schema.declaration_by_name(name), enumeration_type)
+                if is_enumeration:
+                    if not isinstance(val, ifcopenshell.entity_instance):
+                        return False
+                    val = val.wrappedValue
+                return any(check(val) for check in select_checkers)
+
+            checkers[attr_type.name()] = checker
+        return checker
+    elif isinstance(attr_type, enumeration_type):
+        items = attr_type.enumeration_items()
+        return lambda val: val in items
+    elif isinstance(attr_type, aggregation_type):
+        b1, b2 = attr_type.bound1(), attr_type.bound2()
+        check_element = compile_checker(attr_type.type_of_element(), schema, checkers)
+        return lambda val: not (len(val) < b1 or (b2 != -1 and len(val) > b2)) and all(map(check_element, val))
+
+    def checker(val):
+        raise NotImplementedError("Not impl %s %s" % (type(attr_type), attr_type))
+
+    return checker
+
+
+def validate_instance(inst, plan, schema, logger, has_instance):
+    entity = plan.entity
+
+    if has_instance:
+        logger.set_instance(inst)
+
+    if entity.is_abstract():
+        e = "Entity %s is abstract" % entity.name()
+        if has_instance:
+            logger.error(e)
+        else:
+            logger.error("In %s\n%s", inst, e)
+
+    values = []
+    has_invalid_value = False
+    for i, (attr, is_optional, checker) in enumerate(plan.attributes):
+        try:
+            values.append(inst[i])
+        except:
+            if has_instance:
+                logger.error("Invalid attribute value for %s.%s", entity, attr)
+            else:
+                logger.error(
+                    "In %s\nInvalid attribute value for %s.%s",
+                    inst,
+                    entity,
+                    attr,
+                )
+            has_invalid_value = True
+
+    if not has_invalid_value:
+        for (attr, is_optional, checker), val in zip(plan.attributes, values):
+            if val is None:
+                if not is_optional:
+                    logger.error("Attribute %s.%s not optional", entity, attr)
+            elif not checker(val):
+                # The compiled checker only says whether a value is valid, so rerun the
+                # uncompiled check to obtain a descriptive message
+                try:
+                    assert_valid(attr, val, schema)
+                except ValidationError as e:
+                    if has_instance:
+                        logger.error(str(e))
+                    else:
+                        logger.error("In %s\n%s", inst, e)
+
+    for attr, name, b1, b2 in plan.inverses:
+        n = len(inst.wrapped_data.get_inverse(name))
+        if n < b1 or (b2 != -1 and n > b2):
+            try:
+                assert_valid_inverse(attr, getattr(inst, name), schema)
+            except ValidationError as e:
+                if has_instance:
+                    logger.error(str(e))
+                else:
+                    logger.error("In %s\n%s", inst, e)
+
+
+worker_file = None
+
+
+def validate_chunk(ids):
+    logger = json_logger()
+    schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(worker_file.schema)
+    for id in ids:
+        inst = worker_file.by_id(id)
+        validate_instance(inst, get_plan(schema, inst.is_a()), schema, logger, True)
+    return [
+        (s["level"], s["message"], s["instance"].id() if s["instance"] is not None else None) for s in logger.statements
+    ]
+
+
+def validate_parallel(f, logger, jobs=None, chunk_size=10000):
+    global worker_file
+    ids = list(f.wrapped_data.entity_names())
+    chunks = [ids[i : i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    worker_file = f
+    try:
+        # Workers inherit the parsed file by forking and report back entity ids, not instances
+        with multiprocessing.get_context("fork").Pool(jobs) as pool:
+            for statements in pool.imap(validate_chunk, chunks):
+                for level, message, id in statements:
+                    inst = f.by_id(id) if id is not None else None
+                    if hasattr(logger, "set_instance"):
+                        logger.set_instance(inst)
+                        getattr(logger, level)("%s", message)
+                    else:
+                        getattr(logger, level)("In %s\n%s", inst, message)
+    finally:
+        worker_file = None
+
+
+def validate(f, logger, jobs=1, chunk_size=10000):
     """
     For an IFC population model `f` validate whether the entity attribute values are correctly supplied. As this
     is a function that is applied after a file has been parsed, certain types of errors in syntax, duplicate
@@ -128,64 +305,20 @@ def validate(f, logger):
     to one of the leaves. For enumerations it is checked that the value is indeed on of the items. For aggregations it
     is checked that the elements and the cardinality conforms. Type declarations (IfcInteger which is an integer) are
     unpacked until one of the above cases is reached.
+
+    Instances are validated grouped by their entity type. When `jobs` is not 1, chunks of `chunk_size` instances are
+    validated in a pool of forked processes (`None` uses all cores) and the results are passed to `logger` in order.
     """
+    if jobs != 1 and "fork" in multiprocessing.get_all_start_methods():
+        return validate_parallel(f, logger, jobs, chunk_size)
     schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema)
-    for inst in f:
-        if hasattr(logger, "set_instance"):
-            logger.set_instance(inst)
-
-        entity = schema.declaration_by_name(inst.is_a())
-        attrs = entity.all_attributes()
-
-        if entity.is_abstract():
-            e = "Entity %s is abstract" % entity.name()
-            if hasattr(logger, "set_instance"):
-                logger.error(e)
-            else:
-                logger.error("In %s\n%s", inst, e)
-
-        has_invalid_value = False
-        for i in range(len(attrs)):
-            try:
-                inst[i]
-                pass
-            except:
-                if hasattr(logger, "set_instance"):
-                    logger.error("Invalid attribute value for %s.%s", entity, attrs[i])
-                else:
-                    logger.error(
-                        "In %s\nInvalid attribute value for %s.%s",
-                        inst,
-                        entity,
-                        attrs[i],
-                    )
-                has_invalid_value = True
-
-        if not has_invalid_value:
-            for attr, val, is_derived in zip(attrs, inst, entity.derived()):
-
-                if val is None and not (is_derived or attr.optional()):
-                    logger.error("Attribute %s.%s not optional", entity, attr)
-
-                if val is not None:
-                    attr_type = attr.type_of_attribute()
-                    try:
-                        assert_valid(attr, val, schema)
-                    except ValidationError as e:
-                        if hasattr(logger, "set_instance"):
-                            logger.error(str(e))
-                        else:
-                            logger.error("In %s\n%s", inst, e)
-
-        for attr in entity.all_inverse_attributes():
-            val = getattr(inst, attr.name())
-            try:
-                assert_valid_inverse(attr, val, schema)
-            except ValidationError as e:
-                if hasattr(logger, "set_instance"):
-                    logger.error(str(e))
-                else:
-                    logger.error("In %s\n%s", inst, e)
+    has_instance = hasattr(logger, "set_instance")
+    for type_name in f.wrapped_data.types():
+        plan = get_plan(schema, type_name)
+        if plan is None:
+            continue
+        for inst in f.by_type(type_name, include_subtypes=False):
+            validate_instance(inst, plan, schema, logger, has_instance)
 
 
 if __name__ == "__main__":
@@ -194,6 +327,10 @@ if __name__ == "__main__":
 
     filenames = [x for x in sys.argv[1:] if not x.startswith("--")]
     flags = set(x for x in sys.argv[1:] if x.startswith("--"))
+    jobs = 1
+    for flag in flags:
+        if flag.startswith("--jobs="):
+            jobs = int(flag.split("=")[1]) or None
 
     for fn in filenames:
         if "--json" in flags:
@@ -205,7 +342,7 @@ if __name__ == "__main__":
         f = ifcopenshell.open(fn)
 
         print("Validating", fn, file=sys.stderr)
-        validate(f, logger)
+        validate(f, logger, jobs=jobs)
 
         if "--json" in flags:
             print("\n".join(json.dumps(x, default=str) for x in logger.statements))
@@ -0,0 +1,71 @@
+import pytest
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.util.element
+
+
+class TestAssignObject(test.bootstrap.IFC4):
+    def test_assigning_an_object(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcElementAssembly")
+        subelement = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBeam")
+        rel = ifcopenshell.api.run("aggregate.assign_object", self.file, product=subelement, relating_object=element)
+        assert ifcopenshell.util.element.get_aggregate(subelement) == element
+        assert rel.RelatingObject == element
+
+    def test_assigning_multiple_objects(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcElementAssembly")
+        subelements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBeam") for i in range(3)]
+        rel = ifcopenshell.api.run("aggregate.assign_object", self.file, products=subelements, relating_object=element)
+        assert set(rel.RelatedObjects) == set(subelements)
+        assert len(self.file.by_type("IfcRelAggregates")) == 1
+
+    def test_assigning_multiple_objects_reuses_an_existing_aggregation(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcElementAssembly")
+        subelements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBeam") for i in range(3)]
+        rel = ifcopenshell.api.run(
+            "aggregate.assign_object", self.file, product=subelements[0], relating_object=element
+        )
+        result = ifcopenshell.api.run(
+            "aggregate.assign_object", self.file, products=subelements, relating_object=element
+        )
+        assert result == rel
+        assert len(rel.RelatedObjects) == 3
+        assert set(rel.RelatedObjects) == set(subelements)
+        assert len(self.file.by_type("IfcRelAggregates")) == 1
+
+    def test_doing_nothing_if_all_objects_are_already_assigned(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcElementAssembly")
+        subelements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBeam") for i in range(2)]
+        ifcopenshell.api.run("aggregate.assign_object", self.file, products=subelements, relating_object=element)
+        total_elements = len([e for e in self.file])
+        result = ifcopenshell.api.run(
+            "aggregate.assign_object", self.file, products=subelements, relating_object=element
+        )
+        assert result is None
+        assert len([e for e in self.file]) == total_elements
+
+    def test_that_old_aggregations_are_updated_when_assigning_multiple_objects(self):
+        element1 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcElementAssembly")
+        element2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcElementAssembly")
+        subelements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBeam") for i in range(3)]
+        rel1 = ifcopenshell.api.run(
+            "aggregate.assign_object", self.file, products=subelements, relating_object=element1
+        )
+        rel2 = ifcopenshell.api.run(
+            "aggregate.assign_object", self.file, products=subelements[0:2], relating_object=element2
+        )
+        assert rel1.RelatedObjects == (subelements[2],)
+        assert set(rel2.RelatedObjects) == set(subelements[0:2])
+
+    def test_that_old_aggregations_are_purged_when_all_objects_are_reassigned(self):
+        element1 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcElementAssembly")
+        element2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcElementAssembly")
+        subelements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBeam") for i in range(2)]
+        rel_id = ifcopenshell.api.run(
+            "aggregate.assign_object", self.file, products=subelements, relating_object=element1
+        ).id()
+        ifcopenshell.api.run("aggregate.assign_object", self.file, products=subelements, relating_object=element2)
+        assert len(self.file.by_type("IfcRelAggregates")) == 1
+        assert ifcopenshell.util.element.get_aggregate(subelements[0]) == element2
+        with pytest.raises(RuntimeError):
+            self.file.by_id(rel_id)
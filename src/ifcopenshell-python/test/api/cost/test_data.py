@@ -0,0 +1,57 @@
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.api.cost.data
+
+
+class UnmemoisedData(ifcopenshell.api.cost.data.CostValueTrait):
+    @classmethod
+    def sum_child_root_elements(cls, root_element, category_filter=None):
+        return cls.calculate_child_root_elements(root_element, category_filter)
+
+
+class TestCostData(test.bootstrap.IFC4):
+    def add_cost_item(self, parent, formula, quantity=None):
+        if parent.is_a("IfcCostSchedule"):
+            cost_item = ifcopenshell.api.run("cost.add_cost_item", self.file, cost_schedule=parent)
+        else:
+            cost_item = ifcopenshell.api.run("cost.add_cost_item", self.file, cost_item=parent)
+        cost_value = ifcopenshell.api.run("cost.add_cost_value", self.file, parent=cost_item)
+        ifcopenshell.api.run("cost.edit_cost_value_formula", self.file, cost_value=cost_value, formula=formula)
+        if quantity is not None:
+            ifc_quantity = ifcopenshell.api.run("cost.add_cost_item_quantity", self.file, cost_item=cost_item)
+            ifc_quantity[3] = quantity
+        return cost_item
+
+    def create_cost_schedule(self):
+        cost_schedule = ifcopenshell.api.run("cost.add_cost_schedule", self.file)
+        root = self.add_cost_item(cost_schedule, "SUM()")
+        for i in range(3):
+            group = self.add_cost_item(root, "SUM() + 10", quantity=2.0)
+            for j in range(3):
+                # Subtotals of the same item are rolled up for several categories
+                subgroup = self.add_cost_item(group, "Labour() + Overhead()")
+                for k in range(2):
+                    self.add_cost_item(subgroup, "Labour(%d)" % (i + j + k + 1), quantity=float(j + 1))
+                self.add_cost_item(subgroup, "Overhead(5)")
+        return root
+
+    def test_memoised_subtotals_match_the_unmemoised_rollup(self):
+        root = self.create_cost_schedule()
+        ifcopenshell.api.cost.data.Data.load(self.file)
+        for cost_item in self.file.by_type("IfcCostItem"):
+            for cost_value in cost_item.CostValues:
+                expected = UnmemoisedData.calculate_applied_value(cost_item, cost_value)
+                assert ifcopenshell.api.cost.data.Data.cost_values[cost_value.id()]["AppliedValue"] == expected
+        assert ifcopenshell.api.cost.data.Data.cost_items[root.id()]["TotalCost"] > 0
+
+    def test_subtotals_are_recalculated_when_loading_again(self):
+        root = self.create_cost_schedule()
+        ifcopenshell.api.cost.data.Data.load(self.file)
+        before = ifcopenshell.api.cost.data.Data.cost_items[root.id()]["TotalCost"]
+        leaf = [c for c in self.file.by_type("IfcCostItem") if not c.IsNestedBy][0]
+        leaf.CostValues[0].AppliedValue = self.file.createIfcMonetaryMeasure(100.0)
+        ifcopenshell.api.cost.data.Data.load(self.file)
+        after = ifcopenshell.api.cost.data.Data.cost_items[root.id()]["TotalCost"]
+        assert after != before
+        expected = UnmemoisedData.calculate_applied_value(root, root.CostValues[0])
+        assert ifcopenshell.api.cost.data.Data.cost_values[root.CostValues[0].id()]["AppliedValue"] == expected
@@ -336,3 +336,38 @@ class TestEditObjectPlacement(test.bootstrap.IFC4):
             ifcopenshell.util.placement.get_local_placement(subelement.ObjectPlacement), shifted_submatrix
         )
         assert subelement.ObjectPlacement.PlacementRelTo == element.ObjectPlacement
+
+    def test_invalidating_cached_placements_of_children(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        ifcopenshell.api.run("unit.assign_unit", self.file)
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBuilding")
+        subelement = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        matrix = numpy.eye(4)
+        submatrix = numpy.eye(4)
+        submatrix[:, 3][0:3] = (1.0, 2.0, 3.0)
+        ifcopenshell.api.run("spatial.assign_container", self.file, product=subelement, relating_structure=element)
+        ifcopenshell.api.run(
+            "geometry.edit_object_placement", self.file, product=element, matrix=matrix.copy(), is_si=False
+        )
+        ifcopenshell.api.run(
+            "geometry.edit_object_placement", self.file, product=subelement, matrix=submatrix.copy(), is_si=False
+        )
+        ifcopenshell.util.placement.enable_cache(self.file)
+        try:
+            assert numpy.array_equal(ifcopenshell.util.placement.get_local_placements([subelement])[0], submatrix)
+            matrix[:, 3][0:3] = (1.0, 1.0, 1.0)
+            ifcopenshell.api.run(
+                "geometry.edit_object_placement",
+                self.file,
+                product=element,
+                matrix=matrix.copy(),
+                is_si=False,
+                should_transform_children=True,
+            )
+            shifted_submatrix = submatrix.copy()
+            shifted_submatrix[:, 3][0:3] = (2.0, 3.0, 4.0)
+            placements = ifcopenshell.util.placement.get_local_placements([element, subelement])
+            assert numpy.array_equal(placements[0], matrix)
+            assert numpy.array_equal(placements[1], shifted_submatrix)
+        finally:
+            ifcopenshell.util.placement.disable_cache(self.file)
@@ -0,0 +1,58 @@
+import pytest
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.util.element
+
+
+class TestAssignMaterial(test.bootstrap.IFC4):
+    def test_assigning_a_material(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        material = self.file.createIfcMaterial()
+        rel = ifcopenshell.api.run("material.assign_material", self.file, product=element, material=material)
+        assert ifcopenshell.util.element.get_material(element) == material
+        assert rel.RelatingMaterial == material
+
+    def test_assigning_a_material_to_multiple_products(self):
+        elements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(3)]
+        material = self.file.createIfcMaterial()
+        rel = ifcopenshell.api.run("material.assign_material", self.file, products=elements, material=material)
+        assert set(rel.RelatedObjects) == set(elements)
+        assert len(self.file.by_type("IfcRelAssociatesMaterial")) == 1
+
+    def test_assigning_multiple_products_reuses_an_existing_association(self):
+        elements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(3)]
+        material = self.file.createIfcMaterial()
+        rel = ifcopenshell.api.run("material.assign_material", self.file, product=elements[0], material=material)
+        result = ifcopenshell.api.run("material.assign_material", self.file, products=elements, material=material)
+        assert result == rel
+        assert len(rel.RelatedObjects) == 3
+        assert set(rel.RelatedObjects) == set(elements)
+        assert len(self.file.by_type("IfcRelAssociatesMaterial")) == 1
+
+    def test_that_old_associations_are_updated_when_assigning_multiple_products(self):
+        elements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(3)]
+        material1 = self.file.createIfcMaterial()
+        material2 = self.file.createIfcMaterial()
+        rel1 = ifcopenshell.api.run("material.assign_material", self.file, products=elements, material=material1)
+        rel2 = ifcopenshell.api.run("material.assign_material", self.file, products=elements[0:2], material=material2)
+        assert rel1.RelatedObjects == (elements[2],)
+        assert set(rel2.RelatedObjects) == set(elements[0:2])
+
+    def test_that_old_associations_are_purged_when_all_products_are_reassigned(self):
+        elements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(2)]
+        material1 = self.file.createIfcMaterial()
+        material2 = self.file.createIfcMaterial()
+        rel_id = ifcopenshell.api.run("material.assign_material", self.file, products=elements, material=material1).id()
+        ifcopenshell.api.run("material.assign_material", self.file, products=elements, material=material2)
+        assert len(self.file.by_type("IfcRelAssociatesMaterial")) == 1
+        assert ifcopenshell.util.element.get_material(elements[0]) == material2
+        with pytest.raises(RuntimeError):
+            self.file.by_id(rel_id)
+
+    def test_assigning_a_material_set_to_multiple_products_returns_an_association_per_product(self):
+        elements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(2)]
+        results = ifcopenshell.api.run(
+            "material.assign_material", self.file, products=elements, type="IfcMaterialLayerSet"
+        )
+        assert len(results) == 2
+        assert [r.RelatedObjects for r in results] == [(elements[0],), (elements[1],)]
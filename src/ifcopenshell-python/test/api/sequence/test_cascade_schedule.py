@@ -0,0 +1,73 @@
+import test.bootstrap
+import ifcopenshell.api
+
+
+class TestCascadeSchedule(test.bootstrap.IFC4):
+    def create_task(self, start, finish, duration):
+        task = self.file.createIfcTask(ifcopenshell.guid.new(), IsMilestone=False)
+        task.TaskTime = self.file.createIfcTaskTime(
+            DurationType="ELAPSEDTIME",
+            ScheduleDuration=duration,
+            ScheduleStart=start,
+            ScheduleFinish=finish,
+        )
+        return task
+
+    def assign_sequence(self, relating_process, related_process):
+        ifcopenshell.api.run(
+            "sequence.assign_sequence", self.file, relating_process=relating_process, related_process=related_process
+        )
+
+    def test_cascading_finish_start_dates_to_successors(self):
+        task1 = self.create_task("2021-01-01T00:00:00", "2021-01-03T00:00:00", "P2D")
+        task2 = self.create_task("2021-01-01T00:00:00", "2021-01-02T00:00:00", "P1D")
+        task3 = self.create_task("2021-01-01T00:00:00", "2021-01-02T00:00:00", "P1D")
+        self.assign_sequence(task1, task2)
+        self.assign_sequence(task2, task3)
+        ifcopenshell.api.run("sequence.cascade_schedule", self.file, task=task1)
+        assert task2.TaskTime.ScheduleStart == "2021-01-03T00:00:00"
+        assert task2.TaskTime.ScheduleFinish == "2021-01-04T00:00:00"
+        assert task3.TaskTime.ScheduleStart == "2021-01-04T00:00:00"
+        assert task3.TaskTime.ScheduleFinish == "2021-01-05T00:00:00"
+
+    def test_a_task_with_two_changed_predecessors_starts_after_both(self):
+        task1 = self.create_task("2021-01-01T00:00:00", "2021-01-03T00:00:00", "P2D")
+        task2 = self.create_task("2021-01-01T00:00:00", "2021-01-03T00:00:00", "P2D")
+        task3 = self.create_task("2021-01-01T00:00:00", "2021-01-06T00:00:00", "P5D")
+        task4 = self.create_task("2021-01-01T00:00:00", "2021-01-02T00:00:00", "P1D")
+        self.assign_sequence(task1, task2)
+        self.assign_sequence(task1, task3)
+        self.assign_sequence(task2, task4)
+        self.assign_sequence(task3, task4)
+        ifcopenshell.api.run("sequence.cascade_schedule", self.file, task=task1)
+        assert task2.TaskTime.ScheduleFinish == "2021-01-05T00:00:00"
+        assert task3.TaskTime.ScheduleFinish == "2021-01-08T00:00:00"
+        assert task4.TaskTime.ScheduleStart == "2021-01-08T00:00:00"
+        assert task4.TaskTime.ScheduleFinish == "2021-01-09T00:00:00"
+
+    def test_an_unchanged_successor_does_not_cascade_further(self):
+        task1 = self.create_task("2021-01-01T00:00:00", "2021-01-03T00:00:00", "P2D")
+        task2 = self.create_task("2021-01-03T00:00:00", "2021-01-04T00:00:00", "P1D")
+        # This task is deliberately out of date, so any recalculation would move it
+        task3 = self.create_task("2021-02-01T00:00:00", "2021-02-02T00:00:00", "P1D")
+        self.assign_sequence(task1, task2)
+        self.assign_sequence(task2, task3)
+        ifcopenshell.api.run("sequence.cascade_schedule", self.file, task=task1)
+        assert task2.TaskTime.ScheduleStart == "2021-01-03T00:00:00"
+        assert task2.TaskTime.ScheduleFinish == "2021-01-04T00:00:00"
+        assert task3.TaskTime.ScheduleStart == "2021-02-01T00:00:00"
+        assert task3.TaskTime.ScheduleFinish == "2021-02-02T00:00:00"
+
+    def test_cascading_through_a_cycle_terminates(self):
+        task1 = self.create_task("2021-01-01T00:00:00", "2021-01-03T00:00:00", "P2D")
+        task2 = self.create_task("2021-01-01T00:00:00", "2021-01-02T00:00:00", "P1D")
+        task3 = self.create_task("2021-01-01T00:00:00", "2021-01-02T00:00:00", "P1D")
+        self.assign_sequence(task1, task2)
+        self.assign_sequence(task2, task3)
+        self.assign_sequence(task3, task1)
+        ifcopenshell.api.run("sequence.cascade_schedule", self.file, task=task1)
+        # The edited task follows the previous dates of its predecessor and is not revisited at the end of the cycle
+        assert task1.TaskTime.ScheduleStart == "2021-01-02T00:00:00"
+        assert task2.TaskTime.ScheduleStart == "2021-01-04T00:00:00"
+        assert task3.TaskTime.ScheduleStart == "2021-01-05T00:00:00"
+        assert task3.TaskTime.ScheduleFinish == "2021-01-06T00:00:00"
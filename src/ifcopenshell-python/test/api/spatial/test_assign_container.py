@@ -43,6 +43,29 @@ class TestEditObjectPlacement(test.bootstrap.IFC4):
         with pytest.raises(RuntimeError):
             self.file.by_id(rel_id)
 
+    def test_assigning_multiple_products_to_a_container(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBuilding")
+        subelement1 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        subelement2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        ifcopenshell.api.run(
+            "spatial.assign_container", self.file, products=[subelement1, subelement2], relating_structure=element
+        )
+        assert ifcopenshell.util.element.get_container(subelement1) == element
+        assert ifcopenshell.util.element.get_container(subelement2) == element
+        assert len(self.file.by_type("IfcRelContainedInSpatialStructure")) == 1
+
+    def test_that_old_containment_relationships_are_updated_once_when_assigning_multiple_products(self):
+        element1 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBuilding")
+        element2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBuilding")
+        subelements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(3)]
+        ifcopenshell.api.run("spatial.assign_container", self.file, products=subelements, relating_structure=element1)
+        rel = subelements[0].ContainedInStructure[0]
+        ifcopenshell.api.run(
+            "spatial.assign_container", self.file, products=subelements[0:2], relating_structure=element2
+        )
+        assert rel.RelatedElements == (subelements[2],)
+        assert set(subelements[0].ContainedInStructure[0].RelatedElements) == set(subelements[0:2])
+
     def test_assigning_a_container_does_not_shift_object_placements(self):
         ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
         ifcopenshell.api.run("unit.assign_unit", self.file)
@@ -77,3 +100,38 @@ class TestEditObjectPlacement(test.bootstrap.IFC4):
         )
         ifcopenshell.api.run("spatial.assign_container", self.file, product=subelement, relating_structure=element2)
         assert numpy.array_equal(ifcopenshell.util.placement.get_local_placement(subelement.ObjectPlacement), matrix1)
+
+    def test_assigning_multiple_products_does_not_shift_object_placements(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        ifcopenshell.api.run("unit.assign_unit", self.file)
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBuilding")
+        subelements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(2)]
+        matrix = numpy.array(
+            (
+                (0.0, -1.0, 0.0, 1.0),
+                (1.0, 0.0, 0.0, 1.0),
+                (0.0, 0.0, 1.0, 1.0),
+                (0.0, 0.0, 0.0, 1.0),
+            )
+        )
+        ifcopenshell.api.run(
+            "geometry.edit_object_placement", self.file, product=element, matrix=matrix.copy(), is_si=False
+        )
+        matrices = []
+        for i, subelement in enumerate(subelements):
+            subelement_matrix = numpy.eye(4)
+            subelement_matrix[0][3] = i + 2.0
+            matrices.append(subelement_matrix)
+            ifcopenshell.api.run(
+                "geometry.edit_object_placement",
+                self.file,
+                product=subelement,
+                matrix=subelement_matrix.copy(),
+                is_si=False,
+            )
+        ifcopenshell.api.run("spatial.assign_container", self.file, products=subelements, relating_structure=element)
+        for subelement, subelement_matrix in zip(subelements, matrices):
+            assert subelement.ObjectPlacement.PlacementRelTo == element.ObjectPlacement
+            assert numpy.allclose(
+                ifcopenshell.util.placement.get_local_placement(subelement.ObjectPlacement), subelement_matrix
+            )
@@ -0,0 +1,72 @@
+import pytest
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.util.element
+
+
+class TestAssignType(test.bootstrap.IFC4):
+    def test_assigning_a_type(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        element_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        rel = ifcopenshell.api.run("type.assign_type", self.file, related_object=element, relating_type=element_type)
+        assert ifcopenshell.util.element.get_type(element) == element_type
+        assert rel.RelatingType == element_type
+
+    def test_assigning_a_type_to_multiple_objects(self):
+        elements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(3)]
+        element_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        rel = ifcopenshell.api.run("type.assign_type", self.file, related_objects=elements, relating_type=element_type)
+        assert set(rel.RelatedObjects) == set(elements)
+        assert len(self.file.by_type("IfcRelDefinesByType")) == 1
+
+    def test_assigning_multiple_objects_reuses_an_existing_type_relationship(self):
+        elements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(3)]
+        element_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        rel = ifcopenshell.api.run(
+            "type.assign_type", self.file, related_object=elements[0], relating_type=element_type
+        )
+        result = ifcopenshell.api.run(
+            "type.assign_type", self.file, related_objects=elements, relating_type=element_type
+        )
+        assert result == rel
+        assert len(rel.RelatedObjects) == 3
+        assert set(rel.RelatedObjects) == set(elements)
+        assert len(self.file.by_type("IfcRelDefinesByType")) == 1
+
+    def test_doing_nothing_if_all_objects_already_have_the_type(self):
+        elements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(2)]
+        element_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        ifcopenshell.api.run("type.assign_type", self.file, related_objects=elements, relating_type=element_type)
+        total_elements = len([e for e in self.file])
+        result = ifcopenshell.api.run(
+            "type.assign_type", self.file, related_objects=elements, relating_type=element_type
+        )
+        assert result is None
+        assert len([e for e in self.file]) == total_elements
+
+    def test_that_old_type_relationships_are_updated_when_assigning_multiple_objects(self):
+        elements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(3)]
+        element_type1 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        element_type2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        rel1 = ifcopenshell.api.run(
+            "type.assign_type", self.file, related_objects=elements, relating_type=element_type1
+        )
+        rel2 = ifcopenshell.api.run(
+            "type.assign_type", self.file, related_objects=elements[0:2], relating_type=element_type2
+        )
+        assert rel1.RelatedObjects == (elements[2],)
+        assert set(rel2.RelatedObjects) == set(elements[0:2])
+
+    def test_that_old_type_relationships_are_purged_when_all_objects_are_reassigned(self):
+        elements = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(2)]
+        element_type1 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        element_type2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        rel1 = ifcopenshell.api.run(
+            "type.assign_type", self.file, related_objects=elements, relating_type=element_type1
+        )
+        rel_id = rel1.id()
+        ifcopenshell.api.run("type.assign_type", self.file, related_objects=elements, relating_type=element_type2)
+        assert len(self.file.by_type("IfcRelDefinesByType")) == 1
+        assert ifcopenshell.util.element.get_type(elements[0]) == element_type2
+        with pytest.raises(RuntimeError):
+            self.file.by_id(rel_id)
@@ -0,0 +1,61 @@
+# Measures the per call overhead of ifcopenshell.api.run for common use cases.
+# Run from this package directory with: python -m test.benchmark_api
+import sys
+import timeit
+import numpy
+import ifcopenshell
+import ifcopenshell.api
+
+
+class Noop:
+    def __init__(self, file, **settings):
+        self.file = file
+        self.settings = settings
+
+    def execute(self):
+        pass
+
+
+def benchmark(name, statement, number):
+    seconds = min(timeit.repeat(statement, number=number, repeat=3))
+    print(f"{name:<45} {seconds / number * 1e6:>10.2f} us/call")
+
+
+def main(number=10000):
+    f = ifcopenshell.api.run("project.create_file")
+    ifcopenshell.api.run("root.create_entity", f, ifc_class="IfcProject")
+    ifcopenshell.api.run("unit.assign_unit", f)
+    wall = ifcopenshell.api.run("root.create_entity", f, ifc_class="IfcWall")
+    matrix = numpy.eye(4)
+
+    ifcopenshell.api.usecases["benchmark.noop"] = Noop
+    benchmark("dispatch only", lambda: ifcopenshell.api.run("benchmark.noop", f, product=wall, matrix=matrix), number)
+    ifcopenshell.api.add_recorder("benchmark", lambda *args: None)
+    benchmark(
+        "dispatch only, with recorder",
+        lambda: ifcopenshell.api.run("benchmark.noop", f, product=wall, matrix=matrix),
+        number,
+    )
+    ifcopenshell.api.remove_recorder("benchmark")
+    del ifcopenshell.api.usecases["benchmark.noop"]
+
+    number //= 10
+    benchmark(
+        "root.create_entity",
+        lambda: ifcopenshell.api.run("root.create_entity", f, ifc_class="IfcWall"),
+        number,
+    )
+    benchmark(
+        "attribute.edit_attributes",
+        lambda: ifcopenshell.api.run("attribute.edit_attributes", f, product=wall, attributes={"Name": "Foo"}),
+        number,
+    )
+    benchmark(
+        "geometry.edit_object_placement",
+        lambda: ifcopenshell.api.run("geometry.edit_object_placement", f, product=wall, matrix=matrix.copy()),
+        number,
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,157 @@
+import io
+import json
+import types
+import numpy
+import pytest
+import struct
+import ifcopenshell.geom.server as server
+
+
+def encode_array(values, dtype):
+    return server.encode_string(numpy.asarray(values, dtype=dtype).tobytes())
+
+
+def encode_element(quantities=b""):
+    return b"".join(
+        [
+            struct.pack("=i", 42),
+            server.encode_string("0tA4DSHd50le6Ov9Yu0I9X"),
+            server.encode_string("Wäll"),
+            server.encode_string("IfcWall"),
+            struct.pack("=i", 7),
+            encode_array(numpy.eye(4), numpy.float64),
+            struct.pack("=i", 9),
+            encode_array([0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0], numpy.float64),
+            encode_array([0.0, 0.0, 1.0] * 3, numpy.float32),
+            encode_array([0, 1, 2], numpy.int32),
+            encode_array([1.0, 0.0, 0.0, 1.0], numpy.float32),
+            encode_array([0], numpy.int32),
+            quantities,
+        ]
+    )
+
+
+def create_server(data):
+    process = types.SimpleNamespace(stdout=io.BytesIO(data), wait=lambda: -11)
+    geom_server = server.server.__new__(server.server)
+    geom_server.process = process
+    return geom_server
+
+
+class TestMessageReader:
+    def test_reading_fields_in_order(self):
+        payload = struct.pack("=i", 3) + server.encode_string("abcde") + server.encode_string(b"") + b"rest"
+        reader = server.message_reader(payload)
+        assert reader.int32() == 3
+        assert reader.string() == "abcde"
+        assert reader.offset == 4 + 4 + 8
+        assert bytes(reader.bytes()) == b""
+        assert bytes(reader.rest()) == b"rest"
+
+    def test_reading_an_array(self):
+        reader = server.message_reader(encode_array([1.0, 2.0, 3.0], numpy.float32))
+        array = reader.array(numpy.float32)
+        assert array.dtype == numpy.float32
+        assert array.tolist() == [1.0, 2.0, 3.0]
+
+
+class TestReadElement:
+    def test_reading_an_element(self):
+        element = server.read_element(memoryview(encode_element()))
+        assert element.id == 42
+        assert element.guid == "0tA4DSHd50le6Ov9Yu0I9X"
+        assert element.name == "Wäll"
+        assert element.type == "IfcWall"
+        assert element.parent_id == 7
+        assert numpy.array_equal(element.matrix, numpy.eye(4))
+        assert element.representation_id == 9
+        assert element.verts.tolist() == [0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
+        assert element.normals.dtype == numpy.float32
+        assert element.faces.tolist() == [0, 1, 2]
+        assert element.colors.shape == (1, 4)
+        assert element.material_ids.tolist() == [0]
+        assert element.quantities == {}
+
+    def test_reading_element_quantities(self):
+        quantities = {"Volume": 1.5}
+        # The server pads the quantities to 4 bytes with spaces
+        element = server.read_element(memoryview(encode_element(json.dumps(quantities).encode("utf-8") + b"   ")))
+        assert element.quantities == quantities
+
+
+class TestServer:
+    def test_reading_a_message_from_the_stream(self):
+        payload = server.encode_string("0.7.0")
+        geom_server = create_server(struct.pack("=ii", server.HELLO, len(payload)) + payload)
+        assert server.message_reader(geom_server.read(server.HELLO)).string() == "0.7.0"
+
+    def test_reading_an_unexpected_message(self):
+        geom_server = create_server(struct.pack("=ii", server.LOG, 0))
+        with pytest.raises(server.ServerError):
+            geom_server.read(server.HELLO)
+
+    def test_a_truncated_stream_is_a_crash(self):
+        payload = encode_element()
+        geom_server = create_server(struct.pack("=ii", server.ENTITY, len(payload)) + payload[:10])
+        with pytest.raises(server.ServerCrash):
+            geom_server.read(server.ENTITY)
+
+
+class CrashingServer:
+    def __init__(self, *args):
+        pass
+
+    def iterate(self, data, include=None):
+        raise server.ServerCrash("IfcGeomServer exited with code -11")
+        yield
+
+    def kill(self):
+        pass
+
+
+class BisectingServer(CrashingServer):
+    # Crashes on any set of more than one product, of which the first produces no geometry
+    instances = []
+
+    def __init__(self, *args):
+        self.instances.append(self)
+        self.includes = []
+
+    def iterate(self, data, include=None):
+        self.includes.append(list(include))
+        if len(include) > 1:
+            raise server.ServerCrash("IfcGeomServer exited with code -11")
+        for product in include:
+            if product != 1:
+                yield types.SimpleNamespace(id=product)
+
+    def close(self):
+        pass
+
+
+class TestPool:
+    def create_pool(self, monkeypatch, server_class=CrashingServer, products=(1, 2, 3, 4), **kwargs):
+        monkeypatch.setattr(server, "server", server_class)
+        model = types.SimpleNamespace(wrapped_data=types.SimpleNamespace(to_string=lambda: ""))
+        return server.pool(model, products=list(products), **kwargs)
+
+    def test_products_that_crash_on_their_own_are_failed(self, monkeypatch):
+        geom_pool = self.create_pool(monkeypatch, num_workers=2, max_restarts=None)
+        assert list(geom_pool) == []
+        assert sorted(geom_pool.failed) == [1, 2, 3, 4]
+        # Each shard of two crashes once as a whole and once for each half
+        assert geom_pool.restarts == 6
+
+    def test_iteration_stops_after_too_many_restarts(self, monkeypatch):
+        geom_pool = self.create_pool(monkeypatch, num_workers=1, max_restarts=2)
+        with pytest.raises(server.ServerError, match="more than 2 times"):
+            list(geom_pool)
+
+    def test_a_half_without_geometry_does_not_fail_the_other_half(self, monkeypatch):
+        BisectingServer.instances = []
+        geom_pool = self.create_pool(monkeypatch, server_class=BisectingServer, products=(1, 2), num_workers=1)
+        assert [e.id for e in geom_pool] == [2]
+        assert geom_pool.failed == []
+        assert geom_pool.restarts == 1
+        # The server restarted after the crash is reused for both halves
+        assert [s.includes for s in BisectingServer.instances] == [[[1, 2]], [[1], [2]]]
@@ -1,3 +1,5 @@
+import io
+import numpy
 import pytest
 import test.bootstrap
 import ifcopenshell
@@ -11,6 +13,13 @@ class TestTransaction(test.bootstrap.IFC4):
         self.file.undo()
         assert wall
 
+    def test_that_changes_are_recorded_from_the_start_of_a_transaction(self):
+        self.file.begin_transaction()
+        wall = self.file.createIfcWall()
+        assert self.file.transaction.actions.tolist() == [self.file.transaction.CREATE]
+        self.file.end_transaction()
+        assert len(self.file.history) == 1
+
     def test_that_you_can_undo_and_redo_creation(self):
         unchanged = self.file.createIfcWall()
         self.file.begin_transaction()
@@ -33,6 +42,25 @@ class TestTransaction(test.bootstrap.IFC4):
         self.file.redo()
         assert element.Name == "bar"
 
+    def test_that_you_can_undo_and_redo_editing_with_numpy_values(self):
+        element = self.file.createIfcCartesianPoint((0.0, 0.0, 0.0))
+        self.file.begin_transaction()
+        element.Coordinates = numpy.array((1.0, 2.0, 3.0))
+        self.file.end_transaction()
+        self.file.undo()
+        assert element.Coordinates == (0.0, 0.0, 0.0)
+        self.file.redo()
+        assert element.Coordinates == (1.0, 2.0, 3.0)
+
+    def test_that_a_failed_edit_is_not_recorded(self):
+        element = self.file.createIfcWall(Name="foo")
+        self.file.begin_transaction()
+        with pytest.raises(ValueError):
+            element.Name = 1
+        self.file.end_transaction()
+        self.file.undo()
+        assert element.Name == "foo"
+
     def test_that_you_can_undo_and_redo_deletion(self):
         element = self.file.createIfcWall(GlobalId="id")
         self.file.begin_transaction()
@@ -101,6 +129,39 @@ class TestTransaction(test.bootstrap.IFC4):
         self.file.set_history_size(1)
         assert len(self.file.history) == 1
 
+    def test_spilling_old_history_to_disk_instead_of_forgetting_it(self):
+        element = self.file.createIfcWall(Name="foo")
+        self.file.set_history_size(1, spill=True)
+        self.file.begin_transaction()
+        element.Name = "bar"
+        self.file.end_transaction()
+        self.file.begin_transaction()
+        self.file.remove(element)
+        self.file.end_transaction()
+        assert len(self.file.history) == 2
+        assert self.file.history[0].blobs is None
+        self.file.undo()
+        self.file.undo()
+        assert self.file.by_id(1).Name == "foo"
+        self.file.redo()
+        assert self.file.by_id(1).Name == "bar"
+
+    def test_spilling_large_transactions_to_disk(self):
+        element = self.file.createIfcWall(Name="foo")
+        self.file.transaction_memory_limit = 0
+        self.file.begin_transaction()
+        element.Name = "bar"
+        self.file.createIfcWall(Name="baz")
+        self.file.end_transaction()
+        assert self.file.history[0].blobs is None
+        self.file.undo()
+        assert element.Name == "foo"
+        with pytest.raises(RuntimeError):
+            self.file.by_id(2)
+        self.file.redo()
+        assert element.Name == "bar"
+        assert self.file.by_id(2).Name == "baz"
+
     def test_discarding_the_active_transaction(self):
         self.file.begin_transaction()
         self.file.discard_transaction()
@@ -177,6 +238,15 @@ class TestFile(test.bootstrap.IFC4):
         assert self.file.by_type("IfcElement") == [wall]
         assert len(self.file.by_type("IfcElement", include_subtypes=False)) == 0
 
+    def test_getting_attributes_of_elements_by_type_as_columns(self):
+        owner = self.file.createIfcOwnerHistory()
+        wall = self.file.createIfcWall(GlobalId="a", Name="foo", OwnerHistory=owner)
+        slab = self.file.createIfcSlab(GlobalId="b")
+        columns = self.file.get_attributes("IfcElement", ["GlobalId", "Name", "OwnerHistory"])
+        assert sorted(zip(*columns.values())) == [(wall.id(), "a", "foo", owner.id()), (slab.id(), "b", None, None)]
+        columns = self.file.get_attributes("IfcElement", ["OwnerHistory"], as_numpy=True)
+        assert sorted(columns["OwnerHistory"].tolist()) == [0, owner.id()]
+
     def test_traversing_direct_attributes_of_an_element(self):
         owner = self.file.createIfcOwnerHistory()
         element = self.file.createIfcWall(OwnerHistory=owner)
@@ -193,6 +263,17 @@ class TestFile(test.bootstrap.IFC4):
         element = self.file.createIfcWall(OwnerHistory=owner)
         assert self.file.get_inverse(owner) == [element]
 
+    def test_reusing_entity_instances_with_an_instance_cache(self):
+        self.file.set_instance_cache()
+        owner = self.file.createIfcOwnerHistory()
+        element = self.file.createIfcWall(OwnerHistory=owner)
+        assert self.file.by_type("IfcWall")[0] is element
+        assert element.OwnerHistory is owner
+        assert self.file.get_inverse(owner)[0] is element
+        element_id = element.id()
+        self.file.remove(element)
+        assert element_id not in self.file.instance_cache
+
     def test_removing_an_element(self):
         element = self.file.createIfcWall(GlobalId="global_id")
         self.file.remove(element)
@@ -209,3 +290,48 @@ class TestFile(test.bootstrap.IFC4):
         element = self.file.createIfcWall()
         g = ifcopenshell.file.from_string(self.file.wrapped_data.to_string())
         assert g.by_id(1).is_a("IfcWall")
+
+    def test_writing_a_subset_of_ifc_data_to_a_stream(self):
+        wall = self.file.createIfcWall()
+        slab = self.file.createIfcSlab()
+        stream = io.BytesIO()
+        progress = []
+        n_bytes = self.file.write_stream(stream, ids=[slab], progress=lambda *args: progress.append(args))
+        assert n_bytes == len(stream.getvalue())
+        assert progress == [(n_bytes - len(b"ENDSEC;\nEND-ISO-10303-21;\n"), 1, 1)]
+        g = ifcopenshell.file.from_string(stream.getvalue().decode("utf-8"))
+        assert [e.is_a() for e in g] == ["IfcSlab"]
+
+
+class TestOpen:
+    def create_model(self, path):
+        f = ifcopenshell.file(schema="IFC4")
+        wall = f.createIfcWall(ifcopenshell.guid.new(), Name="Wall")
+        slab = f.createIfcSlab(ifcopenshell.guid.new(), Name="Slab")
+        f.createIfcRelAggregates(ifcopenshell.guid.new(), RelatingObject=wall, RelatedObjects=[slab])
+        f.write(str(path))
+        return wall.GlobalId, slab.GlobalId
+
+    def test_opening_a_file_lazily(self, tmp_path):
+        wall_guid, slab_guid = self.create_model(tmp_path / "test.ifc")
+        eager = ifcopenshell.open(str(tmp_path / "test.ifc"))
+        lazy = ifcopenshell.open(str(tmp_path / "test.ifc"), lazy=True)
+        assert [e.is_a() for e in lazy] == [e.is_a() for e in eager]
+        assert lazy.by_id(1).Name == eager.by_id(1).Name == "Wall"
+        assert lazy.by_guid(slab_guid).id() == eager.by_guid(slab_guid).id()
+        wall = lazy.by_guid(wall_guid)
+        assert [e.id() for e in lazy.get_inverse(wall)] == [e.id() for e in eager.get_inverse(eager.by_guid(wall_guid))]
+        assert wall.IsDecomposedBy[0].RelatedObjects[0].GlobalId == slab_guid
+        rel = lazy.by_type("IfcRelAggregates")[0]
+        assert rel.get_info(recursive=True) == eager.by_id(rel.id()).get_info(recursive=True)
+
+    def test_removing_from_a_lazily_opened_file(self, tmp_path):
+        wall_guid, slab_guid = self.create_model(tmp_path / "test.ifc")
+        eager = ifcopenshell.open(str(tmp_path / "test.ifc"))
+        lazy = ifcopenshell.open(str(tmp_path / "test.ifc"), lazy=True)
+        for f in (eager, lazy):
+            f.remove(f.by_guid(slab_guid))
+        assert lazy.wrapped_data.to_string() == eager.wrapped_data.to_string()
+        assert lazy.by_type("IfcRelAggregates")[0].RelatedObjects == ()
+        with pytest.raises(RuntimeError):
+            lazy.by_guid(slab_guid)
@@ -13,7 +13,6 @@ def read_web_file(URL):
 
 
 class TestIdsParsing(unittest.TestCase):
-
     """Parsing basic IDS files"""
 
     def test_parse_basic_ids(self):
@@ -109,7 +108,6 @@ class TestIdsParsing(unittest.TestCase):
 
 
 class TestIdsAuthoring(unittest.TestCase):
-
     """Creating basic IDS"""
 
     def test_entity_create(self):
@@ -249,11 +247,69 @@ class TestIdsAuthoring(unittest.TestCase):
         self.assertEqual(i.info["version"], 1.23)
 
 
+def create_model():
+    ifc_file = ifcopenshell.file(schema="IFC4")
+    ifc_file.createIfcWall(ifcopenshell.guid.new(), Name="Wall", PredefinedType="SOLIDWALL")
+    ifc_file.createIfcWall(ifcopenshell.guid.new(), Name="Partition", PredefinedType="PARTITIONING")
+    ifc_file.createIfcSlab(ifcopenshell.guid.new(), Name="Slab", PredefinedType="FLOOR")
+    ifc_file.createIfcWallType(ifcopenshell.guid.new(), Name="Type", PredefinedType="SOLIDWALL")
+    return ifc_file
+
+
+def create_ids():
+    ids_file = ids.ids()
+    for name, predefinedtype in (("IfcWall", "SOLIDWALL"), ("IfcSlab", "FLOOR"), ("IfcWall", "PARTITIONING")):
+        spec = ids.specification(name=name)
+        spec.add_applicability(ids.entity.create(name=name))
+        spec.add_requirement(ids.entity.create(name=name, predefinedtype=predefinedtype))
+        ids_file.specifications.append(spec)
+    return ids_file
+
+
 class TestIfcValidation(unittest.TestCase):
     def test_validate_simple(self):
         # TODO
         pass
 
+    def test_applicable_elements_are_prefiltered_by_entity(self):
+        ifc_file = create_model()
+        spec = ids.specification()
+        spec.add_applicability(ids.entity.create(name="IfcWall"))
+        self.assertEqual([e.Name for e in spec.get_applicable_elements(ifc_file)], ["Wall", "Partition"])
+
+    def test_applicable_elements_of_a_disjunction_are_all_objects(self):
+        ifc_file = create_model()
+        spec = ids.specification()
+        spec.applicability = ids.boolean_or([ids.entity.create(name="IfcWall"), ids.entity.create(name="IfcSlab")])
+        # Type objects are not objects, so are never applicable
+        self.assertEqual(spec.get_applicable_elements(ifc_file), ifc_file.by_type("IfcObject"))
+
+    def test_element_data_is_memoised_during_a_run(self):
+        ifc_file = create_model()
+        wall = ifc_file.by_type("IfcWall")[0]
+        self.assertIsNot(ids.get_attributes(wall), ids.get_attributes(wall))
+        ids.run_cache = {}
+        try:
+            self.assertIs(ids.get_attributes(wall), ids.get_attributes(wall))
+            self.assertEqual(ids.get_attributes(wall)["name"], "Wall")
+        finally:
+            ids.run_cache = None
+
+    def test_parallel_and_serial_validation_report_the_same_results(self):
+        ifc_file = create_model()
+        results = []
+        for jobs in (1, 2):
+            logger = logging.getLogger("IDS_Logger_%s" % jobs)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            report = ids.SimpleHandler(report_valid=True)
+            logger.addHandler(report)
+            create_ids().validate(ifc_file, logger, jobs=jobs)
+            logger.removeHandler(report)
+            results.append([(s["ifc_element"], s["result"], s["sentence"]) for s in report.statements])
+        self.assertEqual(len(results[0]), 5)
+        self.assertEqual(results[0], results[1])
+
     def test_validate_all_facets(self):
         # TODO
         pass
@@ -0,0 +1,21 @@
+import ifcopenshell
+
+
+def test_scanning_a_file_counts_instances_per_type(tmp_path):
+    f = ifcopenshell.file(schema="IFC4")
+    f.createIfcWall(ifcopenshell.guid.new(), Name="it's; a /* wall */")
+    f.createIfcWall(ifcopenshell.guid.new())
+    f.createIfcSlab(ifcopenshell.guid.new())
+    f.write(str(tmp_path / "test.ifc"))
+
+    result = ifcopenshell.scan(str(tmp_path / "test.ifc"), chunk_size=16)
+    assert result.schema == "IFC4"
+    assert list(result.header.file_schema.schema_identifiers) == ["IFC4"]
+    assert len(result) == 3
+    assert result.types["IfcWall"].count == 2
+    assert result.types["IfcSlab"].count == 1
+
+    with open(tmp_path / "test.ifc", "rb") as data:
+        census = result.types["IfcSlab"]
+        data.seek(census.start)
+        assert data.read(census.end - census.start).startswith(b"#3=IFCSLAB(")
@@ -0,0 +1,65 @@
+import test.bootstrap
+import ifcopenshell
+import ifcopenshell.validate
+
+
+def validate_uncompiled(f, logger):
+    # Checks every attribute of every instance against its declaration, as validate() did before plans were compiled
+    schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema)
+    for inst in f:
+        logger.set_instance(inst)
+        entity = schema.declaration_by_name(inst.is_a())
+        if entity.is_abstract():
+            logger.error("Entity %s is abstract" % entity.name())
+        for attr, val, is_derived in zip(entity.all_attributes(), inst, entity.derived()):
+            if val is None and not (is_derived or attr.optional()):
+                logger.error("Attribute %s.%s not optional", entity, attr)
+            if val is not None:
+                try:
+                    ifcopenshell.validate.assert_valid(attr, val, schema)
+                except ifcopenshell.validate.ValidationError as e:
+                    logger.error(str(e))
+        for attr in entity.all_inverse_attributes():
+            try:
+                ifcopenshell.validate.assert_valid_inverse(attr, getattr(inst, attr.name()), schema)
+            except ifcopenshell.validate.ValidationError as e:
+                logger.error(str(e))
+
+
+def get_statements(logger):
+    return sorted((s["level"], s["message"], s["instance"].id()) for s in logger.statements)
+
+
+class TestValidate(test.bootstrap.IFC4):
+    def create_model(self):
+        # The wall has no GlobalId, the building element is abstract and the shape is not used by any product
+        self.file.createIfcWall()
+        self.file.createIfcBuildingElement(ifcopenshell.guid.new())
+        self.file.createIfcProductDefinitionShape(Representations=[])
+        self.file.createIfcWall(ifcopenshell.guid.new(), Name="Valid")
+        self.file.createIfcPropertySingleValue("Name", NominalValue=self.file.createIfcLabel("Value"))
+        self.file.createIfcCartesianPoint((0.0, 0.0, 0.0))
+
+    def test_compiled_validation_reports_the_same_errors_as_checking_every_attribute(self):
+        self.create_model()
+        expected = ifcopenshell.validate.json_logger()
+        validate_uncompiled(self.file, expected)
+        logger = ifcopenshell.validate.json_logger()
+        ifcopenshell.validate.validate(self.file, logger)
+        assert len(get_statements(expected)) >= 3
+        assert get_statements(logger) == get_statements(expected)
+
+    def test_parallel_validation_reports_the_same_errors_as_serial_validation(self):
+        self.create_model()
+        expected = ifcopenshell.validate.json_logger()
+        ifcopenshell.validate.validate(self.file, expected)
+        logger = ifcopenshell.validate.json_logger()
+        ifcopenshell.validate.validate(self.file, logger, jobs=2, chunk_size=2)
+        assert get_statements(logger) == get_statements(expected)
+
+    def test_a_valid_model_has_no_errors(self):
+        self.file.createIfcWall(ifcopenshell.guid.new())
+        self.file.createIfcCartesianPoint((0.0, 0.0, 0.0))
+        logger = ifcopenshell.validate.json_logger()
+        ifcopenshell.validate.validate(self.file, logger)
+        assert logger.statements == []
@@ -0,0 +1,41 @@
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.util.cost
+
+
+class TestUnserialiseCostValue(test.bootstrap.IFC4):
+    def create_cost_value(self, formula):
+        cost_item = ifcopenshell.api.run("cost.add_cost_item", self.file)
+        cost_value = ifcopenshell.api.run("cost.add_cost_value", self.file, parent=cost_item)
+        ifcopenshell.api.run("cost.edit_cost_value_formula", self.file, cost_value=cost_value, formula=formula)
+        return cost_value
+
+    def test_parsing_a_formula(self):
+        assert ifcopenshell.util.cost.parse_cost_formula("1 + Labour(2)") == {
+            "Components": [{"AppliedValue": 1.0}, {"Category": "Labour", "AppliedValue": 2.0}],
+            "ArithmeticOperator": "ADD",
+        }
+
+    def test_repeated_calls_return_independent_annotated_copies(self):
+        cost_value1 = self.create_cost_value("1 + 2")
+        cost_value2 = self.create_cost_value("1 + 2")
+        result1 = ifcopenshell.util.cost.unserialise_cost_value("1 + 2", cost_value1)
+        result2 = ifcopenshell.util.cost.unserialise_cost_value("1 + 2", cost_value2)
+        assert result1 is not result2
+        assert result1["ifc"] == cost_value1
+        assert result1["Components"][0]["ifc"] == cost_value1.Components[0]
+        assert result2["ifc"] == cost_value2
+        assert result2["Components"][1]["ifc"] == cost_value2.Components[1]
+        result1["Components"].append({"AppliedValue": 3.0})
+        assert len(result2["Components"]) == 2
+        # The memoised parse is never annotated
+        parsed = ifcopenshell.util.cost.parse_cost_formula("1 + 2")
+        assert "ifc" not in parsed
+        assert all("ifc" not in component for component in parsed["Components"])
+        assert len(parsed["Components"]) == 2
+
+    def test_editing_formulas_round_trips_through_the_cache(self):
+        cost_value = self.create_cost_value("2 * 3")
+        assert ifcopenshell.util.cost.serialise_cost_value(cost_value) == "2.0*3.0"
+        ifcopenshell.api.run("cost.edit_cost_value_formula", self.file, cost_value=cost_value, formula="2 * 4")
+        assert ifcopenshell.util.cost.serialise_cost_value(cost_value) == "2.0*4.0"
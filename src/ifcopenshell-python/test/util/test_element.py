@@ -174,6 +174,29 @@ class TestGetContainerIFC4(test.bootstrap.IFC4):
         assert ifcopenshell.util.element.get_container(subelement) == building
 
 
+class TestElementIndexIFC4(test.bootstrap.IFC4):
+    def test_looking_up_relationships_using_an_index(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        subelement = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcCovering")
+        element_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        building = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBuilding")
+        material = ifcopenshell.api.run("material.add_material", self.file)
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": "b"})
+        ifcopenshell.api.run("type.assign_type", self.file, related_object=element, relating_type=element_type)
+        ifcopenshell.api.run("material.assign_material", self.file, product=element_type, material=material)
+        ifcopenshell.api.run("spatial.assign_container", self.file, product=element, relating_structure=building)
+        ifcopenshell.api.run("aggregate.assign_object", self.file, product=subelement, relating_object=element)
+        ifcopenshell.util.element.build_index(self.file)
+        try:
+            assert ifcopenshell.util.element.get_psets(element) == {"name": {"a": "b"}}
+            assert ifcopenshell.util.element.get_type(element) == element_type
+            assert ifcopenshell.util.element.get_material(element) == material
+            assert ifcopenshell.util.element.get_container(subelement) == building
+        finally:
+            ifcopenshell.util.element.clear_index(self.file)
+
+
 class TestGetDecompositionIFC4(test.bootstrap.IFC4):
     def test_getting_decomposed_subelements_of_an_element(self):
         element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcElementAssembly")
@@ -0,0 +1,49 @@
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.util.selector
+
+
+class TestSelector(test.bootstrap.IFC4):
+    def create_model(self):
+        wall_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType", name="WT01")
+        for name in ("A", "B", "C"):
+            wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name=name)
+            pset = ifcopenshell.api.run("pset.add_pset", self.file, product=wall, name="Pset_Foo")
+            ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Bar": name.lower()})
+            if name != "C":
+                ifcopenshell.api.run("type.assign_type", self.file, related_object=wall, relating_type=wall_type)
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcSlab", name="A")
+
+    def test_cached_and_uncached_queries_return_the_same_elements(self):
+        self.create_model()
+        queries = [
+            ".IfcWall",
+            '.IfcWall[Name="A"]',
+            '.IfcWall[Pset_Foo.Bar="b"]',
+            '.IfcWall[type.Name="WT01"]',
+            '.IfcWall[Name="A"] | .IfcSlab',
+            '.IfcElement[Name="A"] & .IfcWall',
+        ]
+        uncached = ifcopenshell.util.selector.Selector()
+        cached = ifcopenshell.util.selector.Selector(cache=True)
+        for query in queries:
+            results = set(uncached.parse(self.file, query))
+            assert results
+            assert set(cached.parse(self.file, query)) == results
+            # The second query is answered from the cache
+            assert set(cached.parse(self.file, query)) == results
+
+    def test_cached_results_are_copies(self):
+        self.create_model()
+        selector = ifcopenshell.util.selector.Selector(cache=True)
+        selector.parse(self.file, ".IfcWall").clear()
+        assert len(selector.parse(self.file, ".IfcWall")) == 3
+
+    def test_clearing_the_cache_after_a_change(self):
+        self.create_model()
+        selector = ifcopenshell.util.selector.Selector(cache=True)
+        assert len(selector.parse(self.file, '.IfcWall[Name="A"]')) == 1
+        self.file.by_type("IfcWall")[1].Name = "A"
+        assert len(selector.parse(self.file, '.IfcWall[Name="A"]')) == 1
+        selector.clear_cache()
+        assert len(selector.parse(self.file, '.IfcWall[Name="A"]')) == 2
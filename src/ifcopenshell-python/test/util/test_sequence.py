@@ -0,0 +1,85 @@
+import datetime
+import test.bootstrap
+import ifcopenshell
+import ifcopenshell.util.sequence
+
+
+def count_working_days_by_walking(start, finish, calendar):
+    result = 0
+    current_date = start
+    while current_date < finish:
+        if ifcopenshell.util.sequence.is_working_day(current_date, calendar):
+            result += 1
+        current_date += datetime.timedelta(days=1)
+    return result
+
+
+def get_finish_date_by_walking(start, duration, calendar):
+    current_date = start
+    abs_duration = abs(duration.days)
+    date_offset = datetime.timedelta(days=1 if duration.days > 0 else -1)
+    while abs_duration > 0:
+        if ifcopenshell.util.sequence.is_working_day(current_date, calendar):
+            abs_duration -= 1
+        current_date += date_offset
+    if duration.days > 0:
+        return ifcopenshell.util.sequence.get_soonest_working_day(current_date, "WORKTIME", calendar)
+    return ifcopenshell.util.sequence.get_recent_working_day(current_date, "WORKTIME", calendar)
+
+
+def create_calendar(ifc_file):
+    # Weekdays are working days, except for a holiday on a Wednesday and a long weekend
+    weekdays = ifc_file.createIfcRecurrencePattern("WEEKLY", WeekdayComponent=[1, 2, 3, 4, 5])
+    return ifc_file.createIfcWorkCalendar(
+        ifcopenshell.guid.new(),
+        WorkingTimes=[ifc_file.createIfcWorkTime(RecurrencePattern=weekdays)],
+        ExceptionTimes=[
+            ifc_file.createIfcWorkTime(Start="2021-01-06", Finish="2021-01-06"),
+            ifc_file.createIfcWorkTime(Start="2021-01-15", Finish="2021-01-18"),
+        ],
+    )
+
+
+class TestCalendarIndex(test.bootstrap.IFC4):
+    def test_counting_working_days_matches_walking_the_calendar(self):
+        calendar = create_calendar(self.file)
+        ifcopenshell.util.sequence.clear_calendar_indices(self.file)
+        origin = datetime.date(2021, 1, 1)
+        for i in range(30):
+            start = origin + datetime.timedelta(days=i)
+            for j in range(-3, 30):
+                finish = start + datetime.timedelta(days=j)
+                result = ifcopenshell.util.sequence.count_working_days(start, finish, calendar)
+                assert result == count_working_days_by_walking(start, finish, calendar)
+
+    def test_getting_finish_dates_matches_walking_the_calendar(self):
+        calendar = create_calendar(self.file)
+        ifcopenshell.util.sequence.clear_calendar_indices(self.file)
+        origin = datetime.date(2021, 1, 1)
+        for i in range(30):
+            start = origin + datetime.timedelta(days=i)
+            # Covers negative, zero and positive durations
+            for days in range(-25, 26):
+                duration = datetime.timedelta(days=days)
+                result = ifcopenshell.util.sequence.get_finish_date(start, duration, "WORKTIME", calendar)
+                assert result == get_finish_date_by_walking(start, duration, calendar)
+
+    def test_getting_finish_dates_of_elapsed_time_ignores_the_calendar(self):
+        calendar = create_calendar(self.file)
+        start = datetime.date(2021, 1, 5)
+        duration = datetime.timedelta(days=10)
+        result = ifcopenshell.util.sequence.get_finish_date(start, duration, "ELAPSEDTIME", calendar)
+        assert result == datetime.date(2021, 1, 15)
+
+    def test_indices_are_cached_per_file(self):
+        ifc_file = ifcopenshell.file(schema="IFC4")
+        calendar1 = create_calendar(self.file)
+        calendar2 = create_calendar(ifc_file)
+        assert calendar1.id() == calendar2.id()
+        index1 = ifcopenshell.util.sequence.get_calendar_index(calendar1)
+        index2 = ifcopenshell.util.sequence.get_calendar_index(calendar2)
+        assert index1 is not index2
+        assert ifcopenshell.util.sequence.get_calendar_index(calendar1) is index1
+        ifcopenshell.util.sequence.clear_calendar_indices(ifc_file)
+        assert ifcopenshell.util.sequence.get_calendar_index(calendar1) is index1
+        assert ifcopenshell.util.sequence.get_calendar_index(calendar2) is not index2
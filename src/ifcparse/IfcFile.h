@@ -132,7 +132,12 @@ private:
 
 	void setDefaultHeaderValues();
 
-	void initialize_(IfcParse::IfcSpfStream* f);
+	void initialize_(IfcParse::IfcSpfStream* f, bool lazy = false);
+
+	/// When set, the GlobalId and inverse reference maps have not been
+	/// populated yet and are built on first use.
+	bool lazy_ = false;
+	void build_lazy_indices_();
 
 	void build_inverses_(IfcUtil::IfcBaseClass*);
 
@@ -160,7 +165,10 @@ public:
 #endif
 	IfcFile(std::istream& fn, int len);
 	IfcFile(void* data, int len);
-	IfcFile(IfcParse::IfcSpfStream* f);
+	/// When lazy is set, instance attributes are not tokenized when scanning
+	/// the file and the GlobalId and inverse reference maps are only built
+	/// when they are first needed.
+	IfcFile(IfcParse::IfcSpfStream* f, bool lazy = false);
 	IfcFile(const IfcParse::schema_definition* schema = IfcParse::schema_by_name("IFC4"));
 
 	virtual ~IfcFile();
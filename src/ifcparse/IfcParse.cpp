@@ -340,6 +340,20 @@ Token IfcSpfLexer::Next() {
 	else return NoneTokenPtr();
 }
 
+//
+// Moves the cursor past the semicolon that terminates the current instance
+// without creating tokens for its attributes
+//
+void IfcSpfLexer::skipInstance() {
+	while (!stream->eof) {
+		if (skipComment()) continue;
+		char c = stream->Peek();
+		stream->Inc();
+		if (c == '\'') decoder->skip();
+		else if (c == ';') break;
+	}
+}
+
 bool IfcSpfStream::is_eof_at(unsigned int local_ptr) {
 	return local_ptr >= len;
 }
@@ -932,10 +946,13 @@ void IfcParse::IfcFile::register_inverse(unsigned id_from, Token t) {
 }
 
 void IfcParse::IfcFile::register_inverse(unsigned id_from, IfcUtil::IfcBaseClass* inst) {
+	// The inverses of a lazily parsed file are derived from the current attribute values once built
+	if (lazy_) return;
 	byref[inst->data().id()].push_back(id_from);
 }
 
 void IfcParse::IfcFile::unregister_inverse(unsigned id_from, IfcUtil::IfcBaseClass* inst) {
+	if (lazy_) return;
 	std::vector<unsigned int>& ids = byref[inst->data().id()];
 	std::vector<unsigned int>::iterator it = std::find(ids.begin(), ids.end(), id_from);
 	if (it == ids.end()) {
@@ -1322,8 +1339,8 @@ IfcFile::IfcFile(void* data, int len) {
 	initialize_(new IfcSpfStream(data, len));
 }
 
-IfcFile::IfcFile(IfcParse::IfcSpfStream* s) {
-	initialize_(s);
+IfcFile::IfcFile(IfcParse::IfcSpfStream* s, bool lazy) {
+	initialize_(s, lazy);
 }
 
 IfcFile::IfcFile(const IfcParse::schema_definition* schema)
@@ -1337,12 +1354,13 @@ IfcFile::IfcFile(const IfcParse::schema_definition* schema)
 	setDefaultHeaderValues();
 }
 
-void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
+void IfcFile::initialize_(IfcParse::IfcSpfStream* s, bool lazy) {
 	// Initialize a "C" locale for locale-independent
 	// number parsing. See comment above on line 41.
 	init_locale();
 
 	parsing_complete_ = false;
+	lazy_ = false;
 	MaxId = 0;
 	tokens = 0;
 	stream = 0;
@@ -1422,7 +1440,7 @@ void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
 				Logger::Status(ss.str(), false);
 			}
 
-			if (instance->declaration().is(*ifcroot_type_)) {
+			if (!lazy && instance->declaration().is(*ifcroot_type_)) {
 				try {
 					const std::string guid = *instance->data().getArgument(0);
 					if ( byguid.find(guid) != byguid.end() ) {
@@ -1470,6 +1488,16 @@ void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
 			byid[current_id] = instance;
 			
 			MaxId = (std::max)(MaxId, current_id);
+
+			if (lazy) {
+				// Attributes are tokenized when the instance is first accessed
+				try {
+					tokens->skipInstance();
+				} catch (const IfcException& e) {
+					Logger::Message(Logger::LOG_ERROR, std::string(e.what()) + ". Parsing terminated");
+					break;
+				}
+			}
 		} else if (token_stream[0].type == IfcParse::Token_IDENTIFIER && instance) {
 			register_inverse(current_id, token_stream[0]);
 		}
@@ -1492,6 +1520,7 @@ void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
 	Logger::Status("\rDone scanning file   ");
 
 	parsing_complete_ = true;
+	lazy_ = lazy;
 
 	return;
 }
@@ -1616,6 +1645,8 @@ void IfcFile::addEntities(IfcEntityList::ptr es) {
 }
 
 IfcUtil::IfcBaseClass* IfcFile::addEntity(IfcUtil::IfcBaseClass* entity, int id) {
+	build_lazy_indices_();
+
 	if (id != -1 && byid.find((unsigned)id) != byid.end()) {
 		throw IfcParse::IfcException("An instance with id " + boost::lexical_cast<std::string>(id) + " is already part of this file");
 	}
@@ -1865,6 +1896,8 @@ IfcUtil::IfcBaseClass* IfcFile::addEntity(IfcUtil::IfcBaseClass* entity, int id)
 }
 
 void IfcFile::removeEntity(IfcUtil::IfcBaseClass* entity) {
+	build_lazy_indices_();
+
 	const unsigned id = entity->data().id();
 
 	IfcUtil::IfcBaseClass* file_entity = instance_by_id(id);
@@ -2083,6 +2116,7 @@ IfcEntityList::ptr IfcFile::instances_by_type_excl_subtypes(const std::string& t
 }
 
 IfcEntityList::ptr IfcFile::instances_by_reference(int t) {
+	build_lazy_indices_();
 	entities_by_ref_t::const_iterator it = byref.find(t);
 	IfcEntityList::ptr ret;
 	if (it != byref.end()) {
@@ -2114,6 +2148,7 @@ IfcUtil::IfcBaseClass* IfcFile::instance_by_id(int id) {
 }
 
 IfcUtil::IfcBaseClass* IfcFile::instance_by_guid(const std::string& guid) {
+	build_lazy_indices_();
 	entity_by_guid_t::const_iterator it = byguid.find(guid);
 	if ( it == byguid.end() ) {
 		throw IfcException("Instance with GlobalId '" + guid + "' not found");
@@ -2357,3 +2392,30 @@ void IfcParse::IfcFile::build_inverses() {
 		build_inverses_(pair.second);	
 	}
 }
+
+void IfcParse::IfcFile::build_lazy_indices_() {
+	if (!lazy_) {
+		return;
+	}
+	lazy_ = false;
+
+	Logger::Status("Building inverses...");
+	build_inverses();
+
+	for (auto& pair : byid) {
+		IfcUtil::IfcBaseClass* instance = pair.second;
+		if (instance->declaration().is(*ifcroot_type_)) {
+			try {
+				const std::string guid = *instance->data().getArgument(0);
+				if (byguid.find(guid) != byguid.end()) {
+					std::stringstream ss;
+					ss << "Instance encountered with non-unique GlobalId " << guid;
+					Logger::Message(Logger::LOG_WARNING, ss.str());
+				}
+				byguid[guid] = instance;
+			} catch (const IfcException& ex) {
+				Logger::Message(Logger::LOG_ERROR, ex.what());
+			}
+		}
+	}
+}
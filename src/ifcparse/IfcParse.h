@@ -164,6 +164,7 @@ namespace IfcParse {
 		IfcFile* file;
 		IfcSpfLexer(IfcSpfStream* s, IfcFile* f);
 		Token Next();
+		void skipInstance();
 		~IfcSpfLexer();
 		void TokenString(unsigned int offset, std::string &result);
 	};
@@ -42,7 +42,7 @@ class Patcher:
         for owner_history in self.file.by_type("IfcOwnerHistory"):
             self.owner_history = self.new.add(owner_history)
             break
-        selector = ifcopenshell.util.selector.Selector()
+        selector = ifcopenshell.util.selector.Selector(cache=True)
         for element in selector.parse(self.file, self.query):
             self.add_element(element)
         self.create_spatial_tree()
@@ -36,7 +36,7 @@ class Patcher:
         for owner_history in self.file.by_type("IfcOwnerHistory"):
             self.owner_history = self.new.add(owner_history)
             break
-        selector = ifcopenshell.util.selector.Selector()
+        selector = ifcopenshell.util.selector.Selector(cache=True)
         for space in selector.parse(self.file, ".IfcSpace"):
             self.add_element(space)
         self.file = self.new
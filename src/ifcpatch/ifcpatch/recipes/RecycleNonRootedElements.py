@@ -17,7 +17,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
 
-from collections import deque
+import io
 import ifcopenshell.util.element
 
 class Patcher:
@@ -40,15 +40,7 @@ class Patcher:
                 deleted.append(element.id())
             else:
                 hashes[h] = element
-        deleted.sort()
-        deleted_q = deque(deleted)
-        new = ''
-        for line in self.file.wrapped_data.to_string().split('\n'):
-            try:
-                if int(line.split('=')[0][1:]) != deleted_q[0]:
-                    new += (line + '\n')
-                else:
-                    deleted_q.popleft()
-            except:
-                new += (line + '\n')
-        self.file = new
+        deleted = set(deleted)
+        new = io.StringIO()
+        self.file.write_stream(new, ids=[i for i in self.file.wrapped_data.entity_names() if i not in deleted])
+        self.file = new.getvalue()
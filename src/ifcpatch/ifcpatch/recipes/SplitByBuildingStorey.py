@@ -17,6 +17,21 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
 
+import multiprocessing
+import ifcopenshell
+import ifcopenshell.util.element
+
+
+# Forked writer processes inherit the patcher, including the loaded file
+worker_patcher = None
+
+
+def write_storeys(indices):
+    for i in indices:
+        worker_patcher.write_storey(i)
+    return len(indices)
+
+
 class Patcher:
     def __init__(self, src, file, logger, args=None):
         self.src = src
@@ -25,37 +40,101 @@ class Patcher:
         self.args = args
 
     def patch(self):
-        import ifcopenshell
-        from shutil import copyfile
-        storeys = self.file.by_type('IfcBuildingStorey')
-        for i, storey in enumerate(storeys):
-            dest = '{}-{}.ifc'.format(i, storey.Name)
-            copyfile(self.src, dest)
-            old_ifc = ifcopenshell.open(dest)
-            new_ifc = ifcopenshell.file(schema=self.file.schema)
-            if self.file.schema == 'IFC2X3':
-                elements = old_ifc.by_type('IfcProject') + old_ifc.by_type('IfcProduct')
-            else:
-                elements = old_ifc.by_type('IfcContext') + old_ifc.by_type('IfcProduct')
-            inverse_elements = []
-            for element in elements:
-                if element.is_a('IfcElement') \
-                        and not self.is_in_storey(element, storey):
-                    element.Representation = None
+        # An optional first argument sets the number of writer processes
+        jobs = int(self.args[0]) if self.args else 1
+        self.storeys = self.file.by_type('IfcBuildingStorey')
+        self.partition_elements()
+        indices = list(range(len(self.storeys)))
+        if jobs > 1 and len(indices) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            global worker_patcher
+            worker_patcher = self
+            try:
+                chunks = [indices[i::jobs] for i in range(jobs)]
+                with multiprocessing.get_context('fork').Pool(jobs) as pool:
+                    for total in pool.imap_unordered(write_storeys, [c for c in chunks if c]):
+                        self.logger.info('Wrote {} storey file(s)'.format(total))
+            finally:
+                worker_patcher = None
+        else:
+            for i in indices:
+                self.write_storey(i)
+
+    def partition_elements(self):
+        self.storey_elements = {storey.id(): [] for storey in self.storeys}
+        self.element_storeys = {}
+        for rel in self.file.by_type('IfcRelContainedInSpatialStructure'):
+            if not rel.RelatingStructure.is_a('IfcBuildingStorey'):
+                continue
+            storey_id = rel.RelatingStructure.id()
+            queue = [e for e in rel.RelatedElements if e.is_a('IfcElement')]
+            while queue:
+                element = queue.pop()
+                if element.id() in self.element_storeys:
                     continue
-                if element.is_a('IfcElement'):
-                    styled_rep_items = [i for i in old_ifc.traverse(element) if i.is_a('IfcRepresentationItem') and i.StyledByItem]
-                    [new_ifc.add(i.StyledByItem[0]) for i in styled_rep_items]
-                new_ifc.add(element)
-                inverse_elements.extend(old_ifc.get_inverse(element))
-            for inverse_element in inverse_elements:
-                new_ifc.add(inverse_element)
-            for element in new_ifc.by_type('IfcElement'):
-                if not self.is_in_storey(element, storey):
-                    new_ifc.remove(element)
-            new_ifc.write(dest)
-
-    def is_in_storey(self, element, storey):
-        return element.ContainedInStructure \
-            and element.ContainedInStructure[0].RelatingStructure.is_a('IfcBuildingStorey') \
-            and element.ContainedInStructure[0].RelatingStructure.GlobalId == storey.GlobalId
+                self.element_storeys[element.id()] = storey_id
+                self.storey_elements[storey_id].append(element)
+                # Openings and aggregated parts follow their host element
+                for opening_rel in getattr(element, 'HasOpenings', []):
+                    queue.append(opening_rel.RelatedOpeningElement)
+                for decomposition_rel in getattr(element, 'IsDecomposedBy', []):
+                    queue.extend(e for e in decomposition_rel.RelatedObjects if e.is_a('IfcElement'))
+        if self.file.schema == 'IFC2X3':
+            self.shared_elements = self.file.by_type('IfcProject')
+        else:
+            self.shared_elements = self.file.by_type('IfcContext')
+        self.shared_elements += [e for e in self.file.by_type('IfcProduct') if not e.is_a('IfcElement')]
+
+    def write_storey(self, i):
+        storey = self.storeys[i]
+        dest = '{}-{}.ifc'.format(i, storey.Name)
+        self.logger.info('Writing {}'.format(dest))
+        self.new = ifcopenshell.file(schema=self.file.schema)
+        self.added_inverses = set()
+        elements = self.storey_elements[storey.id()]
+        self.allowed_ids = {e.id() for e in elements}
+        for element in self.shared_elements:
+            self.new.add(element)
+        for element in elements:
+            styled_rep_items = [i for i in self.file.traverse(element) if i.is_a('IfcRepresentationItem') and i.StyledByItem]
+            [self.new.add(i.StyledByItem[0]) for i in styled_rep_items]
+            self.new.add(element)
+        for element in self.shared_elements + elements:
+            for inverse in self.file.get_inverse(element):
+                self.add_inverse(inverse)
+        self.new.write(dest)
+        self.new = None
+
+    def add_inverse(self, inverse):
+        if inverse.id() in self.added_inverses:
+            return
+        self.added_inverses.add(inverse.id())
+        attributes = []
+        is_filtered = False
+        for attribute in inverse:
+            if isinstance(attribute, tuple):
+                filtered = tuple(v for v in attribute if not self.is_excluded(v))
+                if attribute and not filtered:
+                    return
+                is_filtered = is_filtered or len(filtered) != len(attribute)
+                attributes.append(filtered)
+            elif self.is_excluded(attribute):
+                # A mandatory reference to an element on another storey
+                return
+            else:
+                attributes.append(attribute)
+        if not is_filtered:
+            return self.new.add(inverse)
+        new_inverse = self.new.create_entity(inverse.is_a())
+        for i, attribute in enumerate(attributes):
+            if attribute is None or attribute == ():
+                continue
+            new_inverse[i] = inverse.walk(
+                lambda v: isinstance(v, ifcopenshell.entity_instance) and v.id(), self.new.add, attribute
+            )
+
+    def is_excluded(self, value):
+        return (
+            isinstance(value, ifcopenshell.entity_instance)
+            and value.id() not in self.allowed_ids
+            and value.is_a('IfcElement')
+        )
@@ -256,6 +256,20 @@ struct ShapeRTTI : public boost::static_visitor<PyObject*>
 	%}
 };
 %extend IfcGeom::Representation::Triangulation<double> {
+	// Contiguous copies of the vertex and face buffers, for use with
+	// numpy.frombuffer() without converting every value to a Python object.
+	// Only the double precision triangulation is exposed to Python, so the
+	// vertex buffer is always float64.
+	PyObject* verts_buffer() const {
+		const std::vector<double>& v = $self->verts();
+		return PyBytes_FromStringAndSize((const char*) v.data(), v.size() * sizeof(double));
+	}
+
+	PyObject* faces_buffer() const {
+		const std::vector<int>& f = $self->faces();
+		return PyBytes_FromStringAndSize((const char*) f.data(), f.size() * sizeof(int));
+	}
+
 	%pythoncode %{
         # Hide the getters with read-only property implementations
         verts = property(verts)
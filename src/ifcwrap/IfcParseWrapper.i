@@ -100,6 +100,23 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return s.str();
 	}
 
+	std::string header_to_string() const {
+		std::stringstream s;
+		$self->header().write(s);
+		return s.str();
+	}
+
+	std::string instances_to_string(const std::vector<int>& ids) {
+		std::stringstream s;
+		for (std::vector<int>::const_iterator it = ids.begin(); it != ids.end(); ++it) {
+			const IfcUtil::IfcBaseClass* e = $self->instance_by_id(*it);
+			if (e->declaration().as_entity()) {
+				s << e->data().toString(true) << ";" << std::endl;
+			}
+		}
+		return s.str();
+	}
+
 	std::vector<unsigned> entity_names() const {
 		std::vector<unsigned> keys;
 		keys.reserve(std::distance($self->begin(), $self->end()));
@@ -130,6 +147,66 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return $self->schema()->name();
 	}
 
+	PyObject* get_attributes(const std::string& type, const std::vector<std::string>& names, bool include_subtypes) {
+		const IfcParse::entity* entity = $self->schema()->declaration_by_name(type)->as_entity();
+		if (entity == 0) {
+			throw IfcParse::IfcException(type + " is not an entity");
+		}
+		std::vector<size_t> indices;
+		indices.reserve(names.size());
+		for (std::vector<std::string>::const_iterator it = names.begin(); it != names.end(); ++it) {
+			const ptrdiff_t index = entity->attribute_index(*it);
+			if (index < 0) {
+				throw IfcParse::IfcException(*it + " not found on " + type);
+			}
+			indices.push_back((size_t) index);
+		}
+
+		IfcEntityList::ptr instances = include_subtypes
+			? $self->instances_by_type(entity)
+			: $self->instances_by_type_excl_subtypes(entity);
+		const Py_ssize_t n = instances ? instances->size() : 0;
+
+		PyObject* ids = PyTuple_New(n);
+		std::vector<PyObject*> columns;
+		for (size_t i = 0; i < names.size(); ++i) {
+			columns.push_back(PyTuple_New(n));
+		}
+
+		// Subtypes may redeclare inherited attributes as derived, so types are looked up per declaration
+		std::map<const IfcParse::declaration*, std::vector<IfcUtil::ArgumentType> > types;
+		try {
+			for (Py_ssize_t i = 0; i < n; ++i) {
+				IfcUtil::IfcBaseClass* inst = (*instances)[(int) i];
+				std::vector<IfcUtil::ArgumentType>& inst_types = types[&inst->declaration()];
+				if (inst_types.empty()) {
+					for (std::vector<size_t>::const_iterator it = indices.begin(); it != indices.end(); ++it) {
+						inst_types.push_back(helper_fn_attribute_type(inst, (unsigned) *it));
+					}
+				}
+				PyTuple_SetItem(ids, i, pythonize(inst->data().id()));
+				for (size_t j = 0; j < indices.size(); ++j) {
+					Argument* value = inst->data().getArgument(indices[j]);
+					PyTuple_SetItem(columns[j], i, convert_cpp_attribute_to_python_id(inst_types[j], *value));
+				}
+			}
+		} catch (...) {
+			// Release the partially filled columns, the exception is converted to a Python error by the wrapper
+			Py_DECREF(ids);
+			for (std::vector<PyObject*>::const_iterator it = columns.begin(); it != columns.end(); ++it) {
+				Py_DECREF(*it);
+			}
+			throw;
+		}
+
+		PyObject* result = PyTuple_New(columns.size() + 1);
+		PyTuple_SetItem(result, 0, ids);
+		for (size_t j = 0; j < columns.size(); ++j) {
+			PyTuple_SetItem(result, j + 1, columns[j]);
+		}
+		return result;
+	}
+
 	%pythoncode %{
         # Hide the getters with read-only property implementations
         header = property(header)
@@ -226,6 +303,11 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return self->declaration().name();
 	}
 
+	// Unique across schemas, e.g. IFC4.IfcWall, for use as a key in caches per declaration
+	std::string qualified_name() const {
+		return self->declaration().schema()->name() + "." + self->declaration().name();
+	}
+
 	std::pair<IfcUtil::ArgumentType,Argument*> get_argument(unsigned i) {
 		return std::pair<IfcUtil::ArgumentType,Argument*>($self->data().getArgument(i)->type(), $self->data().getArgument(i));
 	}
@@ -533,8 +615,16 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 %}
 
 %inline %{
-	IfcParse::IfcFile* open(const std::string& fn) {
-		IfcParse::IfcFile* f = new IfcParse::IfcFile(fn);
+	IfcParse::IfcFile* open(const std::string& fn, bool mmap=false, bool lazy=false) {
+#ifdef USE_MMAP
+		IfcParse::IfcSpfStream* stream = new IfcParse::IfcSpfStream(fn, mmap);
+#else
+		if (mmap) {
+			throw std::runtime_error("No memory-mapped file support enabled");
+		}
+		IfcParse::IfcSpfStream* stream = new IfcParse::IfcSpfStream(fn);
+#endif
+		IfcParse::IfcFile* f = new IfcParse::IfcFile(stream, lazy);
 		return f;
 	}
 
@@ -771,6 +861,67 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return Py_None;
 	}
 %}
+%{
+	PyObject* convert_cpp_attribute_to_python_id(IfcUtil::ArgumentType type, Argument& arg);
+
+	PyObject* convert_cpp_instance_to_python_id(IfcUtil::IfcBaseClass* v) {
+		if (v->declaration().as_entity()) {
+			return pythonize(v->data().id());
+		}
+		// Type declarations in select types, such as IfcLabel, are represented by their value
+		Argument* value = v->data().getArgument(0);
+		return convert_cpp_attribute_to_python_id(value->type(), *value);
+	}
+
+	// Same as convert_cpp_attribute_to_python(), except that entity
+	// instances are represented by their id instead of a dictionary.
+	// Exceptions are not swallowed, but left to the caller to report.
+	PyObject* convert_cpp_attribute_to_python_id(IfcUtil::ArgumentType type, Argument& arg) {
+		if (arg.isNull() || type == IfcUtil::Argument_DERIVED) {
+			Py_INCREF(Py_None);
+			return Py_None;
+		}
+		switch(type) {
+			case IfcUtil::Argument_ENTITY_INSTANCE: {
+				IfcUtil::IfcBaseClass* v = arg;
+				return convert_cpp_instance_to_python_id(v);
+			break; }
+			case IfcUtil::Argument_AGGREGATE_OF_ENTITY_INSTANCE: {
+				IfcEntityList::ptr v = arg;
+				auto r = PyTuple_New(v->size());
+				try {
+					for (unsigned i = 0; i < v->size(); ++i) {
+						PyTuple_SetItem(r, i, convert_cpp_instance_to_python_id((*v)[i]));
+					}
+				} catch (...) {
+					Py_DECREF(r);
+					throw;
+				}
+				return r;
+			break; }
+			case IfcUtil::Argument_AGGREGATE_OF_AGGREGATE_OF_ENTITY_INSTANCE: {
+				IfcEntityListList::ptr vs = arg;
+				auto rs = PyTuple_New(vs->size());
+				try {
+					for (auto it = vs->begin(); it != vs->end(); ++it) {
+						auto r = PyTuple_New(it->size());
+						PyTuple_SetItem(rs, std::distance(vs->begin(), it), r);
+						for (auto jt = it->begin(); jt != it->end(); ++jt) {
+							PyTuple_SetItem(r, std::distance(it->begin(), jt), convert_cpp_instance_to_python_id(*jt));
+						}
+					}
+				} catch (...) {
+					// Also releases the inner tuples already stored in rs
+					Py_DECREF(rs);
+					throw;
+				}
+				return rs;
+			break; }
+			default:
+				return convert_cpp_attribute_to_python(type, arg);
+		}
+	}
+%}
 %inline %{
 	PyObject* get_info_cpp(IfcUtil::IfcBaseClass* v) {
 		PyObject *d = PyDict_New();